@@ -0,0 +1,61 @@
+"""
+Benchmark: alta de usuarios uno por uno (/users/register) vs. alta masiva (/admin_user/users/bulk).
+
+Llama directamente a los handlers sobre una base SQLite en memoria. El costo
+dominante es bcrypt, por lo que la mejora escala con HASH_WORKERS (núcleos).
+
+Con --bcrypt-rounds bajo (y HASH_WORKERS=1, ya que los procesos del pool usan
+la configuración por defecto) se aísla el costo de base de datos de cada camino.
+
+Uso (desde backend/):
+    HASH_WORKERS=8 python -m benchmarks.bulk_provisioning --users 256
+    HASH_WORKERS=1 python -m benchmarks.bulk_provisioning --users 5000 --bcrypt-rounds 4
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+import src.main  # Registra todos los modelos y crea las tablas
+from src.database import SessionLocal
+from src.routes.admin_routes import create_users_bulk
+from src.routes.user_routes import create_user
+from src.schemas.user_schemas import UserCreate
+from src.seed import seed_data
+from src.utils import HASH_WORKERS, pwd_context, shutdown_hash_pool
+
+ADMIN = {"id": "benchmark", "email": "admin@repa.ar", "roles": [{"id": 1, "rol": "admin"}]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=64)
+    parser.add_argument("--bcrypt-rounds", type=int, default=None)
+    args = parser.parse_args()
+    if args.bcrypt_rounds:
+        pwd_context.update(bcrypt__rounds=args.bcrypt_rounds)
+    seed_data()
+    db = SessionLocal()
+
+    started = time.perf_counter()
+    for i in range(args.users):
+        create_user(UserCreate(email=f"serial{i}@repa.ar", password="Benchmark2025"), db)
+    serial = args.users / (time.perf_counter() - started)
+
+    payload = [{"email": f"bulk{i}@repa.ar", "password": "Benchmark2025"} for i in range(args.users)]
+    started = time.perf_counter()
+    report = create_users_bulk(payload, db, ADMIN)
+    bulk = report.created / (time.perf_counter() - started)
+
+    print(f"usuarios: {args.users}  HASH_WORKERS: {HASH_WORKERS}")
+    print(f"register  {serial:>8,.1f} usuarios/s")
+    print(f"bulk      {bulk:>8,.1f} usuarios/s  ({bulk / serial:.1f}x)")
+    db.close()
+    shutdown_hash_pool()
+
+
+if __name__ == "__main__":
+    main()
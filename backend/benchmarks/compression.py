@@ -0,0 +1,100 @@
+"""
+Benchmark: CPU vs. bytes de la compresión de respuestas (gzip y brotli).
+
+Arma páginas representativas de los listados (get_all_training / get_trainings con
+TrainingOut y get_users con UserOut) a partir de los datos sintéticos y mide,
+para cada codificación y nivel, el tamaño resultante y el tiempo de compresión,
+además del costo de servir la misma página desde PrecompressedCache.
+
+Uso (desde backend/):
+    python -m benchmarks.compression
+"""
+import gzip
+import json
+import os
+import time
+from datetime import datetime
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+import random
+
+import src.main  # Registra todos los modelos
+from src.compression import PrecompressedCache, brotli
+from src.generate_data import TRAININGS_COLUMNS, _training_profiles, _user_email, _user_id
+
+LEVELS = [("gzip", 1), ("gzip", 6), ("gzip", 9)]
+if brotli is not None:
+    LEVELS += [("br", 1), ("br", 4), ("br", 6), ("br", 11)]
+
+
+def training_page(rows: int) -> bytes:
+    rng = random.Random(rows)
+    profiles = _training_profiles(rng, rows)
+    page = []
+    for i, profile in enumerate(profiles):
+        item = dict(zip(TRAININGS_COLUMNS, profile))
+        item.update(
+            fecha_inicio="2023-03-01", fecha_finalizacion="2023-07-15", horas_duracion=rng.randrange(8, 400),
+            enlace_certificado=f"https://certificados.repa.ar/42/{i}", user_id=_user_id(42, i), id=i + 1,
+        )
+        page.append(item)
+    return json.dumps(page, ensure_ascii=False).encode()
+
+
+def users_page(rows: int) -> bytes:
+    created = datetime(2024, 5, 1, 12, 30).isoformat()
+    page = [
+        {"email": _user_email(42, i), "id": _user_id(42, i), "is_active": True, "created_at": created,
+         "last_login": created, "roles": [{"rol": "user", "id": 2}]}
+        for i in range(rows)
+    ]
+    return json.dumps(page).encode()
+
+
+def compress(body: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def per_call(fn, min_time: float = 0.3) -> float:
+    count = 0
+    started = time.perf_counter()
+    while True:
+        fn()
+        count += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            return elapsed / count
+
+
+def main():
+    pages = {
+        "trainings x10": training_page(10),
+        "trainings x100": training_page(100),
+        "trainings x1000": training_page(1000),
+        "users x100": users_page(100),
+        "users x1000": users_page(1000),
+    }
+    print(f"{'página':<17}{'codif.':<9}{'bytes':>10}{'ratio':>8}{'µs':>10}{'MB/s':>9}")
+    for name, body in pages.items():
+        print(f"{name:<17}{'-':<9}{len(body):>10,}")
+        for encoding, level in LEVELS:
+            compressed = compress(body, encoding, level)
+            seconds = per_call(lambda: compress(body, encoding, level))
+            print(
+                f"{'':<17}{encoding + ' ' + str(level):<9}{len(compressed):>10,}"
+                f"{len(body) / len(compressed):>7.1f}x{seconds * 1e6:>10,.0f}{len(body) / seconds / 2**20:>9.1f}"
+            )
+        cache = PrecompressedCache()
+        key = cache.key(body, "gzip")
+        cache.put(key, compress(body, "gzip", 6))
+        hit = per_call(lambda: cache.get(cache.key(body, "gzip")))
+        print(f"{'':<17}{'caché':<9}{'':>10}{'':>8}{hit * 1e6:>10,.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark: latencia de la búsqueda aproximada (src/fuzzy_search.py).
+
+Genera usuarios y cursos sintéticos y mide la latencia (p50 y p95) de búsquedas
+con abreviaturas, sin acentos y con errores de tipeo, por email, institución y
+nombre de curso. En PostgreSQL comprueba además con EXPLAIN que las consultas
+usen los índices GIN de trigramas (objetivo: top-k en menos de 50 ms con
+millones de filas). En SQLite mide el motor alternativo en Python, pensado
+sólo para pruebas.
+
+Uso (desde backend/):
+    python -m benchmarks.fuzzy_search --users 20000
+    DATABASE_URL=postgresql+psycopg2://... python -m benchmarks.fuzzy_search --users 2000000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/fuzzy_search.db"
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+from sqlalchemy import event, text
+
+import src.main  # Registra todos los modelos y crea las tablas
+from src.database import SessionLocal, engine
+from src.fuzzy_search import ensure_search_indexes, search_trainings, search_users
+from src.generate_data import generate
+from src.lookups import lookup_cache
+
+SEARCHES = [
+    ("email", "usuario42.1234"),
+    ("email", "usuari42.99 fibertel"),
+    ("institucion", "Univ. Nac. de Cordoba"),
+    ("institucion", "universidad de bs as"),
+    ("nombre_curso", "introduccion a la animacion"),
+    ("nombre_curso", "Taler de guion"),
+]
+
+
+def run(db, field: str, query: str, limit: int):
+    if field == "email":
+        return search_users(db, query, limit)
+    return search_trainings(db, query, field, limit)
+
+
+def uses_trigram_index(db, field: str, query: str, limit: int) -> bool:
+    """En PostgreSQL, si alguna consulta de la búsqueda usó un índice *_trgm."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "similarity" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        run(db, field, query, limit)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    raw = db.connection().connection.cursor()
+    try:
+        for statement, parameters in statements:
+            raw.execute(f"EXPLAIN {statement}", parameters)
+            if any("_trgm" in line for (line,) in raw.fetchall()):
+                return True
+    finally:
+        raw.close()
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20_000, help="Usuarios sintéticos (≈2 cursos por usuario)")
+    parser.add_argument("--skip-load", action="store_true", help="Usar los datos ya cargados")
+    parser.add_argument("--limit", type=int, default=20, help="Resultados por búsqueda (top-k)")
+    parser.add_argument("--repeat", type=int, default=20, help="Repeticiones por búsqueda")
+    args = parser.parse_args()
+
+    if not args.skip_load:
+        generate(args.users, seed=42, persons=False)
+    ensure_search_indexes()
+    lookup_cache.load()
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE users"))
+            conn.execute(text("ANALYZE trainings"))
+            conn.execute(text("ANALYZE training_lookups"))
+
+    print(f"motor {engine.dialect.name}, top-{args.limit}")
+    print(f"{'campo':<14}{'búsqueda':<32}{'hits':>6}{'p50 ms':>10}{'p95 ms':>10}  índice")
+    db = SessionLocal()
+    try:
+        for field, query in SEARCHES:
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                hits = run(db, field, query, args.limit)
+                timings.append(time.perf_counter() - started)
+                db.rollback()  # Cada búsqueda en su propia transacción, como en la API
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            index = ""
+            if engine.dialect.name == "postgresql":
+                index = "GIN" if uses_trigram_index(db, field, query, args.limit) else "SIN ÍNDICE"
+                db.rollback()
+            print(f"{field:<14}{query:<32}{len(hits):>6}{statistics.median(timings) * 1000:>10.1f}{p95 * 1000:>10.1f}  {index}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
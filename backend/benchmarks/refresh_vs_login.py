@@ -0,0 +1,61 @@
+"""
+Benchmark: renovaciones de token (/users/refresh) vs. logins (/users/token) por segundo.
+
+Llama directamente a los handlers de las rutas sobre una base SQLite en memoria,
+sin HTTP, para medir sólo el costo del endpoint (bcrypt + consultas vs. JWT).
+
+Uso (desde backend/):
+    python -m benchmarks.refresh_vs_login
+"""
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+from fastapi.security import OAuth2PasswordRequestForm
+
+import src.main  # Registra todos los modelos y crea las tablas
+from src.database import SessionLocal
+from src.routes.user_routes import create_user, login, refresh_token
+from src.schemas.user_schemas import RefreshTokenIn, UserCreate
+from src.seed import seed_data
+
+EMAIL = "bench@repa.ar"
+PASSWORD = "Benchmark2025"
+
+
+def bench(name: str, fn, duration: float = 3.0) -> float:
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < duration:
+        fn()
+        count += 1
+    rate = count / (time.perf_counter() - started)
+    print(f"{name:<10} {rate:>10,.1f} ops/s")
+    return rate
+
+
+def main():
+    seed_data()
+    db = SessionLocal()
+    create_user(UserCreate(email=EMAIL, password=PASSWORD), db)
+    form = OAuth2PasswordRequestForm(username=EMAIL, password=PASSWORD)
+
+    logins = bench("login", lambda: login(form, db))
+
+    tokens = login(form, db)
+
+    def do_refresh():
+        # Cada renovación rota el refresh token, como haría un cliente real
+        nonlocal tokens
+        tokens = refresh_token(RefreshTokenIn(refresh_token=tokens["refresh_token"]))
+
+    refreshes = bench("refresh", do_refresh)
+    print(f"refresh/login: {refreshes / logins:,.0f}x")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Benchmark: tamaño de tabla e índices y tiempo de agregación de los cursos con
+las columnas repetidas como texto (esquema anterior) vs. como IDs de training_lookups.
+
+Carga las mismas filas sintéticas (src.generate_data) en dos tablas auxiliares,
+crea en ambas el mismo índice sobre (institucion, nivel_estudio) y mide:
+  - tamaño de tabla e índices (dbstat en SQLite, pg_table_size/pg_indexes_size en PostgreSQL);
+  - GROUP BY institucion, nivel_estudio (en la versión normalizada, agrupando por ID
+    y traduciendo con lookup_cache, y con JOIN a training_lookups en SQL).
+
+Uso (desde backend/):
+    python -m benchmarks.training_lookups --users 50000
+    DATABASE_URL=postgresql://... python -m benchmarks.training_lookups --users 500000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/training_lookups.db"
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+from sqlalchemy import Column, Index, Integer, MetaData, String, Table, text
+
+import src.main  # Registra todos los modelos y crea las tablas
+from src.database import engine
+from src.generate_data import TRAININGS_COLUMNS, _load, trainings_chunks
+from src.lookups import LookupString, lookup_cache
+from src.models.training_models import Training
+from src.seed import seed_data
+
+LOOKUP_COLUMNS = [column.name for column in Training.__table__.columns if isinstance(column.type, LookupString)]
+
+
+def bench_tables():
+    metadata = MetaData()
+    for name, lookup_type in (("bench_trainings_text", String), ("bench_trainings_lookup", Integer)):
+        columns = [Column("id", Integer, primary_key=True)]
+        for column in Training.__table__.columns:
+            if column.name == "id":
+                continue
+            column_type = lookup_type if column.name in LOOKUP_COLUMNS else column.type.copy()
+            columns.append(Column(column.name, column_type))
+        Table(name, metadata, *columns, Index(f"ix_{name}_inst_nivel", "institucion", "nivel_estudio"))
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+
+
+def as_text(chunks):
+    # Misma carga, con los IDs traducidos de vuelta a texto (esquema anterior)
+    positions = [i for i, column in enumerate(TRAININGS_COLUMNS) if column in LOOKUP_COLUMNS]
+    for chunk in chunks:
+        rows = []
+        for row in chunk:
+            row = list(row)
+            for i in positions:
+                row[i] = lookup_cache.value_for(row[i])
+            rows.append(tuple(row))
+        yield rows
+
+
+def sizes(table: str) -> tuple[int, int]:
+    """Bytes de la tabla y de sus índices."""
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            heap = conn.scalar(text(f"SELECT pg_table_size('{table}')"))
+            indexes = conn.scalar(text(f"SELECT pg_indexes_size('{table}')"))
+            return heap, indexes
+        heap = conn.scalar(text("SELECT sum(pgsize) FROM dbstat WHERE name = :t"), {"t": table})
+        indexes = conn.scalar(
+            text("SELECT coalesce(sum(pgsize), 0) FROM dbstat WHERE name IN "
+                 "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :t)"),
+            {"t": table},
+        )
+        return heap, indexes
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50_000, help="Usuarios sintéticos (≈2 cursos por usuario)")
+    args = parser.parse_args()
+
+    seed_data()
+    bench_tables()
+    connection = engine.raw_connection()
+    try:
+        rows = _load(connection, "bench_trainings_lookup", TRAININGS_COLUMNS, trainings_chunks(42, 0, args.users, 4))
+        _load(connection, "bench_trainings_text", TRAININGS_COLUMNS, as_text(trainings_chunks(42, 0, args.users, 4)))
+    finally:
+        connection.close()
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("ANALYZE bench_trainings_text"))
+            conn.execute(text("ANALYZE bench_trainings_lookup"))
+    print(f"{rows:,} cursos, motor {engine.dialect.name}")
+
+    print(f"{'':<26}{'tabla':>12}{'índices':>12}")
+    for table in ("bench_trainings_text", "bench_trainings_lookup"):
+        heap, indexes = sizes(table)
+        print(f"{table:<26}{heap / 2**20:>10.1f}MB{indexes / 2**20:>10.1f}MB")
+
+    group_text = text(
+        "SELECT institucion, nivel_estudio, count(*) FROM bench_trainings_text GROUP BY institucion, nivel_estudio"
+    )
+    group_ids = text(
+        "SELECT institucion, nivel_estudio, count(*) FROM bench_trainings_lookup GROUP BY institucion, nivel_estudio"
+    )
+    group_join = text(
+        "SELECT i.value, n.value, count(*) FROM bench_trainings_lookup t "
+        "JOIN training_lookups i ON i.id = t.institucion JOIN training_lookups n ON n.id = t.nivel_estudio "
+        "GROUP BY i.value, n.value"
+    )
+    with engine.connect() as conn:
+        def by_ids():
+            return [(lookup_cache.value_for(i), lookup_cache.value_for(n), c) for i, n, c in conn.execute(group_ids)]
+
+        expected = sorted(conn.execute(group_text).all())
+        assert sorted(by_ids()) == expected
+        assert sorted(conn.execute(group_join).all()) == expected
+        timings = {
+            "texto": best_of(lambda: conn.execute(group_text).all()),
+            "IDs + lookup_cache": best_of(by_ids),
+            "IDs + JOIN": best_of(lambda: conn.execute(group_join).all()),
+        }
+    for name, seconds in timings.items():
+        print(f"GROUP BY {name:<20}{seconds * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
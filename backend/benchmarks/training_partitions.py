@@ -0,0 +1,99 @@
+"""
+Verificación: particionado de trainings por año y descarte de particiones (pruning).
+
+Requiere PostgreSQL con TRAININGS_PARTITIONED=true. Genera cursos sintéticos,
+ejecuta EXPLAIN de las consultas del listado (get_all_training) y de las
+estadísticas (get_training_stats) con un rango de fechas, y comprueba que el plan
+sólo recorre las particiones de los años del rango. También mide cada consulta
+con y sin filtro de fechas.
+
+Uso (desde backend/):
+    DATABASE_URL=postgresql+psycopg2://... TRAININGS_PARTITIONED=true \\
+        python -m benchmarks.training_partitions --users 200000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+from sqlalchemy import extract, func, select, text
+
+import src.main  # Registra todos los modelos y crea las tablas
+from src.database import SessionLocal, engine
+from src.generate_data import generate
+from src.models.training_models import Training
+from src.partitioning import TRAININGS_PARTITIONED
+from src.routes.admin_training_rutes import _date_filters
+
+
+def scanned_relations(plan: dict) -> set[str]:
+    """Tablas recorridas por un plan de EXPLAIN (FORMAT JSON)."""
+    relations = set()
+    if "Relation Name" in plan:
+        relations.add(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        relations |= scanned_relations(child)
+    return relations
+
+
+def explain(db, query) -> set[str]:
+    compiled = query.compile(engine, compile_kwargs={"literal_binds": True})
+    result = db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+    return scanned_relations(result[0]["Plan"])
+
+
+def timed(db, query, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        db.execute(query).all()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200_000, help="Usuarios sintéticos (≈2 cursos por usuario)")
+    parser.add_argument("--skip-load", action="store_true", help="Usar los datos ya cargados")
+    args = parser.parse_args()
+
+    if not TRAININGS_PARTITIONED:
+        sys.exit("Requiere PostgreSQL y TRAININGS_PARTITIONED=true")
+    if not args.skip_load:
+        generate(args.users, persons=False)
+
+    desde, hasta = date(2020, 1, 1), date(2021, 12, 31)
+    expected = {"trainings_y2020", "trainings_y2021"}
+    filters = _date_filters(desde, hasta)
+    anio = extract("year", Training.fecha_inicio)
+    queries = {
+        "listado": select(Training).where(*filters).order_by(Training.fecha_inicio).limit(50),
+        "estadísticas": select(anio, func.count(Training.id), func.sum(Training.horas_duracion))
+        .where(*filters).group_by(anio),
+    }
+    unfiltered = {
+        "listado": select(Training).order_by(Training.fecha_inicio).limit(50),
+        "estadísticas": select(anio, func.count(Training.id), func.sum(Training.horas_duracion)).group_by(anio),
+    }
+
+    db = SessionLocal()
+    try:
+        db.execute(text("ANALYZE trainings"))
+        ok = True
+        for name, query in queries.items():
+            relations = explain(db, query)
+            pruned = relations <= expected
+            ok &= pruned
+            print(f"{name:<14} particiones: {', '.join(sorted(relations))} -> {'OK' if pruned else 'SIN PRUNING'}")
+            print(f"{'':<14} con rango {timed(db, query) * 1000:8.1f} ms | sin rango {timed(db, unfiltered[name]) * 1000:8.1f} ms")
+    finally:
+        db.close()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark: validación por lotes de cursos (validate_trainings) vs. TrainingCreate por objeto.
+
+Valida las mismas filas (dicts como los que llegarían en una importación, con un
+5% de filas inválidas) de las dos formas y compara filas/s. Ambas producen los
+dicts que necesita un INSERT masivo (por objeto: TrainingCreate + model_dump) y se
+verifica que acepten y rechacen exactamente las mismas filas con los mismos valores.
+
+Uso (desde backend/):
+    python -m benchmarks.training_validation --rows 100000
+"""
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+from pydantic import ValidationError
+
+from src.generate_data import TRAININGS_COLUMNS, _training_profiles
+from src.schemas.trainig_schemas import TrainingCreate, validate_trainings
+
+
+def make_rows(count: int) -> list[dict]:
+    rng = random.Random(count)
+    rows = []
+    for i, profile in enumerate(_training_profiles(rng, count)):
+        row = dict(zip(TRAININGS_COLUMNS, profile))
+        inicio = rng.randrange(2000, 2024)
+        row.update(
+            fecha_inicio=f"{inicio}-03-01", fecha_finalizacion=f"{inicio}-07-15", horas_duracion=rng.randrange(8, 400),
+            enlace_certificado=f"https://certificados.repa.ar/{i}", idioma=row["idioma"].upper(),
+        )
+        falla = rng.random()
+        if falla < 0.02:
+            row["fecha_finalizacion"] = f"{inicio - 1}-01-01"
+        elif falla < 0.03:
+            row["horas_duracion"] = 0
+        elif falla < 0.04:
+            row["idioma"] = "xx"
+        elif falla < 0.05:
+            row["nombre_curso"] = ""
+        rows.append(row)
+    return rows
+
+
+def per_object(rows: list[dict]):
+    valid, errors = [], {}
+    for index, row in enumerate(rows):
+        try:
+            valid.append((index, TrainingCreate.model_validate(row).model_dump()))
+        except ValidationError as e:
+            errors[index] = e.errors()
+    return valid, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    validate_trainings(rows[:10])  # Compila el TypeAdapter fuera de la medición
+
+    results = {}
+    for name, fn in (("por objeto", per_object), ("por lote", validate_trainings)):
+        elapsed = float("inf")
+        for _ in range(3):  # Mejor de tres corridas
+            started = time.perf_counter()
+            valid, errors = fn(rows)
+            elapsed = min(elapsed, time.perf_counter() - started)
+        results[name] = (valid, errors, elapsed)
+        print(f"{name:<12}{len(rows) / elapsed:>12,.0f} filas/s  ({len(valid):,} válidas, {len(errors):,} con errores)")
+
+    (valid_a, errors_a, time_a), (valid_b, errors_b, time_b) = results.values()
+    assert set(errors_a) == set(errors_b)
+    assert [index for index, _ in valid_a] == [index for index, _ in valid_b]
+    assert all(a == b for (_, a), (_, b) in zip(valid_a, valid_b))
+    print(f"aceleración: {time_a / time_b:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
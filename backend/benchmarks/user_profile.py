@@ -0,0 +1,94 @@
+"""
+Benchmark y verificación de paridad del perfil de usuario (src/user_cv.py).
+
+Compara, para una muestra de usuarios, el documento que arma PostgreSQL con
+json_build_object/json_agg (`user_profile_json`) contra el que arma el ORM con
+pydantic (`orm_profile_json`): mismos campos, valores, cursos y datos personales.
+Las fechas y horas se comparan como valores (PostgreSQL omite los ceros finales
+de los microsegundos) y los roles sin importar el orden. Termina con código 1 si
+algún perfil difiere.
+
+Mide además la latencia (p50 y p95) de ambos caminos. Requiere PostgreSQL: en
+otros motores `user_profile_json` también usa el ORM y no habría nada que comparar.
+La misma verificación de paridad, sin la carga de datos, está en
+tests/test_user_profile.py.
+
+Uso (desde backend/):
+    DATABASE_URL=postgresql+psycopg2://... python -m benchmarks.user_profile --users 20000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+from sqlalchemy import select
+
+import src.main  # Registra todos los modelos y crea las tablas
+from src.database import SessionLocal, engine
+from src.generate_data import generate
+from src.lookups import lookup_cache
+from src.models.user_models import User
+from src.profile_compare import diff, normalize
+from src.user_cv import orm_profile_json, user_profile_json
+
+
+def timed(function, db, user_ids):
+    timings = []
+    for user_id in user_ids:
+        started = time.perf_counter()
+        function(db, user_id)
+        timings.append(time.perf_counter() - started)
+        db.rollback()
+        db.expunge_all()
+    timings.sort()
+    return statistics.median(timings) * 1000, timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20_000, help="Usuarios sintéticos")
+    parser.add_argument("--skip-load", action="store_true", help="Usar los datos ya cargados")
+    parser.add_argument("--sample", type=int, default=200, help="Usuarios a verificar y medir")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        sys.exit("Este benchmark requiere DATABASE_URL de PostgreSQL")
+    if not args.skip_load:
+        generate(args.users, seed=42)
+    lookup_cache.load()
+
+    db = SessionLocal()
+    try:
+        user_ids = db.scalars(select(User.id)).all()
+        sample = random.Random(7).sample(user_ids, min(args.sample, len(user_ids)))
+
+        mismatches = 0
+        for user_id in sample:
+            expected = normalize(json.loads(orm_profile_json(db, user_id)))
+            actual = normalize(json.loads(user_profile_json(db, user_id)))
+            problems = diff(expected, actual)
+            if problems:
+                mismatches += 1
+                print(f"usuario {user_id}: " + "; ".join(problems[:5]))
+            db.rollback()
+            db.expunge_all()
+        print(f"paridad: {len(sample) - mismatches}/{len(sample)} perfiles iguales")
+
+        print(f"motor {engine.dialect.name}")
+        print(f"{'camino':<12}{'p50 ms':>10}{'p95 ms':>10}")
+        for name, function in (("ORM", orm_profile_json), ("json_agg", user_profile_json)):
+            p50, p95 = timed(function, db, sample)
+            print(f"{name:<12}{p50:>10.2f}{p95:>10.2f}")
+    finally:
+        db.close()
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import asyncio
+import os
+import threading
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import inspect, insert
+from sqlalchemy.exc import OperationalError
+
+from src.database import engine
+from src.logger import logger
+from src.models.audit_models import AuditLog
+
+load_dotenv()
+
+AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "2"))
+AUDIT_FLUSH_ROWS = int(os.getenv("AUDIT_FLUSH_ROWS", "500"))           # Se vacía antes si se acumulan estas filas
+AUDIT_BUFFER_MAX = int(os.getenv("AUDIT_BUFFER_MAX", "100000"))       # Tope en memoria si la base no responde
+AUDIT_BATCH_SIZE = 1000  # Filas por sentencia
+
+# Campos que no se auditan (los cambia el sistema, no el administrador)
+_IGNORED_FIELDS = {"id", "created_at", "updated_at", "last_login", "fingerprint"}
+# Campos cuyo valor no se guarda: sólo consta que cambiaron
+_REDACTED_FIELDS = {"hashed_password"}
+REDACTED = "[oculto]"
+
+
+def snapshot(obj, **extra) -> dict:
+    """
+    Valores de las columnas de un registro (más `extra`, p. ej. los roles), para
+    compararlos con `diff` antes y después de modificarlo.
+    """
+    values = {
+        attribute.key: getattr(obj, attribute.key)
+        for attribute in inspect(obj).mapper.column_attrs
+        if attribute.key not in _IGNORED_FIELDS
+    }
+    values.update(extra)
+    return jsonable_encoder(values)
+
+
+def diff(before: dict, after: dict | None) -> tuple[dict, dict | None]:
+    """
+    Campos que cambiaron entre dos `snapshot`: `(antes, después)`. Si el registro
+    se eliminó (`after` None) se conserva el registro completo en `antes`.
+    """
+    if after is None:
+        return _redact(before), None
+    changed = [field for field in after if before.get(field) != after[field]]
+    return (
+        _redact({field: before.get(field) for field in changed}),
+        _redact({field: after[field] for field in changed}),
+    )
+
+
+def _redact(values: dict) -> dict:
+    return {field: REDACTED if field in _REDACTED_FIELDS else value for field, value in values.items()}
+
+
+class AuditBuffer:
+    """
+    Buffer en memoria del registro de auditoría (escritura diferida).
+
+    Las rutas de administración sólo agregan la fila a una lista; una tarea en
+    segundo plano la escribe con un INSERT masivo cada AUDIT_FLUSH_SECONDS (o antes,
+    al juntar AUDIT_FLUSH_ROWS filas), así la acción auditada no suma un viaje a la
+    base de datos. Las filas pendientes se pierden si el proceso termina de forma
+    abrupta; en un apagado normal se escriben antes de salir.
+    """
+
+    def __init__(self):
+        self._pending: list[dict] = []
+        self._lock = threading.Lock()
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+
+    def record(self, actor: dict, action: str, entity: str, entity_id, before: dict, after: dict | None):
+        """
+        Registra una acción de un administrador, sin tocar la base de datos. Llamar
+        después de confirmar el cambio; si no cambió ningún campo no se registra.
+        Args:
+            actor (dict): Usuario actual (de get_current_user).
+            action (str): Acción, p. ej. "user.update".
+            entity (str): user o training.
+            entity_id: ID del registro.
+            before (dict): `snapshot` anterior al cambio.
+            after (dict): `snapshot` posterior (None si se eliminó).
+        """
+        old, new = diff(before, after)
+        if not old and not new:
+            return
+        row = {
+            "created_at": datetime.now(timezone.utc),
+            "actor_id": actor.get("id"),
+            "actor_email": actor.get("email"),
+            "action": action,
+            "entity": entity,
+            "entity_id": str(entity_id),
+            "before": old,
+            "after": new,
+        }
+        with self._lock:
+            self._pending.append(row)
+            full = len(self._pending) >= AUDIT_FLUSH_ROWS
+        if full and self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                pass  # Event loop cerrado (apagado)
+
+    def flush(self) -> int:
+        """
+        Escribe las filas pendientes en la tabla audit_log.
+        Returns:
+            int: Cantidad de filas escritas.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+
+        try:
+            with engine.begin() as conn:
+                for start in range(0, len(pending), AUDIT_BATCH_SIZE):
+                    conn.execute(insert(AuditLog), pending[start:start + AUDIT_BATCH_SIZE])
+        except OperationalError as e:
+            # Base de datos no disponible: se devuelven al buffer (delante de las nuevas,
+            # para conservar el orden); pasado el tope se descartan las más viejas
+            with self._lock:
+                self._pending[:0] = pending
+                dropped = max(len(self._pending) - AUDIT_BUFFER_MAX, 0)
+                del self._pending[:dropped]
+            logger.error(f"Error escribiendo {len(pending)} filas de auditoría: {e}")
+            if dropped:
+                logger.error(f"Se descartaron {dropped} filas de auditoría (buffer lleno)")
+            return 0
+        except Exception as e:
+            # Alguna fila no se puede escribir: se escriben de a una para no perder las demás
+            logger.error(f"Error escribiendo {len(pending)} filas de auditoría: {e}; reintentando de a una")
+            return self._write_each(pending)
+        return len(pending)
+
+    def _write_each(self, rows: list[dict]) -> int:
+        written = 0
+        for row in rows:
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(AuditLog), [row])
+                written += 1
+            except Exception as e:
+                logger.error(f"Fila de auditoría descartada ({row['action']} {row['entity']} {row['entity_id']}): {e}")
+        return written
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=AUDIT_FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await run_in_threadpool(self.flush)
+
+    def start(self):
+        """
+        Inicia la tarea de vaciado (llamar desde el evento startup).
+        """
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        """
+        Detiene la tarea y escribe lo pendiente (llamar desde el evento shutdown).
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._loop = None
+        await run_in_threadpool(self.flush)
+
+
+audit_buffer = AuditBuffer()
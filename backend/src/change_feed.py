@@ -0,0 +1,173 @@
+import json
+
+from sqlalchemy import String, cast, event, insert, literal, select, text, tuple_
+from sqlalchemy.orm import Session, selectinload
+
+from src.database import SessionLocal, engine
+from src.events import queue_events
+from src.models.change_models import ChangeLog
+from src.models.person_model import Person
+from src.models.training_models import Training
+from src.models.user_models import User
+from src.schemas.person_schema import PersonOut
+from src.schemas.trainig_schemas import TrainingOut
+from src.schemas.user_schemas import UserOut
+
+CHANGES_BATCH_SIZE = 500      # Cambios leídos por consulta
+CHANGES_MAX_LIMIT = 50_000    # Máximo de cambios por llamada al feed
+
+# Modelos cuyos cambios se registran, con el nombre de la entidad en el feed
+TRACKED_MODELS = {User: "user", Training: "training", Person: "person"}
+_LOADERS = {
+    "user": (User, UserOut, [selectinload(User.roles)]),
+    "training": (Training, TrainingOut, []),
+    "person": (Person, PersonOut, []),
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(txid: int, change_id: int) -> str:
+    return f"{txid}.{change_id}"
+
+
+def decode_cursor(cursor: str | None) -> tuple[int, int]:
+    """
+    Convierte el cursor recibido en `(txid, id)`; sin cursor se lee desde el principio.
+    """
+    if not cursor:
+        return (-1, 0)
+    try:
+        txid, change_id = cursor.split(".")
+        return int(txid), int(change_id)
+    except ValueError:
+        raise InvalidCursor(cursor)
+
+
+# Escritura del registro
+
+def record_changes(connection, entity: str, ids, op: str):
+    """
+    Registra cambios hechos con sentencias Core (que no pasan por el ORM).
+    Args:
+        connection: Session o Connection de la transacción que hizo el cambio.
+        entity (str): user, training o person.
+        ids (Iterable): IDs de las filas cambiadas.
+        op (str): insert, update o delete.
+    """
+    rows = [{"entity": entity, "entity_id": str(entity_id), "op": op} for entity_id in ids]
+    if rows:
+        connection.execute(insert(ChangeLog), rows)
+        if isinstance(connection, Session):
+            queue_events(connection, [_event(row) for row in rows])
+
+
+def record_changes_from_select(connection, entity: str, id_column, op: str, *conditions):
+    """
+    Igual que `record_changes`, para un conjunto de filas dado por un filtro
+    (INSERT ... SELECT, sin traer los IDs a Python).
+    """
+    connection.execute(
+        insert(ChangeLog).from_select(
+            ["entity", "entity_id", "op"],
+            select(literal(entity), cast(id_column, String), literal(op)).where(*conditions),
+        )
+    )
+    if isinstance(connection, Session):
+        queue_events(connection, [{"entity": entity, "id": None, "op": op}])  # Varias filas: id null
+
+
+@event.listens_for(Session, "after_flush")
+def _record_orm_changes(session, flush_context):
+    # Los cambios hechos con el ORM se registran en la misma transacción
+    rows = []
+    for objects, op in ((session.new, "insert"), (session.dirty, "update"), (session.deleted, "delete")):
+        for obj in objects:
+            entity = TRACKED_MODELS.get(type(obj))
+            if entity is None:
+                continue
+            if op == "update" and not session.is_modified(obj, include_collections=False):
+                continue
+            rows.append({"entity": entity, "entity_id": str(obj.id), "op": op})
+    if rows:
+        session.connection().execute(insert(ChangeLog), rows)
+        queue_events(session, [_event(row) for row in rows])
+
+
+def _event(row: dict) -> dict:
+    """Evento compacto para los clientes SSE (ver src/events.py)."""
+    return {"entity": row["entity"], "id": row["entity_id"], "op": row["op"]}
+
+
+# Lectura del feed
+
+def _visible_changes(after: tuple[int, int], limit: int):
+    query = select(ChangeLog).where(tuple_(ChangeLog.txid, ChangeLog.id) > tuple_(*after))
+    if engine.dialect.name == "postgresql":
+        # Sólo transacciones ya terminadas: los xid menores que el xmin de la instantánea
+        # no pueden confirmarse después, así que un cambio no puede aparecer detrás del cursor
+        query = query.where(ChangeLog.txid < text("pg_snapshot_xmin(pg_current_snapshot())::text::bigint"))
+    return query.order_by(ChangeLog.txid, ChangeLog.id).limit(limit)
+
+
+def head_cursor(db) -> str:
+    """
+    Cursor del último cambio visible (para empezar a seguir el feed después de una carga completa).
+    """
+    last = db.execute(
+        _visible_changes((-1, 0), 1).order_by(None).order_by(ChangeLog.txid.desc(), ChangeLog.id.desc())
+    ).scalar()
+    return encode_cursor(last.txid, last.id) if last else encode_cursor(-1, 0)
+
+
+def _current_rows(db, changes) -> dict:
+    """Estado actual de las filas cambiadas, con una consulta IN por entidad."""
+    wanted: dict[str, set] = {}
+    for change in changes:
+        if change.op != "delete":
+            wanted.setdefault(change.entity, set()).add(change.entity_id)
+    rows = {}
+    for entity, ids in wanted.items():
+        model, schema, options = _LOADERS[entity]
+        key_type = model.id.type.python_type
+        for obj in db.scalars(select(model).options(*options).where(model.id.in_([key_type(i) for i in ids]))):
+            rows[(entity, str(obj.id))] = schema.model_validate(obj).model_dump(mode="json")
+    return rows
+
+
+def stream_changes(after: tuple[int, int], limit: int):
+    """
+    Genera el feed como NDJSON: una línea por cambio, en el orden del registro, con
+    el cursor para retomar desde ese cambio, la operación y el estado actual de la
+    fila (`data`, null si ya no existe).
+
+    Usa su propia sesión (el generador se consume después de que termina el endpoint)
+    y lee por lotes de CHANGES_BATCH_SIZE.
+    """
+    db = SessionLocal()
+    try:
+        sent = 0
+        while sent < limit:
+            changes = db.scalars(_visible_changes(after, min(CHANGES_BATCH_SIZE, limit - sent))).all()
+            if not changes:
+                break
+            rows = _current_rows(db, changes)
+            lines = []
+            for change in changes:
+                lines.append(json.dumps({
+                    "cursor": encode_cursor(change.txid, change.id),
+                    "entity": change.entity,
+                    "id": change.entity_id,
+                    "op": change.op,
+                    "changed_at": change.changed_at.isoformat(),
+                    "data": rows.get((change.entity, change.entity_id)),
+                }, ensure_ascii=False))
+            yield ("\n".join(lines) + "\n").encode()
+            sent += len(changes)
+            after = (changes[-1].txid, changes[-1].id)
+            db.rollback()  # Nueva instantánea para el siguiente lote
+            db.expunge_all()
+    finally:
+        db.close()
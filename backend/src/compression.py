@@ -0,0 +1,239 @@
+import gzip
+import hashlib
+import os
+import zlib
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli  # Opcional: sin el paquete sólo se ofrece gzip
+except ImportError:
+    brotli = None
+
+load_dotenv()
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # Bytes; menos no vale la pena
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_CACHE_BYTES = int(os.getenv("COMPRESSION_CACHE_BYTES", str(32 * 1024 * 1024)))
+COMPRESSION_THREAD_MIN_SIZE = 256 * 1024  # Cuerpos más grandes se comprimen fuera del event loop
+# Las respuestas por partes se acumulan hasta este tamaño antes de decidir; si terminan
+# antes se tratan como respuesta completa (umbral y caché), si no se comprimen por partes
+COMPRESSION_BUFFER_BYTES = 1024 * 1024
+
+# Tipos que no se comprimen: ya comprimidos o que deben llegar sin demora (SSE)
+EXCLUDED_CONTENT_TYPES = ("text/event-stream", "image/", "video/", "audio/", "application/zip", "application/gzip")
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """
+    Elige la codificación según el encabezado Accept-Encoding (respeta q=0).
+    Prefiere brotli sobre gzip cuando ambas se aceptan con la misma calidad.
+    Returns:
+        str | None: "br", "gzip" o None si no se acepta ninguna.
+    """
+    accepted = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    wildcard = accepted.get("*", 0.0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_quality = None, 0.0
+    for encoding in candidates:
+        quality = accepted.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class PrecompressedCache:
+    """
+    Caché LRU de cuerpos ya comprimidos, indexada por hash del cuerpo y codificación.
+
+    Cuando se vuelve a servir la misma respuesta (p. ej. la misma página de un
+    listado), se reutiliza el cuerpo comprimido en lugar de volver a comprimir.
+    El tamaño total se limita a COMPRESSION_CACHE_BYTES.
+    """
+
+    def __init__(self, max_bytes: int = COMPRESSION_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[bytes, str], bytes] = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(body: bytes, encoding: str) -> tuple[bytes, str]:
+        # SHA-256: resistente a colisiones y acelerado por hardware en CPUs actuales
+        return hashlib.sha256(body).digest(), encoding
+
+    def get(self, key: tuple[bytes, str]) -> bytes | None:
+        compressed = self._entries.get(key)
+        if compressed is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return compressed
+
+    def put(self, key: tuple[bytes, str], compressed: bytes):
+        if len(compressed) > self.max_bytes or key in self._entries:
+            return
+        self._entries[key] = compressed
+        self._size += len(compressed)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+
+class _StreamCompressor:
+    """Compresión incremental para respuestas por partes (StreamingResponse)."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def process(self, chunk: bytes) -> bytes:
+        # Se vacía el compresor en cada parte para que el cliente reciba los datos sin esperar al final
+        if self.encoding == "br":
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI de compresión gzip/brotli negociada por Accept-Encoding.
+
+    Sólo comprime respuestas de al menos `minimum_size` bytes, que no traigan ya
+    Content-Encoding y cuyo tipo no esté excluido. Las respuestas completas pasan
+    por la caché de cuerpos comprimidos; las respuestas por partes se comprimen
+    de forma incremental.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE, cache: PrecompressedCache | None = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache = cache or PrecompressedCache()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream = send
+        self.start_message = None
+        self.mode = None  # None (acumulando), "passthrough" o "stream"
+        self.buffer = []
+        self.buffered = 0
+        self.stream = None
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.downstream(message)
+            return
+
+        if self.mode == "passthrough":
+            await self.downstream(message)
+            return
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.mode == "stream":
+            await self._send_stream(body, more_body)
+            return
+
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        if not self.buffer:
+            # Primer cuerpo: descartar lo que nunca se comprime
+            content_type = headers.get("content-type", "")
+            if (
+                "content-encoding" in headers
+                or self.start_message["status"] in (204, 304)
+                or any(content_type.startswith(excluded) for excluded in EXCLUDED_CONTENT_TYPES)
+            ):
+                self.mode = "passthrough"
+                await self.downstream(self.start_message)
+                await self.downstream(message)
+                return
+
+        self.buffer.append(body)
+        self.buffered += len(body)
+        if more_body and self.buffered < COMPRESSION_BUFFER_BYTES:
+            return
+
+        body = b"".join(self.buffer)
+        self.buffer = []
+        if not more_body and len(body) < self.middleware.minimum_size:
+            self.mode = "passthrough"
+            await self.downstream(self.start_message)
+            await self.downstream({"type": "http.response.body", "body": body, "more_body": False})
+            return
+
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+
+        if more_body:
+            self.mode = "stream"
+            self.stream = _StreamCompressor(self.encoding)
+            if "content-length" in headers:
+                del headers["Content-Length"]
+            await self.downstream(self.start_message)
+            await self._send_stream(body, True)
+            return
+
+        cache = self.middleware.cache
+        key = cache.key(body, self.encoding)
+        compressed = cache.get(key)
+        if compressed is None:
+            if len(body) >= COMPRESSION_THREAD_MIN_SIZE:
+                compressed = await run_in_threadpool(compress, body, self.encoding)
+            else:
+                compressed = compress(body, self.encoding)
+            cache.put(key, compressed)
+        headers["Content-Length"] = str(len(compressed))
+        self.mode = "passthrough"
+        await self.downstream(self.start_message)
+        await self.downstream({"type": "http.response.body", "body": compressed, "more_body": False})
+
+    async def _send_stream(self, body: bytes, more_body: bool):
+        chunk = self.stream.process(body)
+        if not more_body:
+            chunk += self.stream.finish()
+        await self.downstream({"type": "http.response.body", "body": chunk, "more_body": more_body})
@@ -1,15 +1,66 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+from fastapi import HTTPException, Request, status
+from starlette.concurrency import run_in_threadpool
 
 from dotenv import load_dotenv
+import asyncio
+import itertools
 import os
+import threading
+import time
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Tiempo máximo por sentencia de las rutas que usan db_session (PostgreSQL)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
 
-engine = create_engine(DATABASE_URL)  # ← ,echo True ¡Habilita logs!
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool que registra cuánto se esperó para obtener una conexión (pool lleno
+    o base de datos lenta para abrir conexiones). Lo usa el control de admisión
+    de src/load_shedding.py.
+
+    Cuenta también las esperas en curso: si los hilos siguen bloqueados esperando
+    una conexión, la espera informada crece aunque ninguno la haya obtenido todavía.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._max_wait = 0.0
+        self._waiting: dict[int, float] = {}  # Esperas en curso: id -> inicio (en orden de llegada)
+        self._waiting_lock = threading.Lock()
+        self._next_wait = itertools.count()
+
+    def _do_get(self):
+        wait_id = next(self._next_wait)
+        started = time.perf_counter()
+        with self._waiting_lock:
+            self._waiting[wait_id] = started
+        try:
+            return super()._do_get()
+        finally:
+            with self._waiting_lock:
+                del self._waiting[wait_id]
+                self._max_wait = max(self._max_wait, time.perf_counter() - started)
+
+    def take_max_wait(self) -> float:
+        """Mayor espera (segundos) desde la lectura anterior, incluidas las que siguen en curso."""
+        with self._waiting_lock:
+            max_wait, self._max_wait = self._max_wait, 0.0
+            oldest = next(iter(self._waiting.values()), None)
+        if oldest is not None:
+            max_wait = max(max_wait, time.perf_counter() - oldest)
+        return max_wait
+
+
+engine = create_engine(DATABASE_URL, poolclass=TimedQueuePool)  # ← ,echo True ¡Habilita logs!
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -24,4 +75,109 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# INSERT con soporte de ON CONFLICT según el motor de base de datos
+def dialect_insert(table):
+    """
+    Devuelve un INSERT del dialecto del motor en uso, con `on_conflict_do_nothing`
+    y `on_conflict_do_update` disponibles en PostgreSQL y SQLite.
+    """
+    if engine.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    if engine.dialect.name == "sqlite":
+        return sqlite.insert(table)
+    return insert(table)
+
+
+# Sesiones con tiempo máximo por sentencia y cancelación al desconectarse el cliente
+
+_cancel_lock = threading.Lock()
+
+
+@event.listens_for(Session, "after_begin")
+def _session_after_begin(session, transaction, connection):
+    timeout_ms = session.info.get("statement_timeout_ms")
+    if timeout_ms is None:
+        return  # Sesión común (get_db)
+    if connection.dialect.name == "postgresql":
+        # SET LOCAL: vale sólo para esta transacción; se repite en cada una
+        connection.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+    # Conexión DBAPI en uso, para poder cancelar la consulta desde otro hilo
+    with _cancel_lock:
+        session.info["dbapi_connection"] = connection.connection.dbapi_connection
+    connection.connection.info["session_info"] = session.info
+
+
+@event.listens_for(engine, "checkin")
+def _connection_checkin(dbapi_connection, connection_record):
+    # La conexión vuelve al pool: desde ahora puede usarla otra sesión y no debe cancelarse
+    session_info = connection_record.info.pop("session_info", None)
+    if session_info is not None:
+        with _cancel_lock:
+            session_info.pop("dbapi_connection", None)
+
+
+def cancel_session_query(session: Session):
+    """
+    Cancela la consulta que la sesión esté ejecutando, desde cualquier hilo.
+    La sesión recibe un error de la base de datos y, al cerrarse, su conexión
+    vuelve al pool.
+    """
+    with _cancel_lock:
+        session.info["cancelled"] = True
+        dbapi_connection = session.info.get("dbapi_connection")
+        if dbapi_connection is None:
+            return
+        if hasattr(dbapi_connection, "cancel"):  # psycopg2 / psycopg 3
+            dbapi_connection.cancel()
+        elif hasattr(dbapi_connection, "interrupt"):  # sqlite3
+            dbapi_connection.interrupt()
+
+
+async def _cancel_on_disconnect(request: Request, session: Session):
+    # Espera el aviso de desconexión del servidor ASGI (el cuerpo ya fue leído)
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            break
+    cancel_session_query(session)
+
+
+def _is_timeout(error: OperationalError) -> bool:
+    # 57014 = query_canceled (statement_timeout o cancelación)
+    return getattr(error.orig, "pgcode", None) == "57014" or "interrupted" in str(error.orig)
+
+
+def db_session(statement_timeout_ms: int = DB_STATEMENT_TIMEOUT_MS):
+    """
+    Dependencia como get_db, para rutas con consultas potencialmente costosas:
+
+    - En PostgreSQL cada sentencia tiene un tiempo máximo (`statement_timeout`);
+      si lo supera se responde 504.
+    - Si el cliente se desconecta mientras la consulta se ejecuta, se cancela en
+      la base de datos y la conexión vuelve al pool enseguida.
+
+    Las rutas que la usan deben ser `def` (se ejecutan en el threadpool), para que
+    el event loop quede libre y pueda detectar la desconexión.
+    Args:
+        statement_timeout_ms (int): Tiempo máximo por sentencia, en milisegundos.
+    """
+    async def dependency(request: Request):
+        db = SessionLocal()
+        db.info["statement_timeout_ms"] = statement_timeout_ms
+        watcher = asyncio.create_task(_cancel_on_disconnect(request, db))
+        try:
+            yield db
+        except OperationalError as e:
+            if db.info.get("cancelled") or not _is_timeout(e):
+                raise
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="La consulta superó el tiempo máximo permitido",
+            )
+        finally:
+            watcher.cancel()
+            await run_in_threadpool(db.close)
+
+    return dependency
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import os
+import select
+import threading
+
+from dotenv import load_dotenv
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from src.database import engine
+from src.logger import logger
+
+load_dotenv()
+
+SSE_CLIENT_BUFFER = int(os.getenv("SSE_CLIENT_BUFFER", "256"))         # Eventos en cola por cliente
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+# Puente LISTEN/NOTIFY de PostgreSQL: los eventos llegan a los clientes de todos los workers
+EVENTS_PG_NOTIFY = os.getenv("EVENTS_PG_NOTIFY", "false").lower() == "true" and engine.dialect.name == "postgresql"
+EVENTS_CHANNEL = "repa_changes"
+_NOTIFY_MAX_BYTES = 7000  # El payload de NOTIFY admite hasta 8000 bytes
+
+# Evento que reciben los clientes que se atrasaron: deben volver a consultar los listados
+RESYNC = {"type": "resync"}
+
+
+class Subscription:
+    """Cola acotada de un cliente SSE."""
+
+    def __init__(self, entities: set[str] | None):
+        self.entities = entities
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SSE_CLIENT_BUFFER)
+        self.dropped = 0
+
+    def offer(self, item):
+        if item is not None and self.entities and item.get("entity") not in self.entities:
+            return
+        if self.queue.full():
+            # Cliente lento: se descarta lo pendiente y se le pide que se resincronice,
+            # en lugar de acumular memoria sin límite o frenar a los demás clientes
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            if item is not None:
+                item = RESYNC
+        self.queue.put_nowait(item)
+
+
+class EventBroker:
+    """
+    Pub/sub en proceso para los eventos de cambios (usuarios, cursos y datos personales).
+
+    `publish` puede llamarse desde cualquier hilo (los endpoints síncronos corren en
+    el threadpool); el reparto a las colas de los clientes se hace en el event loop.
+    """
+
+    def __init__(self):
+        self._subscriptions: set[Subscription] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._listener: threading.Thread | None = None
+        self._stopping = threading.Event()
+
+    def subscribe(self, entities: set[str] | None = None) -> Subscription:
+        subscription = Subscription(entities)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+
+    def publish(self, events: list[dict]):
+        if self._loop is None or not events:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._fanout, events)
+        except RuntimeError:
+            pass  # Event loop cerrado (apagado)
+
+    def _fanout(self, events: list[dict]):
+        for subscription in list(self._subscriptions):
+            for item in events:
+                subscription.offer(item)
+
+    # Puente LISTEN/NOTIFY
+
+    def _listen(self):
+        delay = 1.0
+        while not self._stopping.is_set():
+            raw = None
+            try:
+                raw = engine.raw_connection()
+                raw.detach()  # Conexión propia: no vuelve al pool con el LISTEN activo
+                conn = raw.driver_connection
+                conn.autocommit = True
+                cursor = conn.cursor()
+                cursor.execute(f"LISTEN {EVENTS_CHANNEL}")
+                delay = 1.0
+                while not self._stopping.is_set():
+                    for payload in self._wait_notifies(conn):
+                        self.publish(json.loads(payload))
+            except Exception as e:
+                logger.error(f"Error en LISTEN {EVENTS_CHANNEL}: {e}; reintentando en {delay:.0f}s")
+                self._stopping.wait(delay)
+                delay = min(delay * 2, 60.0)
+            finally:
+                if raw is not None:
+                    try:
+                        raw.close()
+                    except Exception:
+                        pass
+
+    @staticmethod
+    def _wait_notifies(conn, timeout: float = 1.0) -> list[str]:
+        if hasattr(conn, "poll"):  # psycopg2
+            if select.select([conn], [], [], timeout) != ([], [], []):
+                conn.poll()
+            payloads = [notify.payload for notify in conn.notifies]
+            conn.notifies.clear()
+            return payloads
+        return [notify.payload for notify in conn.notifies(timeout=timeout)]  # psycopg 3
+
+    def start(self):
+        """
+        Toma el event loop para el reparto y, con EVENTS_PG_NOTIFY, inicia el hilo
+        que escucha las notificaciones (llamar desde el evento startup).
+        """
+        self._loop = asyncio.get_running_loop()
+        if EVENTS_PG_NOTIFY and self._listener is None:
+            self._stopping.clear()
+            self._listener = threading.Thread(target=self._listen, name="events-listen", daemon=True)
+            self._listener.start()
+
+    async def stop(self):
+        """
+        Cierra las suscripciones abiertas y detiene el hilo de escucha (llamar desde el evento shutdown).
+        """
+        self._fanout([None])  # None: fin del stream para cada cliente
+        self._loop = None
+        if self._listener is not None:
+            self._stopping.set()
+            listener, self._listener = self._listener, None
+            await asyncio.to_thread(listener.join, 5)
+
+
+event_broker = EventBroker()
+
+
+# Emisión desde las transacciones
+
+def queue_events(session: Session, events: list[dict]):
+    """
+    Agrega eventos a la transacción en curso de la sesión. Se publican sólo si la
+    transacción se confirma (ver los listeners de más abajo).
+    """
+    session.info.setdefault("pending_events", []).extend(events)
+
+
+def _notify_payloads(events: list[dict]):
+    # Varios eventos por NOTIFY, sin pasar el límite de tamaño del payload
+    batch, size = [], 2
+    for item in events:
+        encoded = json.dumps(item, separators=(",", ":"))
+        if batch and size + len(encoded) + 1 > _NOTIFY_MAX_BYTES:
+            yield "[" + ",".join(batch) + "]"
+            batch, size = [], 2
+        batch.append(encoded)
+        size += len(encoded) + 1
+    if batch:
+        yield "[" + ",".join(batch) + "]"
+
+
+@event.listens_for(Session, "before_commit")
+def _notify_before_commit(session):
+    # NOTIFY es transaccional: PostgreSQL lo entrega a todos los workers (incluido
+    # éste) recién cuando la transacción se confirma
+    if not EVENTS_PG_NOTIFY:
+        return
+    session.flush()  # Los cambios aún sin enviar también generan sus eventos antes del NOTIFY
+    if session.info.get("pending_events"):
+        connection = session.connection()
+        for payload in _notify_payloads(session.info.pop("pending_events")):
+            connection.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": EVENTS_CHANNEL, "payload": payload})
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session):
+    events = session.info.pop("pending_events", None)
+    if events:
+        event_broker.publish(events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("pending_events", None)
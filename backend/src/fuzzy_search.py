@@ -0,0 +1,172 @@
+import os
+import re
+from functools import lru_cache
+
+from dotenv import load_dotenv
+from sqlalchemy import event, func, select, text
+
+from src.database import engine
+from src.logger import logger
+from src.lookups import lookup_cache
+from src.models.lookup_models import TrainingLookup
+from src.models.training_models import Training, normalize_text
+from src.models.user_models import User
+
+load_dotenv()
+
+# Similitud mínima (0 a 1) para considerar que un texto coincide con la búsqueda
+FUZZY_SEARCH_THRESHOLD = float(os.getenv("FUZZY_SEARCH_THRESHOLD", "0.3"))
+FUZZY_SEARCH_MAX_RESULTS = 100
+
+_LOCK_KEY = 0x7472_676D  # Advisory lock: un solo proceso crea los índices a la vez
+
+# Índices GIN de trigramas sobre el texto normalizado (sin acentos y en minúsculas).
+# Las instituciones se buscan en training_lookups, que tiene un valor por institución.
+SEARCH_INDEXES = {
+    "ix_users_email_trgm": "users USING gin (f_unaccent(lower(email)) gin_trgm_ops)",
+    "ix_trainings_nombre_curso_trgm": "trainings USING gin (f_unaccent(lower(nombre_curso)) gin_trgm_ops)",
+    "ix_training_lookups_institucion_trgm": (
+        "training_lookups USING gin (f_unaccent(lower(value)) gin_trgm_ops) WHERE kind = 'institucion'"
+    ),
+}
+
+
+def ensure_search_indexes() -> list[str]:
+    """
+    Instala pg_trgm y unaccent y crea los índices de búsqueda que falten (sólo PostgreSQL).
+
+    `unaccent` no es IMMUTABLE y no puede usarse en un índice; se envuelve en
+    `f_unaccent`, que fija el diccionario y sí lo es.
+    Returns:
+        list[str]: Índices creados.
+    """
+    if engine.dialect.name != "postgresql":
+        return []
+    created = []
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _LOCK_KEY})
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+        conn.execute(text(
+            "CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text "
+            "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT "
+            "AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$"
+        ))
+        for name, definition in SEARCH_INDEXES.items():
+            if conn.scalar(text("SELECT to_regclass(:name)"), {"name": name}) is None:
+                conn.execute(text(f"CREATE INDEX {name} ON {definition}"))
+                created.append(name)
+    if created:
+        logger.info(f"Índices de búsqueda creados: {', '.join(created)}")
+    return created
+
+
+# Motor alternativo para SQLite: las mismas funciones, implementadas en Python.
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+@lru_cache(maxsize=65536)
+def _word_trigrams(word: str) -> frozenset:
+    # Como pg_trgm: cada palabra con dos espacios delante y uno detrás
+    padded = f"  {word} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _unaccent(value):
+    return None if value is None else normalize_text(value)
+
+
+def strict_word_similarity(query, value) -> float:
+    """
+    Equivalente de `strict_word_similarity` de pg_trgm: la mayor similitud de
+    trigramas entre la búsqueda y un tramo de palabras consecutivas del texto.
+    """
+    if not query or not value:
+        return 0.0
+    query_trigrams = frozenset().union(*map(_word_trigrams, _WORD.findall(query)))
+    if not query_trigrams:
+        return 0.0
+    words = [_word_trigrams(word) for word in _WORD.findall(value)]
+    best = 0.0
+    for start in range(len(words)):
+        extent = set()
+        for trigrams in words[start:]:
+            extent |= trigrams
+            shared = len(query_trigrams & extent)
+            best = max(best, shared / (len(query_trigrams) + len(extent) - shared))
+            if best == 1.0:
+                return best
+    return best
+
+
+@event.listens_for(engine, "connect")
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    if engine.dialect.name == "sqlite":
+        dbapi_connection.create_function("f_unaccent", 1, _unaccent, deterministic=True)
+        dbapi_connection.create_function("strict_word_similarity", 2, strict_word_similarity, deterministic=True)
+
+
+def _match(db, column, query: str):
+    """
+    Condición y puntaje de similitud de `column` con la búsqueda.
+    En PostgreSQL la condición usa el operador `%>>`, que resuelve el índice GIN.
+    """
+    normalized = func.f_unaccent(func.lower(column))
+    score = func.strict_word_similarity(query, normalized)
+    if engine.dialect.name == "postgresql":
+        db.execute(
+            text("SELECT set_config('pg_trgm.strict_word_similarity_threshold', :threshold, true)"),
+            {"threshold": str(FUZZY_SEARCH_THRESHOLD)},
+        )
+        return normalized.op("%>>")(query), score
+    return score >= FUZZY_SEARCH_THRESHOLD, score
+
+
+def search_users(db, query: str, limit: int) -> list:
+    """
+    Usuarios cuyo email se parece a la búsqueda, del más al menos parecido.
+    Returns:
+        list: Filas `(User, score)`.
+    """
+    condition, score = _match(db, User.email, normalize_text(query))
+    return db.execute(
+        select(User, score.label("score")).where(condition).order_by(score.desc(), User.email).limit(limit)
+    ).all()
+
+
+def search_trainings(db, query: str, field: str, limit: int) -> list:
+    """
+    Cursos cuyo `nombre_curso` o `institucion` se parece a la búsqueda, del más al menos parecido.
+
+    Para `institucion` primero se buscan las instituciones parecidas en
+    training_lookups (una fila por institución) y después se toman sus cursos,
+    institución por institución, hasta completar `limit`.
+    Returns:
+        list: Filas `(Training, score)`.
+    """
+    query = normalize_text(query)
+    if field == "nombre_curso":
+        condition, score = _match(db, Training.nombre_curso, query)
+        return db.execute(
+            select(Training, score.label("score")).where(condition).order_by(score.desc(), Training.id).limit(limit)
+        ).all()
+
+    condition, score = _match(db, TrainingLookup.value, query)
+    institutions = db.execute(
+        select(TrainingLookup.id, TrainingLookup.kind, TrainingLookup.value, score)
+        .where(TrainingLookup.kind == "institucion", condition)
+        .order_by(score.desc(), TrainingLookup.value)
+        .limit(limit)
+    ).all()
+    # Las instituciones pueden ser nuevas para la caché de este proceso
+    lookup_cache.remember([(lookup_id, kind, value) for lookup_id, kind, value, _ in institutions])
+    results = []
+    for _, _, institucion, institution_score in institutions:
+        trainings = db.scalars(
+            select(Training).where(Training.institucion == institucion).order_by(Training.id).limit(limit - len(results))
+        ).all()
+        results.extend((training, institution_score) for training in trainings)
+        if len(results) >= limit:
+            break
+    return results
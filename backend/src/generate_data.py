@@ -0,0 +1,388 @@
+"""
+Generador de datos sintéticos para dimensionar índices, paginación y cachés.
+
+Genera usuarios, roles de usuario, cursos y datos personales de forma
+determinística a partir de una semilla y los envía directamente a la base de
+datos: con `COPY ... FROM STDIN` en PostgreSQL y con `executemany` por lotes en
+SQLite. Los datos se generan por bloques, nunca se arma la tabla completa en
+memoria.
+
+Uso:
+    python -m src.generate_data --users 1000000 --seed 42
+    python -m src.generate_data --users 100000 --offset 1000000 --trainings-per-user 5
+"""
+import argparse
+import random
+import time
+from operator import mul
+from datetime import date, datetime, timedelta
+
+from src.database import engine
+from src.models import person_model  # Registra Person antes de configurar el ORM
+from src.models.training_models import Training, training_fingerprint
+from src.lookups import LookupString, lookup_cache
+from src.partitioning import ensure_training_partitions
+from src.role_registry import role_registry
+from src.seed import seed_data
+from src.utils import get_password_hash
+
+# Contraseña común de todos los usuarios generados (un único hash bcrypt)
+DEFAULT_PASSWORD = "Repa2025"
+CHUNK_SIZE = 50_000
+COPY_BUFFER_SIZE = 1 << 20
+
+NOMBRES = [
+    "María", "José", "Ana", "Juan", "Lucía", "Carlos", "Sofía", "Martín", "Valentina", "Diego",
+    "Camila", "Federico", "Julieta", "Santiago", "Florencia", "Matías", "Agustina", "Nicolás",
+    "Milagros", "Facundo", "Carolina", "Joaquín", "Paula", "Tomás", "Rocío", "Ramiro", "Belén",
+]
+APELLIDOS = [
+    "González", "Rodríguez", "Gómez", "Fernández", "López", "Díaz", "Martínez", "Pérez",
+    "García", "Sánchez", "Romero", "Sosa", "Álvarez", "Torres", "Ruiz", "Ramírez", "Flores",
+    "Acosta", "Benítez", "Medina", "Suárez", "Herrera", "Aguirre", "Pereyra", "Gutiérrez",
+]
+DOMINIOS = ["gmail.com", "hotmail.com", "yahoo.com.ar", "outlook.com", "fibertel.com.ar"]
+
+TEMAS_CURSO = [
+    "Guion Cinematográfico", "Dirección de Fotografía", "Montaje y Edición", "Sonido Directo",
+    "Producción Audiovisual", "Animación 2D", "Animación 3D", "Efectos Visuales",
+    "Dirección de Actores", "Documental", "Colorización Digital", "Realización de Series",
+    "Producción Ejecutiva", "Cine Comunitario", "Posproducción de Sonido", "Iluminación",
+    "Gestión Cultural", "Distribución y Exhibición", "Narrativas Transmedia", "Videojuegos",
+]
+PREFIJOS_CURSO = ["Taller de", "Curso de", "Seminario de", "Diplomatura en", "Introducción a", "Especialización en"]
+INSTITUCIONES = [
+    "Universidad Nacional de Córdoba", "Universidad de Buenos Aires", "Universidad Nacional de La Plata",
+    "Universidad Nacional de Rosario", "Universidad Nacional de Cuyo", "Universidad Nacional de Tucumán",
+    "ENERC", "Instituto de Arte Cinematográfico de Avellaneda", "Escuela de Cine de Rosario",
+    "Universidad del Cine", "INCAA", "Universidad Nacional de las Artes", "Instituto Audiovisual de Misiones",
+    "Universidad Nacional del Litoral", "Escuela Provincial de Cine y TV de Rosario",
+]
+TIPOS_CERTIFICADO = ["Asistencia", "Aprobación", "Participación", "Título", "Diploma"]
+NIVELES_ESTUDIO = ["Curso", "Taller", "Pregrado", "Grado", "Posgrado", "Diplomatura"]
+AREAS_CONOCIMIENTO = ["Audiovisual", "Artes", "Tecnología", "Comunicación", "Gestión", "Educación"]
+IDIOMAS = ["es", "es", "es", "es", "en", "pt", "fr", "it"]
+NOTAS = ["Aprobado", "Sobresaliente", "Distinguido", "Bueno", "10", "9", "8", "7"]
+PROVINCIAS = {
+    "Buenos Aires": ["La Plata", "Mar del Plata", "Bahía Blanca", "Tandil", "Avellaneda"],
+    "Ciudad Autónoma de Buenos Aires": ["Palermo", "Caballito", "Almagro", "San Telmo"],
+    "Córdoba": ["Córdoba", "Villa María", "Río Cuarto", "Carlos Paz"],
+    "Santa Fe": ["Rosario", "Santa Fe", "Rafaela", "Venado Tuerto"],
+    "Mendoza": ["Mendoza", "San Rafael", "Godoy Cruz"],
+    "Tucumán": ["San Miguel de Tucumán", "Tafí Viejo", "Yerba Buena"],
+    "Misiones": ["Posadas", "Oberá", "Eldorado", "Puerto Iguazú"],
+    "Neuquén": ["Neuquén", "San Martín de los Andes", "Zapala"],
+    "Salta": ["Salta", "Tartagal", "Cafayate"],
+    "Chubut": ["Rawson", "Trelew", "Puerto Madryn", "Esquel"],
+}
+IDENTIDADES_GENERO = ["Mujer", "Mujer trans", "Varón", "Varón Trans", "Prefiero no decirlo"]
+ESTADOS_CIVILES = ["Solter@", "Casad@", "Viud@", "Divorciad@", "En unión de hecho", "En unión convivencial"]
+NIVELES_EDUCACION = [
+    "PRIMARIO", "EGB", "SECUNDARIO", "POLIMODAL", "TERCIARIO NO UNIVERSITARIO",
+    "UNIVERSITARIO DE GRADO", "POSGRADO",
+]
+TIPOS_CONTRIBUYENTE = ["Monotributista", "Responsable Inscripto", "Exento", "Relación de dependencia"]
+ACTIVIDADES = ["Dirección", "Producción", "Guion", "Fotografía", "Montaje", "Sonido", "Arte", "Actuación"]
+CALLES = ["San Martín", "Belgrano", "Rivadavia", "Sarmiento", "Mitre", "Moreno", "Urquiza", "Colón"]
+
+
+def _user_id(seed: int, index: int) -> str:
+    """UUID determinístico a partir de la semilla y el índice del usuario."""
+    return f"{seed & 0xFFFFFFFF:08x}-0000-4000-8000-{index:012x}"
+
+
+def _user_email(seed: int, index: int) -> str:
+    return f"usuario{seed}.{index}@{DOMINIOS[index % len(DOMINIOS)]}"
+
+
+def _weighted(digits: str, pesos: tuple) -> int:
+    return sum(map(mul, map(int, digits), pesos))
+
+
+# Sumas ponderadas precalculadas del dígito verificador (pesos 5,4 | 3,2,7,6 | 5,4,3,2):
+# prefijo (2 dígitos) + mitad alta del DNI + mitad baja del DNI
+_CUIL_ALTA = [_weighted(f"{n:04d}", (3, 2, 7, 6)) for n in range(10_000)]
+_CUIL_BAJA = [_weighted(f"{n:04d}", (5, 4, 3, 2)) for n in range(10_000)]
+_CUIL_PREFIJO = {prefijo: _weighted(str(prefijo), (5, 4)) for prefijo in (20, 23, 27)}
+
+
+def _cuil(dni: int, prefijo: int) -> str:
+    """Calcula el CUIT/CUIL con su dígito verificador."""
+    alta, baja = divmod(dni, 10_000)
+    total = _CUIL_PREFIJO[prefijo] + _CUIL_ALTA[alta] + _CUIL_BAJA[baja]
+    verificador = 11 - (total % 11)
+    if verificador == 11:
+        verificador = 0
+    elif verificador == 10:
+        return _cuil(dni, 23) if prefijo != 23 else f"23-{dni:08d}-9"
+    return f"{prefijo:02d}-{dni:08d}-{verificador}"
+
+
+# Generadores por tabla: cada uno produce bloques de filas (tuplas) de a CHUNK_SIZE
+def users_chunks(seed: int, offset: int, count: int, hashed_password: str):
+    rng = random.Random(f"{seed}-users")
+    epoch = datetime(2023, 1, 1)
+    for start in range(offset, offset + count, CHUNK_SIZE):
+        n = min(CHUNK_SIZE, offset + count - start)
+        created = [epoch + timedelta(seconds=s) for s in rng.choices(range(3 * 365 * 86400), k=n)]
+        login_delay = rng.choices(range(90 * 86400), k=n)
+        active = rng.choices((True, False), weights=(95, 5), k=n)
+        with_login = rng.choices((True, False), weights=(70, 30), k=n)
+        yield [
+            (
+                _user_id(seed, i),
+                _user_email(seed, i),
+                hashed_password,
+                active[j],
+                created[j],
+                created[j] + timedelta(seconds=login_delay[j]) if with_login[j] else None,
+            )
+            for j, i in enumerate(range(start, start + n))
+        ]
+
+
+def user_roles_chunks(seed: int, offset: int, count: int, role_ids: dict):
+    user_role, admin_role = role_ids["user"], role_ids["admin"]
+    for start in range(offset, offset + count, CHUNK_SIZE):
+        rows = []
+        for i in range(start, min(start + CHUNK_SIZE, offset + count)):
+            rows.append((_user_id(seed, i), user_role))
+            # Uno de cada mil usuarios es administrador
+            if i % 1000 == 0:
+                rows.append((_user_id(seed, i), admin_role))
+        yield rows
+
+
+def _training_profiles(rng: random.Random, size: int) -> list:
+    """
+    Combinaciones precalculadas de los atributos de texto de un curso, en el
+    orden de TRAININGS_COLUMNS. Cada fila sortea una combinación con un único
+    `choices` en lugar de sortear columna por columna.
+    """
+    cursos = [(f"{p} {t}", f"Programa de {t}") for p in PREFIJOS_CURSO for t in TEMAS_CURSO]
+    lugares = [(localidad, provincia) for provincia, localidades in PROVINCIAS.items() for localidad in localidades]
+    profiles = []
+    for (curso, programa), institucion, certificado, nivel, area, nota, idioma, nombre, apellido, \
+            (localidad, provincia) in zip(
+            rng.choices(cursos, k=size), rng.choices(INSTITUCIONES, k=size), rng.choices(TIPOS_CERTIFICADO, k=size),
+            rng.choices(NIVELES_ESTUDIO, k=size), rng.choices(AREAS_CONOCIMIENTO, k=size), rng.choices(NOTAS, k=size),
+            rng.choices(IDIOMAS, k=size), rng.choices(NOMBRES, k=size), rng.choices(APELLIDOS, k=size),
+            rng.choices(lugares, k=size)):
+        profiles.append((
+            curso, institucion, certificado, nivel, area, f"{curso} dictado por {institucion}.", nota, idioma,
+            f"{nombre} {apellido}", programa, "Argentina", localidad, provincia, "",
+        ))
+    return profiles
+
+
+def _intern_profiles(profiles: list) -> list:
+    """
+    Reemplaza en los perfiles los textos de las columnas normalizadas (LookupString)
+    por su ID en training_lookups, creando los valores que falten.
+    """
+    lookup_columns = {column.name for column in Training.__table__.columns if isinstance(column.type, LookupString)}
+    positions = [(i, column) for i, column in enumerate(TRAININGS_COLUMNS) if column in lookup_columns]
+    ids = {column: lookup_cache.intern(column, {profile[i] for profile in profiles}) for i, column in positions}
+    interned = []
+    for profile in profiles:
+        profile = list(profile)
+        for i, column in positions:
+            profile[i] = ids[column][profile[i]]
+        interned.append(tuple(profile))
+    return interned
+
+
+def trainings_chunks(seed: int, offset: int, count: int, per_user: int):
+    rng = random.Random(f"{seed}-trainings")
+    counts_pool = range(per_user + 1)
+    raw_profiles = _training_profiles(rng, 1 << 16)
+    # Cada perfil con (nombre_curso, institucion) en texto, para calcular la huella
+    profiles = list(zip(_intern_profiles(raw_profiles), [(profile[0], profile[1]) for profile in raw_profiles]))
+    dias = [(date(2000, 1, 1) + timedelta(days=d)).isoformat() for d in range(27 * 365 + 720)]
+    serial = offset * (per_user + 1)  # Enlaces únicos también entre cargas con distinto offset
+    for start in range(offset, offset + count, CHUNK_SIZE):
+        n_users = min(CHUNK_SIZE, offset + count - start)
+        per = rng.choices(counts_pool, k=n_users)
+        owners = [_user_id(seed, i) for i, c in zip(range(start, start + n_users), per) for _ in range(c)]
+        n = len(owners)
+        if not n:
+            continue
+        rows = []
+        seen = set()
+        for (profile, (curso, institucion)), inicio, duracion, horas, owner in zip(
+                rng.choices(profiles, k=n), rng.choices(range(26 * 365), k=n), rng.choices(range(7, 720), k=n),
+                rng.choices(range(8, 400), k=n), owners):
+            serial += 1
+            fingerprint = training_fingerprint(owner, curso, institucion, dias[inicio], dias[inicio + duracion])
+            if fingerprint in seen:  # Curso repetido para el mismo usuario: lo rechazaría el índice único
+                continue
+            seen.add(fingerprint)
+            rows.append(profile + (
+                dias[inicio], dias[inicio + duracion], horas, f"https://certificados.repa.ar/{seed}/{serial}", owner,
+                fingerprint,
+            ))
+        yield rows
+
+
+def _person_profiles(rng: random.Random, size: int) -> list:
+    """
+    Combinaciones precalculadas de los atributos de una persona que no deben ser
+    únicos, en el orden de PERSONS_COLUMNS (ver `_training_profiles`).
+    """
+    lugares = [(localidad, provincia) for provincia, localidades in PROVINCIAS.items() for localidad in localidades]
+    profiles = []
+    for nombre, apellido, genero, civil, educacion, contribuyente, actividad, calle, numero, \
+            (localidad, provincia), a_cargo in zip(
+            rng.choices(NOMBRES, k=size), rng.choices(APELLIDOS, k=size),
+            rng.choices(IDENTIDADES_GENERO, weights=(45, 3, 45, 2, 5), k=size),
+            rng.choices(ESTADOS_CIVILES, k=size), rng.choices(NIVELES_EDUCACION, k=size),
+            rng.choices(TIPOS_CONTRIBUYENTE, k=size), rng.choices(ACTIVIDADES, k=size), rng.choices(CALLES, k=size),
+            rng.choices(range(1, 5000), k=size), rng.choices(lugares, k=size), rng.choices(range(4), k=size)):
+        profiles.append((
+            nombre, apellido, "Argentina", genero, False, None, civil, educacion, None, None, a_cargo,
+            contribuyente, actividad, calle, str(numero), None, None, str(1000 + numero % 8000),
+            localidad, localidad, provincia, "Argentina",
+        ))
+    return profiles
+
+
+def persons_chunks(seed: int, offset: int, count: int):
+    rng = random.Random(f"{seed}-persons")
+    profiles = _person_profiles(rng, 1 << 16)
+    dias = [(date(1950, 1, 1) + timedelta(days=d)).isoformat() for d in range(55 * 365)]
+    for start in range(offset, offset + count, CHUNK_SIZE):
+        n = min(CHUNK_SIZE, offset + count - start)
+        rows = []
+        for i, profile, nacimiento in zip(
+                range(start, start + n), rng.choices(profiles, k=n), rng.choices(dias, k=n)):
+            # DNI único por índice; el prefijo del CUIL depende del género
+            dni = 10_000_000 + i
+            rows.append(profile + (
+                _user_email(seed, i),
+                _cuil(dni, 27 if profile[3].startswith("Mujer") else 20),
+                nacimiento,
+                f"+54 9 11 {40_000_000 + i % 60_000_000}",
+            ))
+        yield rows
+
+
+USERS_COLUMNS = ("id", "email", "hashed_password", "is_active", "created_at", "last_login")
+USER_ROLES_COLUMNS = ("user_id", "role_id")
+TRAININGS_COLUMNS = (
+    "nombre_curso", "institucion", "tipo_certificado", "nivel_estudio", "area_conocimiento",
+    "descripcion_curso", "calificacion_nota", "idioma", "nombre_profesor_instructor",
+    "nombre_programa_estudios", "pais", "ciudad", "estado_provincia", "observaciones",
+    "fecha_inicio", "fecha_finalizacion", "horas_duracion", "enlace_certificado", "user_id", "fingerprint",
+)
+PERSONS_COLUMNS = (
+    "nombre", "apellido", "nacionalidad", "identidad_genero", "etnia", "etnia_nombre", "estado_civil",
+    "educacion_nivel", "educacion_titulo", "educacion_institucion", "personas_a_cargo",
+    "tipo_contribuyente", "actividad_registrada", "dir_calle", "dir_numero", "dir_piso",
+    "dir_letra_nro_depto", "dir_cp", "dir_localidad", "dir_departamento", "dir_provincia", "dir_pais",
+    "user_email", "dni_cuit_cuil", "fecha_nacimiento", "telefono",
+)
+
+
+class _CopyStream:
+    """
+    Objeto tipo archivo que `copy_expert` consume con `read(size)`.
+    Convierte los bloques de filas a formato texto de COPY a medida que se leen:
+    cada fila se formatea con una plantilla `%s` y los `None` pasan a `\\N`
+    (los textos generados nunca valen "None"; los booleanos quedan como
+    True/False, que PostgreSQL acepta).
+    """
+
+    def __init__(self, chunks, columns: int, counter: list):
+        self._chunks = iter(chunks)
+        self._template = "\t".join(["%s"] * columns)
+        self._buffer = memoryview(b"")
+        self._counter = counter
+
+    def _fill(self) -> bool:
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return False
+        self._counter[0] += len(chunk)
+        template = self._template
+        lines = "\n".join([template % row for row in chunk]) + "\n"
+        for _ in range(2):  # Dos pasadas para cubrir columnas nulas consecutivas
+            lines = lines.replace("\tNone\t", "\t\\N\t")
+        lines = lines.replace("\tNone\n", "\t\\N\n")
+        self._buffer = memoryview(lines.encode("utf-8"))
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        # Se entrega como máximo lo que queda del bloque actual, sin concatenar buffers
+        if not len(self._buffer) and not self._fill():
+            return b""
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return bytes(data)
+
+
+def _load(connection, table: str, columns: tuple, chunks) -> int:
+    """
+    Carga los bloques en la tabla y devuelve la cantidad de filas insertadas.
+    """
+    cursor = connection.cursor()
+    if engine.dialect.name == "postgresql":
+        counter = [0]
+        stream = _CopyStream(chunks, len(columns), counter)
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", stream, size=COPY_BUFFER_SIZE)
+        total = counter[0]
+    else:
+        placeholders = ", ".join("?" for _ in columns)
+        statement = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+        total = 0
+        for chunk in chunks:
+            cursor.executemany(statement, chunk)
+            total += len(chunk)
+    connection.commit()
+    cursor.close()
+    return total
+
+
+def generate(users: int, seed: int = 42, offset: int = 0, trainings_per_user: int = 4, persons: bool = True):
+    """
+    Genera y carga los datos sintéticos.
+    Args:
+        users (int): Cantidad de usuarios a generar.
+        seed (int): Semilla para obtener siempre los mismos datos.
+        offset (int): Índice del primer usuario (para agregar datos a una carga previa).
+        trainings_per_user (int): Máximo de cursos por usuario (se sortea entre 0 y este valor).
+        persons (bool): Generar también los datos personales de cada usuario.
+    """
+    seed_data()  # Asegura las tablas y los roles base
+    ensure_training_partitions()
+    role_ids = {rol: role_registry.id_of(rol) for rol in ("user", "admin")}
+
+    hashed_password = get_password_hash(DEFAULT_PASSWORD)
+    plan = [
+        ("users", USERS_COLUMNS, users_chunks(seed, offset, users, hashed_password)),
+        ("user_roles", USER_ROLES_COLUMNS, user_roles_chunks(seed, offset, users, role_ids)),
+        ("trainings", TRAININGS_COLUMNS, trainings_chunks(seed, offset, users, trainings_per_user)),
+    ]
+    if persons:
+        plan.append(("persons", PERSONS_COLUMNS, persons_chunks(seed, offset, users)))
+
+    connection = engine.raw_connection()
+    try:
+        for table, columns, chunks in plan:
+            started = time.perf_counter()
+            total = _load(connection, table, columns, chunks)
+            elapsed = time.perf_counter() - started
+            print(f"{table}: {total} filas en {elapsed:.1f}s ({total / elapsed:,.0f} filas/s)")
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generador de datos sintéticos para RePA")
+    parser.add_argument("--users", type=int, default=100_000, help="Cantidad de usuarios a generar")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla del generador")
+    parser.add_argument("--offset", type=int, default=0, help="Índice del primer usuario")
+    parser.add_argument("--trainings-per-user", type=int, default=4, help="Máximo de cursos por usuario")
+    parser.add_argument("--no-persons", action="store_true", help="No generar datos personales")
+    args = parser.parse_args()
+    generate(args.users, args.seed, args.offset, args.trainings_per_user, not args.no_persons)
@@ -0,0 +1,226 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+from fastapi.responses import JSONResponse
+from jose import JWTError, jwt
+
+load_dotenv()
+
+IDEMPOTENCY_ENABLED = os.getenv("IDEMPOTENCY_ENABLED", "true").lower() == "true"
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))   # Tiempo que se guarda cada respuesta
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))     # Tope de respuestas en memoria
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "30"))    # Espera de un reintento por la solicitud en curso
+IDEMPOTENCY_MAX_BODY_BYTES = 1024 * 1024  # Respuestas más grandes no se guardan
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+SECRET_KEY = os.getenv("SECRET_KEY")
+ALGORITHM = os.getenv("ALGORITHM")
+
+IDEMPOTENT_METHODS = {"POST", "PUT", "PATCH"}
+HEADER = b"idempotency-key"
+REPLAYED_HEADER = (b"idempotent-replayed", b"true")
+
+
+class _Entry:
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint     # Hash del cuerpo de la solicitud original
+        self.done = asyncio.Event()        # Se marca al terminar la solicitud original
+        self.response: tuple[int, list, bytes] | None = None  # (status, headers, cuerpo)
+        self.expires = 0.0
+
+
+class IdempotencyStore:
+    """
+    Respuestas guardadas por Idempotency-Key, en memoria y con vencimiento:
+    `clave -> _Entry`.
+
+    Mientras la solicitud original está en curso la entrada existe sin respuesta y
+    los reintentos esperan a que termine. Como la denylist de tokens, el almacén es
+    por proceso: con varios workers, un reintento que llega a otro worker se ejecuta
+    de nuevo.
+    """
+
+    def __init__(self, ttl: float = IDEMPOTENCY_TTL_SECONDS, max_entries: int = IDEMPOTENCY_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+
+    def get(self, key: str) -> _Entry | None:
+        entry = self._entries.get(key)
+        if entry is not None and entry.response is not None and entry.expires <= time.monotonic():
+            del self._entries[key]
+            return None
+        return entry
+
+    def begin(self, key: str, fingerprint: str) -> _Entry:
+        """Registra una solicitud en curso para la clave."""
+        self._purge()
+        entry = self._entries[key] = _Entry(fingerprint)
+        return entry
+
+    def complete(self, key: str, entry: _Entry, response: tuple[int, list, bytes] | None):
+        """
+        Guarda la respuesta de la solicitud original (o descarta la entrada si no se
+        puede guardar) y despierta a los reintentos que la esperan.
+        """
+        if response is None:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+        else:
+            entry.response = response
+            entry.expires = time.monotonic() + self.ttl
+        entry.done.set()
+
+    def _purge(self):
+        # Se borran las vencidas y, pasado el tope, las más viejas (las entradas se
+        # agregan en orden); las que están en curso se conservan
+        now = time.monotonic()
+        excess = len(self._entries) - self.max_entries + 1
+        for key, entry in list(self._entries.items()):
+            if entry.response is None:
+                continue
+            if entry.expires <= now or excess > 0:
+                del self._entries[key]
+                excess -= 1
+            elif excess <= 0:
+                break
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+idempotency_store = IdempotencyStore()
+
+
+def _caller(authorization: bytes | None) -> bytes:
+    """
+    Usuario al que pertenece la clave: el `sub` del token (aunque esté vencido, si
+    la firma es válida), así un reintento con el token renovado usa la misma clave.
+    Sin token es "anonymous"; un token inválido se identifica por su hash.
+    """
+    if not authorization:
+        return b"anonymous"
+    scheme, _, token = authorization.decode("latin-1").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"verify_exp": False})
+            if payload.get("sub") is not None:
+                return b"user:" + str(payload["sub"]).encode()
+        except JWTError:
+            pass
+    return b"token:" + hashlib.sha256(authorization).hexdigest().encode()
+
+
+def _error(status_code: int, detail: str) -> JSONResponse:
+    return JSONResponse({"detail": detail}, status_code=status_code)
+
+
+class IdempotencyMiddleware:
+    """
+    Middleware ASGI para el encabezado Idempotency-Key en POST, PUT y PATCH.
+
+    La primera respuesta con una clave se guarda (IDEMPOTENCY_TTL_SECONDS) y se
+    devuelve tal cual, con `Idempotent-Replayed: true`, a los reintentos: el
+    endpoint no vuelve a ejecutarse (ni bcrypt ni las escrituras). Un reintento que
+    llega mientras la original está en curso la espera. La clave vale para el mismo
+    método, ruta y usuario (el `sub` del token, no el token: un cliente que lo
+    renovó entre reintentos sigue usando la misma clave); reusarla con otro cuerpo
+    responde 422. Los errores 5xx no se guardan, así el reintento vuelve a ejecutarse.
+
+    Va por dentro de CompressionMiddleware: se guarda la respuesta sin comprimir y
+    cada reintento se comprime según su Accept-Encoding.
+    """
+
+    def __init__(self, app, store: IdempotencyStore = idempotency_store):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in IDEMPOTENT_METHODS or not IDEMPOTENCY_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        raw_key = headers.get(HEADER)
+        if raw_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not raw_key.strip() or len(raw_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            await _error(400, "Idempotency-Key inválida")(scope, receive, send)
+            return
+
+        # El cuerpo se lee completo para compararlo con el de la solicitud original
+        body, more_body = b"", True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+        key = hashlib.sha256(
+            b"\0".join([scope["method"].encode(), scope["path"].encode(), _caller(headers.get(b"authorization")), raw_key])
+        ).hexdigest()
+        fingerprint = hashlib.sha256(body).hexdigest()
+
+        while True:
+            entry = self.store.get(key)
+            if entry is None:
+                break
+            if entry.fingerprint != fingerprint:
+                await _error(422, "La Idempotency-Key ya se usó con otra solicitud")(scope, receive, send)
+                return
+            if entry.response is None:
+                try:
+                    await asyncio.wait_for(entry.done.wait(), timeout=IDEMPOTENCY_WAIT_SECONDS)
+                except asyncio.TimeoutError:
+                    await _error(409, "Hay una solicitud con la misma Idempotency-Key en curso")(scope, receive, send)
+                    return
+                if entry.response is None:
+                    continue  # La original falló sin respuesta guardable: se ejecuta ésta
+            status_code, response_headers, response_body = entry.response
+            await send({"type": "http.response.start", "status": status_code, "headers": response_headers + [REPLAYED_HEADER]})
+            await send({"type": "http.response.body", "body": response_body})
+            return
+
+        entry = self.store.begin(key, fingerprint)
+        await self._run(scope, body, receive, send, key, entry)
+
+    async def _run(self, scope, body: bytes, receive, send, key: str, entry: _Entry):
+        replayed_body = False
+
+        async def receive_body():
+            nonlocal replayed_body
+            if not replayed_body:
+                replayed_body = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        start: dict | None = None
+        chunks: list[bytes] = []
+        size = 0
+        cacheable = True
+
+        async def capture(message):
+            nonlocal start, size, cacheable
+            if message["type"] == "http.response.start":
+                start = message
+                cacheable = message["status"] < 500
+            elif message["type"] == "http.response.body" and cacheable:
+                size += len(message.get("body", b""))
+                if size > IDEMPOTENCY_MAX_BODY_BYTES:
+                    cacheable, chunks[:] = False, []
+                else:
+                    chunks.append(message.get("body", b""))
+            await send(message)
+
+        response = None
+        try:
+            await self.app(scope, receive_body, capture)
+            if start is not None and cacheable:
+                response = (start["status"], list(start.get("headers", [])), b"".join(chunks))
+        finally:
+            # Si la solicitud falló (excepción o 5xx) los reintentos vuelven a ejecutarla
+            self.store.complete(key, entry, response)
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import threading
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import bindparam, text, update
+
+from src.database import engine
+from src.logger import logger
+from src.models.user_models import User
+
+load_dotenv()
+
+LAST_LOGIN_FLUSH_SECONDS = float(os.getenv("LAST_LOGIN_FLUSH_SECONDS", "5"))
+LAST_LOGIN_BATCH_SIZE = 1000  # Filas por sentencia (límite de parámetros de PostgreSQL)
+
+
+class LastLoginBuffer:
+    """
+    Buffer en memoria de los últimos accesos de usuario (escritura diferida).
+
+    El login sólo registra `user_id -> fecha` en un diccionario; varios logins
+    del mismo usuario entre dos vaciados se combinan en una sola fila. Una tarea
+    en segundo plano escribe todo el buffer con un único UPDATE masivo.
+
+    Un login no es un cambio de datos del usuario: no modifica updated_at ni se
+    registra en el feed de cambios.
+    """
+
+    def __init__(self):
+        self._pending: dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self._task: asyncio.Task | None = None
+
+    def record(self, user_id: str, when: datetime | None = None):
+        """
+        Registra el acceso de un usuario, sin tocar la base de datos.
+        """
+        with self._lock:
+            self._pending[user_id] = when or datetime.now(timezone.utc)
+
+    def flush(self) -> int:
+        """
+        Escribe los accesos pendientes en la tabla de usuarios.
+        Returns:
+            int: Cantidad de usuarios actualizados.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        items = list(pending.items())
+        try:
+            with engine.begin() as conn:
+                for start in range(0, len(items), LAST_LOGIN_BATCH_SIZE):
+                    batch = items[start:start + LAST_LOGIN_BATCH_SIZE]
+                    if engine.dialect.name == "postgresql":
+                        # UPDATE ... FROM (VALUES ...): una sola sentencia para todo el lote
+                        params = {}
+                        values = []
+                        for i, (user_id, when) in enumerate(batch):
+                            params[f"id{i}"] = user_id
+                            params[f"ts{i}"] = when
+                            values.append(f"(:id{i}, CAST(:ts{i} AS TIMESTAMP))")
+                        conn.execute(
+                            text(
+                                "UPDATE users SET last_login = v.ts "
+                                f"FROM (VALUES {', '.join(values)}) AS v(id, ts) "
+                                "WHERE users.id = v.id"
+                            ),
+                            params,
+                        )
+                    else:
+                        # updated_at se asigna a sí misma para que no se aplique su onupdate
+                        conn.execute(
+                            update(User).where(User.id == bindparam("user_id"))
+                            .values(last_login=bindparam("ts"), updated_at=User.updated_at),
+                            [{"user_id": user_id, "ts": when} for user_id, when in batch],
+                        )
+        except Exception as e:
+            # Se devuelven al buffer los accesos que no se pudieron escribir (sin pisar los más nuevos)
+            with self._lock:
+                for user_id, when in pending.items():
+                    self._pending.setdefault(user_id, when)
+            logger.error(f"Error actualizando last_login de {len(pending)} usuarios: {e}")
+            return 0
+        return len(pending)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(LAST_LOGIN_FLUSH_SECONDS)
+            await run_in_threadpool(self.flush)
+
+    def start(self):
+        """
+        Inicia la tarea de vaciado periódico (llamar desde el evento startup).
+        """
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """
+        Detiene la tarea periódica y vacía lo pendiente (llamar desde el evento shutdown).
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await run_in_threadpool(self.flush)
+
+
+last_login_buffer = LastLoginBuffer()
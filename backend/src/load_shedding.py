@@ -0,0 +1,156 @@
+import asyncio
+import math
+import os
+import time
+
+from dotenv import load_dotenv
+from starlette.responses import JSONResponse
+
+from src.database import engine
+from src.logger import logger
+
+load_dotenv()
+
+LOAD_SHED_ENABLED = os.getenv("LOAD_SHED_ENABLED", "true").lower() == "true"
+# Objetivos: por encima de estos valores el servicio se considera sobrecargado
+LOAD_SHED_LOOP_LAG_MS = float(os.getenv("LOAD_SHED_LOOP_LAG_MS", "100"))
+LOAD_SHED_POOL_WAIT_MS = float(os.getenv("LOAD_SHED_POOL_WAIT_MS", "200"))
+LOAD_SHED_SAMPLE_SECONDS = 0.1   # Intervalo de medición
+LOAD_SHED_SMOOTHING = 0.3        # Peso de cada medición en el promedio móvil
+LOAD_SHED_RETRY_AFTER = int(os.getenv("LOAD_SHED_RETRY_AFTER", "2"))  # Segundos, con presión 1
+
+# Prioridades: con presión p se rechaza el tráfico cuyo umbral sea <= p
+# (critical nunca se rechaza)
+PRIORITY_THRESHOLDS = {"low": 1.0, "normal": 2.0, "high": 4.0, "critical": math.inf}
+
+# Prioridad por prefijo de ruta (gana el prefijo más largo); se puede modificar con
+# LOAD_SHED_PRIORITIES="/admin_training=low,/persons=high"
+DEFAULT_PRIORITIES = {
+    "/users/token": "critical",     # Login
+    "/users/refresh": "critical",
+    "/users": "high",
+    "/training": "high",            # Carga del CV
+    "/persons": "normal",
+    "/admin_user": "low",           # Listados y exportaciones de administración
+    "/admin_training": "low",
+    "/admin": "low",
+}
+
+
+def parse_priorities(value: str | None) -> dict[str, str]:
+    """
+    Prioridades por prefijo: las de DEFAULT_PRIORITIES con los cambios de `value`
+    ("prefijo=prioridad" separados por comas). Las prioridades inválidas se ignoran.
+    """
+    priorities = dict(DEFAULT_PRIORITIES)
+    for item in (value or "").split(","):
+        prefix, _, priority = item.strip().partition("=")
+        if not prefix or priority.strip() not in PRIORITY_THRESHOLDS:
+            if item.strip():
+                logger.error(f"LOAD_SHED_PRIORITIES: entrada inválida {item.strip()!r}")
+            continue
+        priorities["/" + prefix.strip().strip("/")] = priority.strip()
+    return priorities
+
+
+class LoadMonitor:
+    """
+    Mide la carga del proceso: demora del event loop (cuánto tarda en despertar
+    una tarea que duerme LOAD_SHED_SAMPLE_SECONDS) y espera para obtener una
+    conexión del pool. Ambas se suavizan con un promedio móvil.
+
+    `pressure` es la mayor de las dos relativa a su objetivo: 1 es el límite de
+    lo aceptable, 2 el doble, etc.
+    """
+
+    def __init__(self):
+        self.loop_lag = 0.0   # Segundos
+        self.pool_wait = 0.0  # Segundos
+        self._task: asyncio.Task | None = None
+
+    @property
+    def pressure(self) -> float:
+        return max(
+            self.loop_lag * 1000 / LOAD_SHED_LOOP_LAG_MS,
+            self.pool_wait * 1000 / LOAD_SHED_POOL_WAIT_MS,
+        )
+
+    def _update(self, loop_lag: float, pool_wait: float):
+        self.loop_lag += LOAD_SHED_SMOOTHING * (loop_lag - self.loop_lag)
+        self.pool_wait += LOAD_SHED_SMOOTHING * (pool_wait - self.pool_wait)
+
+    async def _run(self):
+        take_pool_wait = getattr(engine.pool, "take_max_wait", lambda: 0.0)
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(LOAD_SHED_SAMPLE_SECONDS)
+            loop_lag = max(0.0, time.perf_counter() - started - LOAD_SHED_SAMPLE_SECONDS)
+            self._update(loop_lag, take_pool_wait())
+
+    def start(self):
+        """
+        Inicia la medición periódica (llamar desde el evento startup).
+        """
+        if LOAD_SHED_ENABLED and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """
+        Detiene la medición (llamar desde el evento shutdown).
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+load_monitor = LoadMonitor()
+
+
+class LoadSheddingMiddleware:
+    """
+    Middleware ASGI de control de admisión. Con el servicio sobrecargado responde
+    enseguida 503 con Retry-After a las solicitudes de menor prioridad (listados y
+    exportaciones de administración primero), en lugar de dejarlas esperar hasta
+    que venzan todas; login y carga de cursos siguen pasando.
+    """
+
+    def __init__(self, app, monitor: LoadMonitor = load_monitor, priorities: dict[str, str] | None = None):
+        self.app = app
+        self.monitor = monitor
+        priorities = priorities or parse_priorities(os.getenv("LOAD_SHED_PRIORITIES"))
+        # Del prefijo más largo al más corto, para que gane el más específico
+        self.priorities = sorted(priorities.items(), key=lambda item: len(item[0]), reverse=True)
+        self.shedding = False
+
+    def priority_of(self, path: str) -> str:
+        for prefix, priority in self.priorities:
+            if path == prefix or path.startswith(prefix + "/"):
+                return priority
+        return "normal"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not LOAD_SHED_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        pressure = self.monitor.pressure
+        overloaded = pressure >= PRIORITY_THRESHOLDS["low"]
+        if overloaded != self.shedding:
+            self.shedding = overloaded
+            logger.warning(
+                f"Control de admisión {'activado' if overloaded else 'desactivado'}: presión {pressure:.1f} "
+                f"(loop {self.monitor.loop_lag * 1000:.0f} ms, pool {self.monitor.pool_wait * 1000:.0f} ms)"
+            )
+        if overloaded and pressure >= PRIORITY_THRESHOLDS[self.priority_of(scope["path"])]:
+            retry_after = min(60, math.ceil(LOAD_SHED_RETRY_AFTER * pressure))
+            response = JSONResponse(
+                {"detail": "Servicio sobrecargado, reintentá en unos segundos"},
+                status_code=503,
+                headers={"Retry-After": str(retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
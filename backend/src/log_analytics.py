@@ -0,0 +1,311 @@
+"""
+Análisis de los logs de acceso (app.log y sus rotaciones, también comprimidas).
+
+Lee las líneas de acceso que escribe `log_requests` (logger "src.access", una
+línea JSON por solicitud, ver src/logger.py) y resume:
+
+- latencia por ruta (p50, p95, p99 y máxima) y tasa de errores 4xx/5xx,
+- usuarios con más solicitudes,
+- tráfico y errores por intervalo de tiempo.
+
+Las rutas se agrupan reemplazando los IDs por `{id}` (/admin_user/{id}). Reconoce
+también las líneas del formato anterior (dict de Python), que no tienen estado ni
+duración: cuentan para usuarios y tráfico.
+
+Cada archivo se procesa en un proceso propio: los planos con mmap, saltando de
+una línea de acceso a la siguiente con búsquedas en memoria; los .gz por
+bloques. Las latencias se acumulan en histogramas logarítmicos (error < 2,5 %),
+así el resultado se combina entre archivos sin guardar cada duración.
+
+Uso (desde backend/):
+    python -m src.log_analytics src/logs/app.log*
+    python -m src.log_analytics /var/log/repa/ --since 2025-03-01 --bucket 15 --top 20
+    python -m src.log_analytics src/logs --json > resumen.json
+"""
+import argparse
+import gzip
+import json
+import math
+import mmap
+import os
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
+
+ACCESS_MARKER = b'"logger": "src.access"'
+LEGACY_LINE = re.compile(
+    rb"^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d),\d+ - src\.logger - INFO - \{'method': '(\w+)', 'url': URL\('[a-z]+://[^/']*([^'?]*)[^']*'\).*?'user': '(?:User ID: [^,]*, Email: )?([^']*)'\}\s*$",
+    re.MULTILINE,
+)
+GZIP_CHUNK_BYTES = 8 * 1024 * 1024
+HISTOGRAM_BASE = 1.05  # Cada bucket del histograma es un 5 % más ancho que el anterior
+
+_ID_SEGMENT = re.compile(r"^(\d+|[0-9a-fA-F-]{16,}|[^/]+@[^/]+|eyJ[\w-]+\.[\w-]+\.[\w-]+)$")
+
+
+@lru_cache(maxsize=65536)
+def normalize_route(path: str) -> str:
+    """/admin_user/3f2a...-uuid/roles -> /admin_user/{id}/roles"""
+    return "/".join("{id}" if _ID_SEGMENT.match(segment) else segment for segment in path.split("/"))
+
+
+def _histogram_bucket(duration_ms: float) -> int:
+    return math.floor(math.log(max(duration_ms, 0.01), HISTOGRAM_BASE))
+
+
+def percentile(histogram: Counter, fraction: float) -> float:
+    """Percentil aproximado (límite superior del bucket) de un histograma logarítmico."""
+    total = sum(histogram.values())
+    if not total:
+        return 0.0
+    rank = fraction * total
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= rank:
+            return HISTOGRAM_BASE ** (bucket + 1)
+    return HISTOGRAM_BASE ** (max(histogram) + 1)
+
+
+class Summary:
+    """Resumen acumulado de uno o más archivos (se combina con `merge`)."""
+
+    def __init__(self, bucket_seconds: int):
+        self.bucket_seconds = bucket_seconds
+        self.routes: dict = defaultdict(lambda: {"count": 0, "4xx": 0, "5xx": 0, "max": 0.0, "hist": Counter()})
+        self.users: Counter = Counter()
+        self.buckets: dict = defaultdict(lambda: [0, 0])  # inicio -> [solicitudes, errores 5xx]
+        self.lines = 0
+        self.bytes = 0
+        self.invalid = 0
+
+    def add(self, when: datetime, method: str, path: str, user: str | None, status: int | None, duration_ms: float | None, weight: int = 1):
+        self.lines += 1
+        route = self.routes[f"{method} {normalize_route(path)}"]
+        route["count"] += weight
+        if status is not None:
+            if status >= 500:
+                route["5xx"] += weight
+            elif status >= 400:
+                route["4xx"] += weight
+        if duration_ms is not None:
+            route["hist"][_histogram_bucket(duration_ms)] += weight
+            route["max"] = max(route["max"], duration_ms)
+        if user:
+            self.users[user] += weight
+        start = int(when.timestamp()) // self.bucket_seconds * self.bucket_seconds
+        bucket = self.buckets[start]
+        bucket[0] += weight
+        if status is not None and status >= 500:
+            bucket[1] += weight
+
+    def merge(self, other: "Summary"):
+        for key, route in other.routes.items():
+            mine = self.routes[key]
+            for field in ("count", "4xx", "5xx"):
+                mine[field] += route[field]
+            mine["max"] = max(mine["max"], route["max"])
+            mine["hist"].update(route["hist"])
+        self.users.update(other.users)
+        for start, (count, errors) in other.buckets.items():
+            self.buckets[start][0] += count
+            self.buckets[start][1] += errors
+        self.lines += other.lines
+        self.bytes += other.bytes
+        self.invalid += other.invalid
+
+    def __getstate__(self):
+        # Los defaultdict con lambda no se pueden enviar entre procesos
+        state = dict(self.__dict__)
+        state["routes"], state["buckets"] = dict(self.routes), dict(self.buckets)
+        return state
+
+    def __setstate__(self, state):
+        self.__init__(state["bucket_seconds"])
+        self.routes.update(state.pop("routes"))
+        self.buckets.update(state.pop("buckets"))
+        self.__dict__.update({k: v for k, v in state.items() if k not in ("routes", "buckets")})
+
+
+@lru_cache(maxsize=65536)
+def _minute(ts: str) -> datetime:
+    # Las líneas del mismo minuto comparten la conversión de la fecha
+    return datetime.fromisoformat(ts[:16] + ts[23:]).astimezone(timezone.utc) if len(ts) > 23 else datetime.fromisoformat(ts[:16])
+
+
+def _parse_access(line: bytes, summary: Summary, since, until):
+    try:
+        entry = json.loads(line)
+        ts = entry["ts"]
+        when = _minute(ts)
+        if since or until:
+            exact = datetime.fromisoformat(ts)
+            if (since and exact < since) or (until and exact >= until):
+                return
+        summary.add(
+            when, entry["method"], entry["path"], entry.get("user"),
+            entry.get("status"), entry.get("duration_ms"), entry.get("sampled", 1),
+        )
+    except (ValueError, KeyError, TypeError):
+        summary.invalid += 1
+
+
+def _scan(data, summary: Summary, since, until):
+    """Procesa un bloque de texto (mmap o bytes) con líneas completas."""
+    position = data.find(ACCESS_MARKER)
+    while position != -1:
+        start = data.rfind(b"\n", 0, position) + 1
+        end = data.find(b"\n", position)
+        if end == -1:
+            end = len(data)
+        _parse_access(data[start:end], summary, since, until)
+        position = data.find(ACCESS_MARKER, end)
+    for match in LEGACY_LINE.finditer(data):
+        when = datetime.strptime(match.group(1).decode(), "%Y-%m-%d %H:%M:%S").astimezone(timezone.utc)
+        if (since and when < since) or (until and when >= until):
+            continue
+        user = match.group(4).decode(errors="replace")
+        summary.add(when, match.group(2).decode(), match.group(3).decode(errors="replace") or "/",
+                    None if user == "None" else user, None, None)
+
+
+def analyze_file(path: str, bucket_seconds: int, since=None, until=None) -> Summary:
+    """Resumen de un archivo de log (plano o .gz)."""
+    summary = Summary(bucket_seconds)
+    if path.endswith(".gz"):
+        with gzip.open(path, "rb") as file:
+            rest = b""
+            while True:
+                chunk = file.read(GZIP_CHUNK_BYTES)
+                if not chunk:
+                    break
+                summary.bytes += len(chunk)
+                chunk = rest + chunk
+                cut = chunk.rfind(b"\n") + 1  # Se procesa hasta la última línea completa
+                _scan(chunk[:cut], summary, since, until)
+                rest = chunk[cut:]
+            _scan(rest, summary, since, until)
+        return summary
+    size = os.path.getsize(path)
+    summary.bytes = size
+    if size == 0:
+        return summary
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        _scan(data, summary, since, until)
+    return summary
+
+
+def find_logs(paths: list[str]) -> list[str]:
+    """Archivos a procesar: los indicados y, en los directorios, app.log*."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(
+                os.path.join(path, name) for name in os.listdir(path) if name.startswith("app.log")
+            )
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            print(f"No existe: {path}", file=sys.stderr)
+    return files
+
+
+def analyze(files: list[str], bucket_seconds: int, since=None, until=None, workers: int | None = None) -> Summary:
+    """Procesa los archivos en paralelo (un proceso por archivo) y combina los resúmenes."""
+    total = Summary(bucket_seconds)
+    if len(files) == 1 or workers == 1:
+        for path in files:
+            total.merge(analyze_file(path, bucket_seconds, since, until))
+        return total
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(analyze_file, path, bucket_seconds, since, until) for path in files]
+        for future in futures:
+            total.merge(future.result())
+    return total
+
+
+def report(summary: Summary, top: int) -> dict:
+    routes = []
+    for key, route in summary.routes.items():
+        count = route["count"]
+        measured = bool(route["hist"])
+        routes.append({
+            "route": key,
+            "count": count,
+            "p50_ms": round(percentile(route["hist"], 0.50), 1) if measured else None,
+            "p95_ms": round(percentile(route["hist"], 0.95), 1) if measured else None,
+            "p99_ms": round(percentile(route["hist"], 0.99), 1) if measured else None,
+            "max_ms": round(route["max"], 1) if measured else None,
+            "error_4xx": round(route["4xx"] / count, 4),
+            "error_5xx": round(route["5xx"] / count, 4),
+        })
+    routes.sort(key=lambda route: route["count"], reverse=True)
+    return {
+        "lines": summary.lines,
+        "invalid": summary.invalid,
+        "bytes": summary.bytes,
+        "routes": routes,
+        "top_users": [{"user": user, "count": count} for user, count in summary.users.most_common(top)],
+        "traffic": [
+            {"start": datetime.fromtimestamp(start, timezone.utc).isoformat(), "count": count, "error_5xx": errors}
+            for start, (count, errors) in sorted(summary.buckets.items())
+        ],
+    }
+
+
+def print_report(result: dict):
+    def value(number):
+        return "-" if number is None else f"{number:.1f}"
+
+    print(f"{'ruta':<50}{'solicitudes':>12}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'máx ms':>10}{'4xx %':>8}{'5xx %':>8}")
+    for route in result["routes"]:
+        print(
+            f"{route['route'][:49]:<50}{route['count']:>12}{value(route['p50_ms']):>9}{value(route['p95_ms']):>9}"
+            f"{value(route['p99_ms']):>9}{value(route['max_ms']):>10}"
+            f"{route['error_4xx'] * 100:>8.1f}{route['error_5xx'] * 100:>8.1f}"
+        )
+    print(f"\n{'usuario':<50}{'solicitudes':>12}")
+    for user in result["top_users"]:
+        print(f"{user['user'][:49]:<50}{user['count']:>12}")
+    print(f"\n{'desde (UTC)':<30}{'solicitudes':>12}{'5xx':>8}")
+    for bucket in result["traffic"]:
+        print(f"{bucket['start']:<30}{bucket['count']:>12}{bucket['error_5xx']:>8}")
+
+
+def _parse_date(value: str) -> datetime:
+    when = datetime.fromisoformat(value)
+    return when if when.tzinfo else when.replace(tzinfo=timezone.utc)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Análisis de los logs de acceso de RePA")
+    parser.add_argument("paths", nargs="*", default=[os.getenv("LOGS_PATH") or "src/logs"], help="Archivos o directorios (app.log*)")
+    parser.add_argument("--since", type=_parse_date, help="Desde esta fecha/hora (ISO, UTC si no se indica zona)")
+    parser.add_argument("--until", type=_parse_date, help="Hasta esta fecha/hora (exclusiva)")
+    parser.add_argument("--bucket", type=int, default=60, help="Minutos por intervalo de tráfico")
+    parser.add_argument("--top", type=int, default=10, help="Cantidad de usuarios a mostrar")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos en paralelo (por defecto, uno por CPU)")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+
+    files = find_logs(args.paths)
+    if not files:
+        sys.exit("No se encontraron archivos de log")
+    started = time.perf_counter()
+    summary = analyze(files, args.bucket * 60, args.since, args.until, args.workers)
+    elapsed = time.perf_counter() - started
+    result = report(summary, args.top)
+    if args.json:
+        json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_report(result)
+    print(
+        f"{len(files)} archivos, {summary.bytes / 1e6:.1f} MB, {summary.lines} solicitudes "
+        f"({summary.invalid} líneas inválidas) en {elapsed:.2f} s ({summary.bytes / 1e6 / max(elapsed, 1e-9):.0f} MB/s)",
+        file=sys.stderr,
+    )
@@ -1,41 +1,171 @@
-import os
+import atexit
+import copy
+import json
 import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
 from dotenv import load_dotenv
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 
 load_dotenv()
 
-LOGS_PATH = os.getenv("LOGS_PATH")
-
-# Crear el directorio de logs si no existe
-log_directory = "src/logs" # reemplazar por LOGS_PATH
-os.makedirs(log_directory, exist_ok=True)
-
-# Configurar el archivo de log
-log_file_path = os.path.join(log_directory, "app.log")
-
-# Configurar handler rotativo
-file_handler = TimedRotatingFileHandler(
-    filename=log_file_path,
-    when="midnight",    # Rotación diaria a medianoche
-    interval=1,         # Intervalo diario (valor por defecto)
-    backupCount=5,      # Mantener 5 archivos de backup
-    encoding="utf-8",   # Codificación explícita
-    delay=False         # Crear archivo inmediatamente
-)
-
-# Configurar el formato del log
-log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-
-# Configurar el nivel de log y el manejador de archivo
-logging.basicConfig(
-    level=logging.INFO,
-    format=log_format,
-    handlers=[
-        logging.FileHandler(log_file_path),
-        logging.StreamHandler(),  # Opcional: para imprimir logs en la consola
-    ]
-)
+LOGS_PATH = os.getenv("LOGS_PATH") or "src/logs"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Niveles por logger: "sqlalchemy.engine=WARNING,src.access=INFO"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))      # Archivos diarios que se conservan
+LOG_CONSOLE = os.getenv("LOG_CONSOLE", "true").lower() == "true"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))      # Líneas en espera de escritura
+# Muestreo de líneas INFO/DEBUG repetidas: por cada línea del código se escriben
+# hasta LOG_RATE_LIMIT por segundo; pasado ese límite, una de cada LOG_SAMPLE_EVERY
+LOG_RATE_LIMIT = int(os.getenv("LOG_RATE_LIMIT", "50"))
+LOG_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", "100"))
+
+# Atributos propios de LogRecord; el resto son los campos pasados con `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Una línea JSON por registro: `ts`, `level`, `logger`, `msg` y los campos
+    pasados con `extra` (los valores no serializables se escriben como texto).
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Limita las líneas INFO/DEBUG de alto volumen: por cada lugar del código
+    (archivo y línea) deja pasar LOG_RATE_LIMIT por segundo y, pasado el límite,
+    una de cada LOG_SAMPLE_EVERY, marcada con `sampled` (cuántas representa).
+    WARNING y superiores pasan siempre, igual que los loggers de `exempt`: el log
+    de acceso ("src.access") sale todo de la misma línea del código y con muestreo
+    se perderían las solicitudes (y sus errores) por encima de LOG_RATE_LIMIT por
+    segundo, que son las que cuenta src/log_analytics.py.
+    """
+
+    def __init__(self, rate_limit: int = LOG_RATE_LIMIT, sample_every: int = LOG_SAMPLE_EVERY, exempt=("src.access",)):
+        super().__init__()
+        self.rate_limit = rate_limit
+        self.sample_every = sample_every
+        self.exempt = frozenset(exempt)
+        self._windows: dict[tuple[str, int], list] = {}  # lugar -> [segundo, cantidad]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.rate_limit <= 0 or record.name in self.exempt:
+            return True
+        key = (record.pathname, record.lineno)
+        second = int(time.monotonic())
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or window[0] != second:
+                window = self._windows[key] = [second, 0]
+            window[1] += 1
+            count = window[1]
+        if count <= self.rate_limit:
+            return True
+        if (count - self.rate_limit) % self.sample_every == 0:
+            record.sampled = self.sample_every
+            return True
+        return False
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """QueueHandler que descarta (y cuenta) los registros si la cola está llena, sin bloquear."""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DroppingQueueHandler.dropped += 1
+
+    def prepare(self, record):
+        # El mensaje y el texto de la excepción se arman antes de cruzar de hilo;
+        # a diferencia de QueueHandler.prepare, la excepción queda aparte del mensaje
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_levels(value: str) -> dict[str, str]:
+    """Niveles por logger de LOG_LEVELS; las entradas inválidas se ignoran."""
+    levels = {}
+    for item in value.split(","):
+        name, _, level = item.strip().partition("=")
+        if name and isinstance(logging.getLevelName(level.strip().upper()), int):
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging():
+    """
+    Configura el logging del proceso: los registros pasan por una cola
+    (QueueHandler) y un hilo (QueueListener) los escribe en LOGS_PATH/app.log como
+    JSON, con rotación diaria, y en la consola como texto. Así las solicitudes no
+    esperan la escritura en disco.
+
+    Returns:
+        QueueListener: Listener iniciado (se detiene al salir del proceso).
+    """
+    os.makedirs(LOGS_PATH, exist_ok=True)
+
+    file_handler = TimedRotatingFileHandler(
+        filename=os.path.join(LOGS_PATH, "app.log"),
+        when="midnight",    # Rotación diaria a medianoche
+        backupCount=LOG_BACKUP_COUNT,
+        encoding="utf-8",
+    )
+    file_handler.setFormatter(JsonFormatter())
+    handlers = [file_handler]
+    if LOG_CONSOLE:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+        handlers.append(console_handler)
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    queue_handler = _DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(LOG_LEVEL)
+    for name, level in parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  # Escribe lo pendiente al salir
+    return listener
+
+
+log_listener = setup_logging()
 
 # Obtener el logger
 logger = logging.getLogger(__name__)
+# Una línea por solicitud (src/middlewarelogg.py)
+access_logger = logging.getLogger("src.access")
@@ -0,0 +1,239 @@
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import Integer, event, or_, select
+from sqlalchemy.orm import Session
+from sqlalchemy.types import TypeDecorator
+
+from src.database import dialect_insert, engine
+from src.models.lookup_models import TrainingLookup
+
+load_dotenv()
+
+LOOKUP_REFRESH_SECONDS = float(os.getenv("LOOKUP_REFRESH_SECONDS", "5"))  # Intervalo mínimo entre actualizaciones
+LOOKUP_NEGATIVE_TTL_SECONDS = 60   # Tiempo que se recuerda un valor inexistente
+LOOKUP_NEGATIVE_MAX = 10_000       # Tope de valores inexistentes recordados
+
+
+class LookupMissing(LookupError):
+    """ID de training_lookups que todavía no está en la caché de este proceso."""
+
+
+class LookupCache:
+    """
+    Caché por proceso de `training_lookups`: `(kind, value) -> id` e `id -> value`.
+
+    Los valores se resuelven sólo con la caché: la traducción de parámetros y
+    resultados (LookupString) nunca consulta la base de datos. Los valores nuevos se
+    agregan desde las escrituras de cursos, con `intern` en la transacción de la
+    solicitud (ON CONFLICT DO NOTHING, así dos workers que agregan el mismo valor
+    obtienen el mismo ID): si esa transacción se revierte, las filas nuevas se
+    revierten con ella y se quitan de la caché.
+
+    Los valores agregados por otros workers se traen con `refresh`, al comenzar
+    cada transacción de una sesión y en su misma conexión (a lo sumo cada
+    LOOKUP_REFRESH_SECONDS, o en la siguiente transacción si faltó un valor o un
+    ID). Los valores inexistentes se recuerdan LOOKUP_NEGATIVE_TTL_SECONDS, así un
+    filtro por un valor desconocido no fuerza una actualización en cada solicitud.
+    """
+
+    def __init__(self):
+        self._ids: dict[tuple[str, str], int] = {}
+        self._values: dict[int, str] = {}
+        self._max_id = 0
+        self._missing_values: dict[tuple[str, str], float] = {}  # Valor inexistente -> vencimiento
+        self._missing_ids: set[int] = set()  # IDs leídos que no estaban en la caché
+        self._next_refresh = 0.0
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Carga el diccionario completo (llamar desde el evento startup).
+        """
+        with engine.connect() as conn:
+            self.refresh(conn, force=True)
+
+    def refresh(self, connection, force: bool = False):
+        """
+        Trae los valores agregados desde la última actualización (IDs mayores al último
+        conocido y los IDs que faltaron al leer), usando la conexión recibida.
+        Args:
+            connection: Connection o Session de la solicitud.
+            force (bool): Actualizar aunque no haya pasado LOOKUP_REFRESH_SECONDS.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if not force and now < self._next_refresh:
+                return
+            self._next_refresh = now + LOOKUP_REFRESH_SECONDS
+            condition = TrainingLookup.id > self._max_id
+            if self._missing_ids:
+                condition = or_(condition, TrainingLookup.id.in_(self._missing_ids))
+            self._missing_ids = set()
+        rows = connection.execute(
+            select(TrainingLookup.id, TrainingLookup.kind, TrainingLookup.value).where(condition)
+        ).all()
+        self._store(rows)
+
+    def remember(self, rows):
+        """
+        Agrega a la caché filas `(id, kind, value)` ya leídas de training_lookups
+        (para filtrar por valores que pueden ser nuevos para este proceso).
+        """
+        self._store(rows)
+
+    def _store(self, rows):
+        with self._lock:
+            for lookup_id, kind, value in rows:
+                self._ids[(kind, value)] = lookup_id
+                self._values[lookup_id] = value
+                self._max_id = max(self._max_id, lookup_id)
+                self._missing_values.pop((kind, value), None)
+
+    def _forget(self, rows):
+        with self._lock:
+            for lookup_id, kind, value in rows:
+                self._ids.pop((kind, value), None)
+                self._values.pop(lookup_id, None)
+
+    def intern(self, kind: str, values, db: Session | None = None) -> dict[str, int]:
+        """
+        Devuelve los IDs de varios valores de una misma columna, creando los que falten.
+        Args:
+            kind (str): Columna de Training (ej. "pais").
+            values (Iterable[str]): Valores a resolver.
+            db (Session): Sesión de la escritura que usa los valores; las filas nuevas
+                se confirman o revierten con su transacción. Sin sesión, se usa una
+                conexión propia con commit inmediato (carga de datos de prueba).
+        Returns:
+            dict[str, int]: `valor -> id`.
+        """
+        values = set(values)
+        result = {}
+        missing = []
+        for value in values:
+            lookup_id = self._ids.get((kind, value))
+            if lookup_id is None:
+                missing.append(value)
+            else:
+                result[value] = lookup_id
+        if missing:
+            if db is None:
+                with engine.begin() as conn:
+                    rows, created = self._insert(conn, kind, missing)
+            else:
+                rows, created = self._insert(db, kind, missing)
+                db.info.setdefault("interned_lookups", []).extend(created)
+            self._store(rows)
+            result.update({value: lookup_id for lookup_id, _, value in rows})
+        return result
+
+    @staticmethod
+    def _insert(connection, kind: str, missing: list[str]):
+        # RETURNING sólo devuelve las filas insertadas aquí (no las que ya existían)
+        created = connection.execute(
+            dialect_insert(TrainingLookup)
+            .values([{"kind": kind, "value": value} for value in missing])
+            .on_conflict_do_nothing(index_elements=["kind", "value"])
+            .returning(TrainingLookup.id, TrainingLookup.kind, TrainingLookup.value)
+        ).all()
+        rows = connection.execute(
+            select(TrainingLookup.id, TrainingLookup.kind, TrainingLookup.value)
+            .where(TrainingLookup.kind == kind, TrainingLookup.value.in_(missing))
+        ).all()
+        return rows, created
+
+    def id_for(self, kind: str, value: str) -> int | None:
+        """
+        Devuelve el ID de un valor, o None si no está en la caché (no lo crea ni
+        consulta la base de datos). Un valor desconocido pide una actualización
+        para la próxima transacción, una vez cada LOOKUP_NEGATIVE_TTL_SECONDS.
+        """
+        lookup_id = self._ids.get((kind, value))
+        if lookup_id is None:
+            now = time.monotonic()
+            with self._lock:
+                expires = self._missing_values.get((kind, value))
+                if expires is None or expires <= now:
+                    if len(self._missing_values) >= LOOKUP_NEGATIVE_MAX:
+                        self._missing_values.clear()
+                    self._missing_values[(kind, value)] = now + LOOKUP_NEGATIVE_TTL_SECONDS
+                    self._next_refresh = 0.0
+        return lookup_id
+
+    def value_for(self, lookup_id: int) -> str:
+        """
+        Devuelve el valor de un ID.
+        Raises:
+            LookupMissing: Si el ID no está en la caché (valor agregado por otro worker
+                después de la última actualización); se trae en la próxima transacción.
+        """
+        value = self._values.get(lookup_id)
+        if value is None:
+            with self._lock:
+                self._missing_ids.add(lookup_id)
+                self._next_refresh = 0.0
+            raise LookupMissing(lookup_id)
+        return value
+
+
+lookup_cache = LookupCache()
+
+UNKNOWN_LOOKUP_ID = -1  # ID que no existe en training_lookups
+
+
+@event.listens_for(Session, "after_begin")
+def _refresh_lookups(session, transaction, connection):
+    # En la conexión de la sesión: no se toma otra conexión del pool
+    lookup_cache.refresh(connection)
+
+
+@event.listens_for(Session, "after_commit")
+def _keep_interned(session):
+    session.info.pop("interned_lookups", None)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_interned(session):
+    # Las filas creadas en la transacción revertida ya no existen
+    created = session.info.pop("interned_lookups", None)
+    if created:
+        lookup_cache._forget(created)
+
+
+class LookupString(TypeDecorator):
+    """
+    Columna de texto almacenada como ID de `training_lookups`.
+
+    Para el ORM y los esquemas la columna sigue siendo un `str`: al escribir (o al
+    comparar en un filtro) el texto se traduce a su ID y al leer el ID vuelve a
+    texto, ambos a través de `lookup_cache`. Los filtros por igualdad o `in_`
+    funcionan; LIKE y ORDER BY sobre la columna operan sobre el ID, no sobre el
+    texto, y deben hacerse contra `training_lookups.value`.
+
+    Traducir un texto no crea filas en `training_lookups`: un filtro por un valor
+    que no está en la caché usa UNKNOWN_LOOKUP_ID y no devuelve nada. Para filtrar
+    por valores leídos de training_lookups, agregarlos antes con `lookup_cache.remember`.
+    """
+
+    impl = Integer
+    cache_ok = True
+
+    def __init__(self, kind: str):
+        super().__init__()
+        self.kind = kind
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        lookup_id = lookup_cache.id_for(self.kind, value)
+        # Un valor desconocido no coincide con ningún curso. Las escrituras deben
+        # crear antes los valores con `intern_training_values` (src/models/training_models.py)
+        return UNKNOWN_LOOKUP_ID if lookup_id is None else lookup_id
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return lookup_cache.value_for(value)
@@ -0,0 +1,274 @@
+import asyncio
+import os
+import smtplib
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from uuid import uuid4
+
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from src.database import SessionLocal
+from src.logger import logger
+from src.models.outbox_models import EmailOutbox
+
+load_dotenv()
+
+URL_SITE = os.getenv("URL_SITE")
+MAIL_TRANSPORT = os.getenv("MAIL_TRANSPORT", "console")  # console, file o smtp
+MAIL_FROM = os.getenv("MAIL_FROM", "no-reply@repa.ar")
+MAIL_HOST = os.getenv("MAIL_HOST", "localhost")
+MAIL_PORT = int(os.getenv("MAIL_PORT", "25"))
+MAIL_USER = os.getenv("MAIL_USER")
+MAIL_PASSWORD = os.getenv("MAIL_PASSWORD")
+MAIL_STARTTLS = os.getenv("MAIL_STARTTLS", "false").lower() == "true"
+MAIL_FILE_PATH = os.getenv("MAIL_FILE_PATH", "src/mails")
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", "50"))
+MAIL_POLL_SECONDS = float(os.getenv("MAIL_POLL_SECONDS", "2"))
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", "8"))
+MAIL_LEASE_SECONDS = int(os.getenv("MAIL_LEASE_SECONDS", "600"))  # Plazo de un lote tomado; vencido, se vuelve a tomar
+MAIL_BACKOFF_SECONDS = 30      # Espera tras el primer fallo; se duplica en cada intento
+MAIL_BACKOFF_MAX_SECONDS = 3600
+
+
+# Transportes de correo: cualquier objeto con un método send(message: EmailMessage)
+class ConsoleTransport:
+    """Imprime el correo por consola (desarrollo)."""
+
+    def send(self, message: EmailMessage):
+        print(f"Email para {message['To']}: {message['Subject']}\n{message.get_content()}")
+
+
+class FileTransport:
+    """Guarda cada correo como archivo .eml en un directorio (pruebas locales)."""
+
+    def __init__(self, path: str = MAIL_FILE_PATH):
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+
+    def send(self, message: EmailMessage):
+        file_name = f"{datetime.utcnow():%Y%m%d%H%M%S}-{uuid4().hex[:8]}.eml"
+        with open(os.path.join(self.path, file_name), "wb") as f:
+            f.write(bytes(message))
+
+
+class SMTPTransport:
+    """Envía los correos por SMTP, reutilizando la conexión entre envíos."""
+
+    def __init__(self, host: str = MAIL_HOST, port: int = MAIL_PORT):
+        self.host = host
+        self.port = port
+        self._smtp = None
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=30)
+        if MAIL_STARTTLS:
+            smtp.starttls()
+        if MAIL_USER:
+            smtp.login(MAIL_USER, MAIL_PASSWORD)
+        return smtp
+
+    def send(self, message: EmailMessage):
+        if self._smtp is None:
+            self._smtp = self._connect()
+        try:
+            self._smtp.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # Conexión vencida por inactividad: se reconecta una vez
+            self._smtp = self._connect()
+            self._smtp.send_message(message)
+
+
+TRANSPORTS = {"console": ConsoleTransport, "file": FileTransport, "smtp": SMTPTransport}
+
+
+def confirmation_email(token: str) -> tuple[str, str]:
+    """
+    Asunto y cuerpo del email de verificación de la cuenta.
+    """
+    verification_url = f"{URL_SITE}/users/confirm/{token}"
+    return (
+        "RePA - Confirmá tu cuenta",
+        f"Para activar tu cuenta ingresá al siguiente enlace (válido por 24 horas):\n{verification_url}",
+    )
+
+
+def recovery_email(token: str) -> tuple[str, str]:
+    """
+    Asunto y cuerpo del email de recuperación de contraseña.
+    """
+    verification_url = f"{URL_SITE}/users/recovery/{token}"
+    return (
+        "RePA - Recuperación de contraseña",
+        f"Para confirmar el cambio de contraseña ingresá al siguiente enlace (válido por 24 horas):\n{verification_url}",
+    )
+
+
+def enqueue_email(db: Session, recipient: str, subject: str, body: str) -> EmailOutbox:
+    """
+    Agrega un correo a la bandeja de salida dentro de la transacción actual.
+    El correo sólo se envía si la transacción hace commit; no se hace commit aquí.
+    Args:
+        db (Session): Sesión de la transacción que genera el correo.
+        recipient (str): Dirección de destino.
+        subject (str): Asunto.
+        body (str): Cuerpo en texto plano.
+    Returns:
+        EmailOutbox: Registro agregado a la sesión.
+    """
+    record = EmailOutbox(recipient=recipient, subject=subject, body=body)
+    db.add(record)
+    return record
+
+
+class OutboxWorker:
+    """
+    Worker asyncio que vacía la bandeja de salida por lotes.
+
+    Cada lote se toma con `FOR UPDATE SKIP LOCKED` (en PostgreSQL) y se marca
+    "sending" con un plazo, de modo que varios workers pueden correr en paralelo sin
+    enviar dos veces el mismo correo.
+    Los envíos fallidos se reintentan con espera exponencial y, superado
+    MAIL_MAX_ATTEMPTS, el correo queda en estado "failed".
+    """
+
+    def __init__(self, transport=None):
+        self.transport = transport or TRANSPORTS[MAIL_TRANSPORT]()
+        self._task: asyncio.Task | None = None
+
+    def drain_once(self) -> int:
+        """
+        Procesa un lote de correos pendientes en tres pasos, sin dejar una
+        transacción abierta durante los envíos:
+
+        1. Toma el lote en una transacción corta: lo marca "sending" con un plazo
+           (MAIL_LEASE_SECONDS, en next_attempt_at) y cuenta el intento. Si el worker
+           se cae, al vencer el plazo otro worker vuelve a tomar esos correos (con un
+           intento más: un correo que tumba al worker también llega a "failed").
+        2. Envía los correos, fuera de toda transacción.
+        3. Registra los resultados en otra transacción corta, sólo para los correos
+           que sigue teniendo tomados (mismo estado y plazo).
+
+        Returns:
+            int: Cantidad de correos procesados (enviados o reprogramados).
+        """
+        claimed = self._claim()
+        if not claimed:
+            return 0
+        results = []
+        for record in claimed:
+            message = EmailMessage()
+            message["From"] = MAIL_FROM
+            message["To"] = record["recipient"]
+            message["Subject"] = record["subject"]
+            message.set_content(record["body"])
+            try:
+                self.transport.send(message)
+                results.append((record, None))
+            except Exception as e:
+                results.append((record, e))
+        self._record_results(results)
+        return len(claimed)
+
+    def _claim(self) -> list[dict]:
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            lease = now + timedelta(seconds=MAIL_LEASE_SECONDS)
+            batch = (
+                db.query(EmailOutbox)
+                .filter(EmailOutbox.status.in_(("pending", "sending")), EmailOutbox.next_attempt_at <= now)
+                .order_by(EmailOutbox.id)
+                .limit(MAIL_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            claimed = []
+            for record in batch:
+                if record.attempts >= MAIL_MAX_ATTEMPTS:
+                    # Plazo vencido del último intento: el envío nunca terminó
+                    record.status = "failed"
+                    logger.error(f"Email {record.id} descartado tras {record.attempts} intentos sin completarse")
+                    continue
+                record.attempts += 1
+                record.status = "sending"
+                record.next_attempt_at = lease
+                claimed.append({
+                    "id": record.id, "recipient": record.recipient, "subject": record.subject,
+                    "body": record.body, "attempts": record.attempts, "lease": lease,
+                })
+            db.commit()
+            return claimed
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _record_results(self, results: list[tuple[dict, Exception | None]]):
+        db = SessionLocal()
+        try:
+            for record, error in results:
+                if error is None:
+                    values = {"status": "sent", "sent_at": datetime.utcnow()}
+                else:
+                    attempts = record["attempts"]  # Ya contado al tomar el correo
+                    values = {"last_error": str(error)[:500]}
+                    if attempts >= MAIL_MAX_ATTEMPTS:
+                        values["status"] = "failed"
+                        logger.error(f"Email {record['id']} descartado tras {attempts} intentos: {error}")
+                    else:
+                        delay = min(MAIL_BACKOFF_SECONDS * 2 ** (attempts - 1), MAIL_BACKOFF_MAX_SECONDS)
+                        values["status"] = "pending"
+                        values["next_attempt_at"] = datetime.utcnow() + timedelta(seconds=delay)
+                        logger.warning(f"Email {record['id']} falló (intento {attempts}), reintento en {delay}s: {error}")
+                db.execute(
+                    update(EmailOutbox)
+                    .where(
+                        EmailOutbox.id == record["id"],
+                        EmailOutbox.status == "sending",
+                        EmailOutbox.next_attempt_at == record["lease"],
+                    )
+                    .values(**values)
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def _run(self):
+        while True:
+            try:
+                processed = await run_in_threadpool(self.drain_once)
+            except Exception as e:
+                logger.error(f"Error procesando la bandeja de salida: {e}")
+                processed = 0
+            # Con el lote completo se sigue de inmediato; si no, se espera al próximo sondeo
+            if processed < MAIL_BATCH_SIZE:
+                await asyncio.sleep(MAIL_POLL_SECONDS)
+
+    def start(self):
+        """
+        Inicia el worker (llamar desde el evento startup).
+        """
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """
+        Detiene el worker (llamar desde el evento shutdown). Lo pendiente queda en la tabla.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+mail_worker = OutboxWorker()
@@ -1,8 +1,13 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from src.logger import logger
 from src.middlewarelogg import log_requests
+from src.compression import CompressionMiddleware
+from src.idempotency import IdempotencyMiddleware
+from src.load_shedding import LoadSheddingMiddleware, load_monitor
+from src.profiler import ProfilingMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware # Importar BaseHTTPMiddleware para el middleware de logs
 
 from src.database import init_db
@@ -11,8 +16,19 @@ from src.routes.user_routes import user_router
 from src.routes.admin_routes import admin_router
 from src.routes.training_routes import training_router
 from src.routes.admin_training_rutes import admin_training
+from src.routes.person_routes import person_router
+from src.routes.admin_ops_routes import admin_ops
 
 from src.seed import seed_data
+from src.audit import audit_buffer
+from src.last_login import last_login_buffer
+from src.events import event_broker
+from src.fuzzy_search import ensure_search_indexes
+from src.lookups import LookupMissing, lookup_cache
+from src.mailer import mail_worker
+from src.migrations import upgrade_schema
+from src.partitioning import ensure_training_partitions, partition_maintainer
+from src.utils import shutdown_hash_pool
 
 # Inicializar la base de datos
 init_db()
@@ -20,6 +36,9 @@ init_db()
 app = FastAPI()
 app.title = "Backend RePA - 2025"
 app.version = "0.1.0"
+# Perfilado por muestreo de las solicitudes lentas (sólo con PROFILER_ENABLED=true).
+# Es el middleware más interno: mide la ruta, sin los demás middlewares
+app.add_middleware(ProfilingMiddleware)
 app.add_middleware(BaseHTTPMiddleware, dispatch=log_requests)
 
 logger.info("FastAPI iniciado correctamente...")
@@ -35,19 +54,62 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Respuestas guardadas por Idempotency-Key para los reintentos de POST/PUT/PATCH
+# (por dentro de la compresión: se guardan sin comprimir)
+app.add_middleware(IdempotencyMiddleware)
+
+# Compresión gzip/brotli de las respuestas (el último middleware agregado es el más externo)
+app.add_middleware(CompressionMiddleware)
+
+# Control de admisión: con el servicio sobrecargado rechaza primero el tráfico de
+# menor prioridad, antes de pasar por el resto de los middlewares
+app.add_middleware(LoadSheddingMiddleware)
+
 # Inicializar la base de datos y ejecutar seeding
 @app.on_event("startup")
 def on_startup():
     init_db()  # Crear tablas si no existen
+    upgrade_schema()  # Columnas e índices nuevos en tablas existentes
     seed_data()  # Ejecutar seeding
+    ensure_training_partitions()  # Particiones anuales de trainings (si el particionado está activo)
+    ensure_search_indexes()  # Índices de trigramas para la búsqueda aproximada (PostgreSQL)
+    lookup_cache.load()  # Diccionario de valores de los cursos en memoria
+    last_login_buffer.start()  # Escritura diferida de last_login
+    audit_buffer.start()  # Escritura en lote del registro de auditoría
+    mail_worker.start()  # Envío de emails desde la bandeja de salida
+    partition_maintainer.start()  # Creación anticipada de particiones
+    event_broker.start()  # Eventos de cambios para los clientes SSE
+    load_monitor.start()  # Medición de carga para el control de admisión
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await last_login_buffer.stop()  # Escribir los accesos pendientes
+    await audit_buffer.stop()  # Escribir la auditoría pendiente
+    await mail_worker.stop()
+    await partition_maintainer.stop()
+    await event_broker.stop()
+    await load_monitor.stop()
+    shutdown_hash_pool()
+
+# Un valor de curso agregado por otro worker todavía no está en la caché de este
+# proceso; se trae en la transacción siguiente, así que el reintento responde bien
+@app.exception_handler(LookupMissing)
+async def lookup_missing_handler(request: Request, exc: LookupMissing):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Los datos de los cursos se están actualizando, intente nuevamente"},
+        headers={"Retry-After": "1"},
+    )
 
 # Incluir rutas a módulos
 app.include_router(user_router, prefix="/users", tags=["Users"])
 app.include_router(training_router, prefix="/training", tags=["Training"])
+app.include_router(person_router, prefix="/persons", tags=["Persons"])
 
 # Rutas de Administración
 app.include_router(admin_router, prefix="/admin_user", tags=["Administrator User"])
 app.include_router(admin_training, prefix="/admin_training", tags=["Administrator Training"])
+app.include_router(admin_ops, prefix="/admin", tags=["Administrator"])
 
 @app.get("/")
 def root():
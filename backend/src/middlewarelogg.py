@@ -1,7 +1,12 @@
+import json
+import re
+import time
+from urllib.parse import parse_qsl, urlencode
+
 from fastapi import FastAPI, Request
 from jose import JWTError, jwt
 from dotenv import load_dotenv
-from src.logger import logger
+from src.logger import access_logger, logger
 from src.utils import decode_access_token
 
 import os
@@ -10,14 +15,61 @@ load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY") # Cambia esto a un valor seguro
 ALGORITHM = os.getenv("ALGORITHM")
+LOG_BODY_MAX_BYTES = 2048  # Se registra sólo el comienzo del cuerpo
+LOG_BODY_PARSE_MAX_BYTES = 64 * 1024  # Cuerpos más grandes (cargas masivas) no se revisan ni registran
+_HIDDEN_HEADERS = {"authorization", "cookie"}  # No se escriben en el log
+# Campos del cuerpo cuyo valor no se escribe (contraseñas, tokens de refresh/recuperación)
+_SECRET_FIELD = re.compile(r"pass|token|secret", re.IGNORECASE)
+REDACTED = "[oculto]"
+
+
+def _redact(value):
+    if isinstance(value, dict):
+        return {k: REDACTED if _SECRET_FIELD.search(str(k)) else _redact(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_redact(item) for item in value]
+    return value
+
+
+def loggable_body(body: bytes, content_type: str) -> str | None:
+    """
+    Cuerpo de la solicitud para el log, sin contraseñas ni tokens: en JSON y en
+    formularios (login) se ocultan esos campos. Los cuerpos que no se pueden
+    revisar (otros formatos, JSON inválido o más de LOG_BODY_PARSE_MAX_BYTES) no
+    se registran.
+    Args:
+        body (bytes): Cuerpo completo.
+        content_type (str): Encabezado Content-Type.
+    Returns:
+        str | None: Los primeros LOG_BODY_MAX_BYTES del cuerpo, o None.
+    """
+    if not body:
+        return ""
+    if len(body) > LOG_BODY_PARSE_MAX_BYTES:
+        return None
+    try:
+        if content_type.startswith("application/json"):
+            text = json.dumps(_redact(json.loads(body)), ensure_ascii=False)
+        elif content_type.startswith("application/x-www-form-urlencoded"):
+            fields = parse_qsl(body.decode("utf-8"), keep_blank_values=True)
+            text = urlencode([(k, REDACTED if _SECRET_FIELD.search(k) else v) for k, v in fields])
+        else:
+            return None
+    except ValueError:  # JSON inválido o texto que no es UTF-8
+        return None
+    return text[:LOG_BODY_MAX_BYTES]
+
 
 async def log_requests(request: Request, call_next):
+    started = time.perf_counter()
+    body = await request.body()
     log_dict = {
         "method": request.method,
-        "url": request.url,
-        "headers": dict(request.headers),
+        "path": request.url.path,
+        "headers": {k: v for k, v in request.headers.items() if k not in _HIDDEN_HEADERS},
         "query_params": dict(request.query_params),
-        "body": await request.body(),
+        "body": loggable_body(body, request.headers.get("content-type", "")),
+        "client": request.client.host if request.client else None,
     }
     # Agregar condicional, si hay usuario logueado y get_current_user(request) != None
     authorization: str = request.headers.get("Authorization")
@@ -26,7 +78,8 @@ async def log_requests(request: Request, call_next):
         try:
             # Decodificar el token para obtener la información del usuario
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            log_dict["user"] = f"User ID: {payload.get('id')}, Email: {payload.get('email')}"
+            log_dict["user_id"] = payload.get("sub")
+            log_dict["user"] = payload.get("email")
         except jwt.ExpiredSignatureError:
             # Si el token ha expirado, se registra y se marca el usuario como desconocido
             logger.warning("Token expirado")
@@ -38,7 +91,17 @@ async def log_requests(request: Request, call_next):
     else:
         # Si no hay token, se asume que es una solicitud de un usuario anónimo
         log_dict["user"] = "Anonymous"
-    
-    logger.info(log_dict, extra=log_dict)
-    response = await call_next(request)
-    return response
+
+    # Una línea por solicitud, al tener la respuesta: con estado y duración (ms
+    # hasta el inicio de la respuesta; en streaming no incluye el envío del cuerpo)
+    log_dict["status"] = 500
+    try:
+        response = await call_next(request)
+        log_dict["status"] = response.status_code
+        return response
+    finally:
+        log_dict["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        access_logger.info(
+            f"{log_dict['method']} {log_dict['path']} {log_dict['status']} {log_dict['duration_ms']} ms",
+            extra=log_dict,
+        )
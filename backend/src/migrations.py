@@ -0,0 +1,149 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.types import String
+
+from src.database import engine
+from src.logger import logger
+from src.models.training_models import LOOKUP_COLUMNS
+
+_LOCK_KEY = 0x7472_6D67  # Advisory lock: un solo proceso migra a la vez
+
+# Columnas agregadas a tablas que ya existían: (tabla, columna, tipo, valor inicial)
+NEW_COLUMNS = [
+    ("trainings", "fingerprint", "VARCHAR(32)", None),  # Huella de contenido (NULL hasta pasar el deduplicado)
+    # Última modificación, para el feed de cambios
+    ("users", "updated_at", "TIMESTAMP", "CURRENT_TIMESTAMP"),
+    ("trainings", "updated_at", "TIMESTAMP", "CURRENT_TIMESTAMP"),
+    ("persons", "updated_at", "TIMESTAMP", "CURRENT_TIMESTAMP"),
+]
+
+# Índices de esas columnas (los mismos que crea create_all en una base nueva)
+NEW_INDEXES = [
+    # ON CONFLICT (fingerprint, fecha_inicio) necesita este índice
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_trainings_fingerprint ON trainings (fingerprint, fecha_inicio)",
+    "CREATE INDEX IF NOT EXISTS ix_users_updated_at ON users (updated_at)",
+    "CREATE INDEX IF NOT EXISTS ix_trainings_updated_at ON trainings (updated_at)",
+    "CREATE INDEX IF NOT EXISTS ix_persons_updated_at ON persons (updated_at)",
+    "CREATE INDEX IF NOT EXISTS ix_trainings_institucion_id ON trainings (institucion, id)",
+]
+
+# Restricciones únicas agregadas a tablas que ya existían: (tabla, nombre, columnas).
+# Antes de crearlas se borran las filas repetidas (se conserva la de menor id)
+NEW_UNIQUE = [
+    # ON CONFLICT (user_id, role_id) de la asignación de roles necesita este índice
+    ("user_roles", "uq_user_roles_user_role", ("user_id", "role_id")),
+]
+
+
+def upgrade_schema() -> list[str]:
+    """
+    Agrega a una base de datos existente las columnas e índices nuevos de las tablas
+    que ya existían (create_all sólo crea las tablas que faltan, como change_log).
+    Llamar después de init_db; si la base ya está al día no hace nada.
+
+    Las columnas con valor inicial lo reciben en las filas existentes y, en
+    PostgreSQL, como DEFAULT (SQLite no admite un DEFAULT no constante en
+    ADD COLUMN: las filas nuevas lo reciben del ORM).
+
+    Las columnas normalizadas de trainings que todavía guardan texto pasan a
+    guardar el ID de su valor en training_lookups (ver `_migrate_lookup_columns`).
+    Returns:
+        list[str]: Columnas agregadas ("tabla.columna") y restricciones creadas.
+    """
+    added = []
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _LOCK_KEY})
+        inspector = inspect(conn)
+        for table, column, column_type, initial in NEW_COLUMNS:
+            if column in {col["name"] for col in inspector.get_columns(table)}:
+                continue
+            if initial is not None and conn.dialect.name == "postgresql":
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type} DEFAULT {initial}"))
+            else:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+                if initial is not None:
+                    conn.execute(text(f"UPDATE {table} SET {column} = {initial}"))
+            added.append(f"{table}.{column}")
+        added += _migrate_lookup_columns(conn, inspector)
+        for statement in NEW_INDEXES:
+            conn.execute(text(statement))
+        for table, name, columns in NEW_UNIQUE:
+            if _has_unique(inspector, table, columns):
+                continue
+            column_list = ", ".join(columns)
+            removed = conn.execute(text(
+                f"DELETE FROM {table} WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY {column_list})"
+            )).rowcount
+            if removed:
+                logger.warning(f"Se borraron {removed} filas repetidas de {table} ({column_list})")
+            conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {name} ON {table} ({column_list})"))
+            added.append(name)
+    if added:
+        logger.info(f"Cambios aplicados a la base de datos: {', '.join(added)}")
+    return added
+
+
+def _has_unique(inspector, table: str, columns) -> bool:
+    # create_all crea una restricción UNIQUE (en SQLite con un índice sin nombre
+    # propio); la migración, un índice único: vale cualquiera de los dos
+    columns = list(columns)
+    return any(
+        constraint["column_names"] == columns for constraint in inspector.get_unique_constraints(table)
+    ) or any(
+        index["unique"] and index["column_names"] == columns for index in inspector.get_indexes(table)
+    )
+
+
+def _migrate_lookup_columns(conn, inspector) -> list[str]:
+    """
+    Convierte las columnas normalizadas de trainings (LOOKUP_COLUMNS) de una base
+    anterior, que guardan el texto, al ID de training_lookups: se cargan los valores
+    distintos en training_lookups y cada fila pasa a guardar el ID de su valor.
+
+    En PostgreSQL la columna cambia de tipo (conserva NOT NULL e índices) y se agrega
+    la clave foránea. SQLite no permite cambiar el tipo: se agrega una columna
+    INTEGER con la clave foránea, se borra la de texto (y sus índices) y se renombra;
+    NOT NULL queda a cargo del ORM.
+    Returns:
+        list[str]: Columnas convertidas ("trainings.columna").
+    """
+    converted = []
+    columns = {column["name"]: column for column in inspector.get_columns("trainings")}
+    indexes = inspector.get_indexes("trainings")
+    for name in LOOKUP_COLUMNS:
+        if not isinstance(columns[name]["type"], String):
+            continue  # Ya guarda IDs
+        conn.execute(
+            text(
+                f"INSERT INTO training_lookups (kind, value) SELECT DISTINCT :kind, {name} FROM trainings "
+                f"WHERE {name} IS NOT NULL ON CONFLICT (kind, value) DO NOTHING"
+            ),
+            {"kind": name},
+        )
+        new_column = f"{name}_lookup_id"
+        if conn.dialect.name == "postgresql":
+            conn.execute(text(f"ALTER TABLE trainings ADD COLUMN {new_column} INTEGER"))
+        else:
+            conn.execute(text(f"ALTER TABLE trainings ADD COLUMN {new_column} INTEGER REFERENCES training_lookups (id)"))
+        conn.execute(
+            text(
+                f"UPDATE trainings SET {new_column} = (SELECT lookup.id FROM training_lookups AS lookup "
+                f"WHERE lookup.kind = :kind AND lookup.value = trainings.{name})"
+            ),
+            {"kind": name},
+        )
+        if conn.dialect.name == "postgresql":
+            conn.execute(text(f"ALTER TABLE trainings ALTER COLUMN {name} TYPE INTEGER USING {new_column}"))
+            conn.execute(text(f"ALTER TABLE trainings DROP COLUMN {new_column}"))
+            conn.execute(text(
+                f"ALTER TABLE trainings ADD CONSTRAINT trainings_{name}_fkey "
+                f"FOREIGN KEY ({name}) REFERENCES training_lookups (id)"
+            ))
+        else:
+            for index in indexes:
+                if name in index["column_names"]:
+                    conn.execute(text(f"DROP INDEX IF EXISTS {index['name']}"))
+            conn.execute(text(f"ALTER TABLE trainings DROP COLUMN {name}"))
+            conn.execute(text(f"ALTER TABLE trainings RENAME COLUMN {new_column} TO {name}"))
+        converted.append(f"trainings.{name}")
+    return converted
@@ -0,0 +1,25 @@
+from sqlalchemy import JSON, BigInteger, Column, DateTime, Index, Integer, String
+from sqlalchemy.dialects.postgresql import JSONB
+from src.database import Base
+
+# Registro de auditoría de las acciones de los administradores (sólo se agregan filas;
+# la API no permite modificarlas ni borrarlas). Se escribe en lote desde src/audit.py
+class AuditLog(Base):
+    __tablename__ = "audit_log"
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)  # Momento de la acción (no de la escritura)
+    actor_id = Column(String, nullable=False)      # ID del administrador
+    actor_email = Column(String)
+    action = Column(String(40), nullable=False)    # user.update, user.roles, user.active, training.update, training.delete
+    entity = Column(String(20), nullable=False)    # user o training
+    entity_id = Column(String, nullable=False)
+    before = Column(JSON().with_variant(JSONB, "postgresql"))  # Valores anteriores de los campos cambiados
+    after = Column(JSON().with_variant(JSONB, "postgresql"))   # Valores nuevos (null si se eliminó)
+
+    # Consultas de /admin/audit: historial de un registro, de un administrador o por fecha,
+    # siempre de lo más nuevo a lo más viejo
+    __table_args__ = (
+        Index("ix_audit_log_entity_id", "entity", "entity_id", "id"),
+        Index("ix_audit_log_actor_id", "actor_id", "id"),
+        Index("ix_audit_log_created_at", "created_at"),
+    )
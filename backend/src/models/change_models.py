@@ -0,0 +1,21 @@
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, func, text
+from src.database import Base, engine
+
+# Transacción que escribió la fila: en PostgreSQL el xid de la transacción (define
+# hasta dónde es seguro leer el registro, ver src/change_feed.py); en SQLite, que
+# serializa las escrituras, alcanza con el orden de `id`
+_TXID_DEFAULT = text("(pg_current_xact_id()::text::bigint)") if engine.dialect.name == "postgresql" else text("0")
+
+# Registro de cambios de usuarios, cursos y datos personales (feed /admin/changes).
+# Las filas con op = "delete" son las lápidas de los registros eliminados.
+class ChangeLog(Base):
+    __tablename__ = "change_log"
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    entity = Column(String(20), nullable=False)   # user, training o person
+    entity_id = Column(String, nullable=False)
+    op = Column(String(10), nullable=False)       # insert, update o delete
+    txid = Column(BigInteger, nullable=False, server_default=_TXID_DEFAULT)
+    changed_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    # El feed lee siempre en orden (txid, id) a partir del cursor
+    __table_args__ = (Index("ix_change_log_txid_id", "txid", "id"),)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, Integer, UniqueConstraint
+from src.database import Base
+
+# Diccionario de valores repetidos de los cursos (país, ciudad, institución, etc.).
+# Cada columna normalizada de Training guarda el ID de su valor en esta tabla.
+class TrainingLookup(Base):
+    __tablename__ = "training_lookups"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String, nullable=False)   # Nombre de la columna de Training
+    value = Column(String, nullable=False)
+
+    __table_args__ = (UniqueConstraint("kind", "value", name="uq_training_lookups_kind_value"),)
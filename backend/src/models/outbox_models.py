@@ -0,0 +1,21 @@
+from sqlalchemy import Column, String, DateTime, Integer, Index
+from src.database import Base
+from datetime import datetime
+
+# Modelo de la bandeja de salida de correos (transactional outbox)
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending, sending, sent o failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    # El worker busca siempre los pendientes cuyo próximo intento ya venció (o los
+    # "sending" cuyo plazo venció)
+    __table_args__ = (Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),)
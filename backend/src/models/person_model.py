@@ -1,7 +1,9 @@
 # models/person_model.py
-from sqlalchemy import Column, String, Integer, Date, ForeignKey, Boolean
+from datetime import datetime
+
+from sqlalchemy import Column, String, Integer, Date, DateTime, ForeignKey, Boolean, Index, func
 from sqlalchemy.orm import relationship
-from src.db.database import Base
+from src.database import Base
 
 class Person(Base):
     __tablename__ = "persons"
@@ -13,15 +15,15 @@ class Person(Base):
     dni_cuit_cuil = Column(String, unique=True, nullable=False)
     fecha_nacimiento = Column(Date, nullable=False)
     nacionalidad = Column(String, nullable=True)
-    identidad_genero = Column(String, nullable=True)
+    identidad_genero = Column(String, nullable=True, index=True)  # Faceta de búsqueda
     etnia = Column(Boolean, default=True)
     etnia_nombre = Column(String, nullable=True)
     estado_civil = Column(String, nullable=True)
-    educacion_nivel = Column(String, nullable=True)
+    educacion_nivel = Column(String, nullable=True, index=True)  # Faceta de búsqueda
     educacion_titulo = Column(String, nullable=True)
     educacion_institucion = Column(String, nullable=True)
     personas_a_cargo = Column(Integer, default=0)
-    tipo_contribuyente = Column(String, nullable=True)
+    tipo_contribuyente = Column(String, nullable=True, index=True)  # Faceta de búsqueda
     actividad_registrada = Column(String, nullable=True)
     telefono = Column(String, nullable=False)
     dir_calle = Column(String, nullable=True)
@@ -29,10 +31,21 @@ class Person(Base):
     dir_piso = Column(String, nullable=True)
     dir_letra_nro_depto = Column(String, nullable=True)
     dir_cp = Column(String, nullable=True)
-    dir_localidad = Column(String, nullable=True)
+    dir_localidad = Column(String, nullable=True, index=True)  # Faceta de búsqueda
     dir_departamento = Column(String, nullable=True)
-    dir_provincia = Column(String, nullable=True)
+    dir_provincia = Column(String, nullable=True)  # Faceta de búsqueda (primera columna de ix_persons_facets)
     dir_pais = Column(String, nullable=True)
+    # Última modificación (server_default cubre las cargas masivas con COPY)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, server_default=func.now(), index=True)
 
     # Relación con el usuario
     user = relationship("User", back_populates="person")
+
+    __table_args__ = (
+        # Índice cubriente de las facetas: el conteo por faceta se resuelve con un
+        # recorrido sólo del índice, sin leer las filas de la tabla
+        Index(
+            "ix_persons_facets",
+            "dir_provincia", "dir_localidad", "educacion_nivel", "identidad_genero", "tipo_contribuyente",
+        ),
+    )
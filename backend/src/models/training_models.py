@@ -1,30 +1,113 @@
-from sqlalchemy import Column, String, Date, Integer, ForeignKey, Table
+import hashlib
+import unicodedata
+from datetime import datetime
+from functools import lru_cache
+
+from sqlalchemy import Column, String, Date, DateTime, Integer, ForeignKey, Table, Index, event, func
 from sqlalchemy.orm import relationship
 from src.database import Base
+from src.lookups import LookupString, lookup_cache
+from src.partitioning import TRAININGS_PARTITIONED
 
+# Las columnas con LookupString guardan el ID del valor en training_lookups
+# (ver src/lookups.py); para el resto del código siguen siendo textos
 class Training(Base):
     __tablename__ = "trainings"
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     nombre_curso = Column(String, nullable=False)
-    institucion = Column(String, nullable=False)
-    tipo_certificado = Column(String, nullable=False)
-    nivel_estudio = Column(String, nullable=False)
-    fecha_inicio = Column(Date)
+    institucion = Column(LookupString("institucion"), ForeignKey("training_lookups.id"), nullable=False)
+    tipo_certificado = Column(LookupString("tipo_certificado"), ForeignKey("training_lookups.id"), nullable=False)
+    nivel_estudio = Column(LookupString("nivel_estudio"), ForeignKey("training_lookups.id"), nullable=False)
+    # Con particionado, fecha_inicio es la clave de partición y debe formar parte de la PK
+    fecha_inicio = Column(Date, primary_key=TRAININGS_PARTITIONED, nullable=not TRAININGS_PARTITIONED)
     fecha_finalizacion = Column(Date)
     horas_duracion = Column(Integer, nullable=False)
     enlace_certificado = Column(String)
-    area_conocimiento = Column(String, nullable=False)
+    area_conocimiento = Column(LookupString("area_conocimiento"), ForeignKey("training_lookups.id"), nullable=False)
     descripcion_curso = Column(String)
     calificacion_nota = Column(String)
-    idioma = Column(String)
+    idioma = Column(LookupString("idioma"), ForeignKey("training_lookups.id"))
     nombre_profesor_instructor = Column(String)
     nombre_programa_estudios = Column(String)
-    pais = Column(String, nullable=False)
-    ciudad = Column(String, nullable=False)
-    estado_provincia = Column(String)
+    pais = Column(LookupString("pais"), ForeignKey("training_lookups.id"), nullable=False)
+    ciudad = Column(LookupString("ciudad"), ForeignKey("training_lookups.id"), nullable=False)
+    estado_provincia = Column(LookupString("estado_provincia"), ForeignKey("training_lookups.id"))
     observaciones = Column(String)
+    # Huella del contenido (ver training_fingerprint); NULL en cursos previos hasta pasar el deduplicado
+    fingerprint = Column(String(32))
+    # Última modificación (server_default cubre las cargas masivas con COPY)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, server_default=func.now(), index=True)
 
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
     user = relationship("User", back_populates="trainings") # Relación uno a muchos con usuario
-    
+
+    # Para el ORM la identidad del curso es siempre `id`, con o sin particionado
+    __mapper_args__ = {"primary_key": [id]}
+    # El índice único incluye fecha_inicio (que ya forma parte de la huella) porque en
+    # una tabla particionada todo índice único debe contener la clave de partición
+    __table_args__ = (
+        Index("ux_trainings_fingerprint", "fingerprint", "fecha_inicio", unique=True),
+        Index("ix_trainings_institucion_id", "institucion", "id"),  # Cursos de una institución (búsqueda)
+        {"postgresql_partition_by": "RANGE (fecha_inicio)"} if TRAININGS_PARTITIONED else {},
+    )
+
+# Columnas del índice único, para ON CONFLICT
+FINGERPRINT_CONFLICT_COLUMNS = ["fingerprint", "fecha_inicio"]
+
+
+# Columnas normalizadas en training_lookups
+LOOKUP_COLUMNS = [column.key for column in Training.__table__.columns if isinstance(column.type, LookupString)]
+
+
+def intern_training_values(db, rows):
+    """
+    Crea en training_lookups los valores nuevos de las columnas normalizadas, dentro
+    de la transacción de `db`. Llamar antes de insertar o modificar cursos.
+    Args:
+        db (Session): Sesión de la escritura.
+        rows (Iterable[dict]): Datos de los cursos.
+    """
+    rows = list(rows)
+    for column in LOOKUP_COLUMNS:
+        values = {row[column] for row in rows if row.get(column) is not None}
+        if values:
+            lookup_cache.intern(column, values, db)
+
+
+@lru_cache(maxsize=65536)  # Instituciones y cursos se repiten mucho entre filas
+def normalize_text(value) -> str:
+    """
+    Normaliza un texto para comparar cursos: sin acentos, en minúsculas y con los
+    espacios colapsados ("  Curso de PYTHÓN " -> "curso de python").
+    """
+    if not value:
+        return ""
+    value = unicodedata.normalize("NFKD", str(value))
+    value = "".join(char for char in value if not unicodedata.combining(char))
+    return " ".join(value.casefold().split())
+
+
+def training_fingerprint(user_id, nombre_curso, institucion, fecha_inicio, fecha_finalizacion) -> str:
+    """
+    Huella del contenido de un curso: mismo usuario, curso, institución y fechas
+    (con nombre e institución normalizados) dan la misma huella.
+    Args:
+        fecha_inicio, fecha_finalizacion (date | str): Fechas o textos ISO (YYYY-MM-DD).
+    Returns:
+        str: BLAKE2b de 128 bits en hexadecimal (32 caracteres).
+    """
+    key = "\x1f".join((
+        str(user_id), normalize_text(nombre_curso), normalize_text(institucion),
+        str(fecha_inicio or ""), str(fecha_finalizacion or ""),
+    ))
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+@event.listens_for(Training, "before_insert")
+@event.listens_for(Training, "before_update")
+def _set_fingerprint(mapper, connection, target: Training):
+    # Los cursos creados o modificados por el ORM mantienen su huella al día
+    target.fingerprint = training_fingerprint(
+        target.user_id, target.nombre_curso, target.institucion, target.fecha_inicio, target.fecha_finalizacion,
+    )
 
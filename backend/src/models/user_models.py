@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, Boolean, DateTime, Integer, ForeignKey, Table
+from sqlalchemy import Column, String, Boolean, DateTime, Integer, ForeignKey, Table, UniqueConstraint, func
 from sqlalchemy.orm import relationship
 from src.database import Base
 from datetime import datetime
@@ -20,6 +20,8 @@ class UserRole(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String, ForeignKey("users.id"))
     role_id = Column(Integer, ForeignKey("roles.id"))
+    # Un rol se asigna una sola vez por usuario (permite INSERT ... ON CONFLICT DO NOTHING)
+    __table_args__ = (UniqueConstraint("user_id", "role_id", name="uq_user_roles_user_role"),)
 
 # Modelo de Role
 class Role(Base):
@@ -28,6 +30,13 @@ class Role(Base):
     rol = Column(String, unique=True, index=True, nullable=False)
     # Relación inversa definida en User
 
+# Versión del catálogo de roles: se incrementa en cada cambio para invalidar
+# el registro en memoria de todos los workers (fila única, id = 1)
+class RoleRegistryVersion(Base):
+    __tablename__ = "role_registry_version"
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
 # Modelo de User
 class User(Base):
     __tablename__ = "users"
@@ -37,6 +46,9 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     last_login = Column(DateTime, default=None, nullable=True)
+    # Última modificación (server_default cubre las cargas masivas con COPY)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, server_default=func.now(), index=True)
     # Relación con roles a través de la tabla UserRole
     roles = relationship("Role", secondary="user_roles", backref="users")
-    trainings = relationship("Training", back_populates="user")  # Relación 1:N con Training
\ No newline at end of file
+    trainings = relationship("Training", back_populates="user")  # Relación 1:N con Training
+    person = relationship("Person", back_populates="user", uselist=False)  # Relación 1:1 con Person
\ No newline at end of file
@@ -0,0 +1,120 @@
+import asyncio
+import os
+from datetime import date
+
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+
+from src.database import engine
+from src.logger import logger
+
+load_dotenv()
+
+# Particionado por rango (año de fecha_inicio) de la tabla trainings; sólo PostgreSQL
+TRAININGS_PARTITIONED = (
+    os.getenv("TRAININGS_PARTITIONED", "false").lower() == "true" and engine.dialect.name == "postgresql"
+)
+TRAININGS_PARTITION_START_YEAR = int(os.getenv("TRAININGS_PARTITION_START_YEAR", "2000"))
+TRAININGS_PARTITIONS_AHEAD = int(os.getenv("TRAININGS_PARTITIONS_AHEAD", "2"))  # Años futuros ya creados
+TRAININGS_PARTITION_CHECK_SECONDS = 24 * 3600
+
+_LOCK_KEY = 0x7472_6169  # Clave del advisory lock: un solo proceso crea particiones a la vez
+
+
+def _partition_name(year: int) -> str:
+    return f"trainings_y{year}"
+
+
+def ensure_training_partitions(today: date | None = None) -> list[str]:
+    """
+    Crea las particiones anuales de trainings que falten, desde
+    TRAININGS_PARTITION_START_YEAR hasta TRAININGS_PARTITIONS_AHEAD años después del
+    actual, más una partición DEFAULT para fechas fuera de ese rango.
+
+    Si la partición DEFAULT ya tiene filas del año a crear, se mueven a la nueva
+    partición en la misma transacción (PostgreSQL no permite crear la partición
+    mientras la DEFAULT contenga filas de su rango).
+    Returns:
+        list[str]: Particiones creadas.
+    """
+    if not TRAININGS_PARTITIONED:
+        return []
+    today = today or date.today()
+    created = []
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _LOCK_KEY})
+        relkind = conn.scalar(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('trainings')"))
+        if relkind != "p":
+            logger.warning("TRAININGS_PARTITIONED activo pero la tabla trainings no está particionada; se omite")
+            return []
+        conn.execute(text("CREATE TABLE IF NOT EXISTS trainings_default PARTITION OF trainings DEFAULT"))
+        existing = set(conn.scalars(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'trainings'::regclass"
+        )))
+        for year in range(TRAININGS_PARTITION_START_YEAR, today.year + TRAININGS_PARTITIONS_AHEAD + 1):
+            name = _partition_name(year)
+            if name in existing:
+                continue
+            bounds = {"desde": date(year, 1, 1), "hasta": date(year + 1, 1, 1)}
+            conn.execute(text(f"CREATE TABLE {name} (LIKE trainings INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+            # La restricción evita que ATTACH vuelva a recorrer la tabla para validar el rango
+            conn.execute(text(
+                f"ALTER TABLE {name} ADD CONSTRAINT {name}_rango "
+                f"CHECK (fecha_inicio IS NOT NULL AND fecha_inicio >= DATE '{bounds['desde']}' "
+                f"AND fecha_inicio < DATE '{bounds['hasta']}')"
+            ))
+            conn.execute(text(
+                f"WITH movidas AS (DELETE FROM trainings_default "
+                f"WHERE fecha_inicio >= :desde AND fecha_inicio < :hasta RETURNING *) "
+                f"INSERT INTO {name} SELECT * FROM movidas"
+            ), bounds)
+            conn.execute(text(
+                f"ALTER TABLE trainings ATTACH PARTITION {name} "
+                f"FOR VALUES FROM (DATE '{bounds['desde']}') TO (DATE '{bounds['hasta']}')"
+            ))
+            created.append(name)
+    if created:
+        logger.info(f"Particiones de trainings creadas: {', '.join(created)}")
+    return created
+
+
+class PartitionMaintainer:
+    """
+    Tarea asyncio que revisa una vez por día que existan las particiones de los
+    próximos años (cubre el cambio de año sin reiniciar la aplicación).
+    """
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(TRAININGS_PARTITION_CHECK_SECONDS)
+            try:
+                await run_in_threadpool(ensure_training_partitions)
+            except Exception as e:
+                logger.error(f"Error creando particiones de trainings: {e}")
+
+    def start(self):
+        """
+        Inicia la revisión diaria (llamar desde el evento startup).
+        """
+        if TRAININGS_PARTITIONED and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """
+        Detiene la revisión diaria (llamar desde el evento shutdown).
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+partition_maintainer = PartitionMaintainer()
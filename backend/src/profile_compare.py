@@ -0,0 +1,58 @@
+"""
+Comparación de perfiles de usuario (src/user_cv.py): el documento que arma
+PostgreSQL con json_build_object/json_agg contra el que arma el ORM.
+
+Las fechas y horas se comparan como valores (PostgreSQL omite los ceros finales
+de los microsegundos) y los roles sin importar el orden. Lo usan
+benchmarks/user_profile.py y tests/test_user_profile.py.
+"""
+import re
+from datetime import datetime
+
+_TIMESTAMP = re.compile(r"(?P<base>\d{4}-\d\d-\d\d(?:[T ]\d\d:\d\d(?::\d\d)?)?)(?:\.(?P<fraction>\d+))?(?P<offset>Z|[+-]\d\d:?\d\d)?$")
+
+
+def parse_timestamp(value: str) -> datetime:
+    """
+    datetime de un texto ISO 8601. PostgreSQL omite los ceros finales de los
+    microsegundos ("12:30:05.12"), y en las zonas horarias puede usar "Z" o "-0300";
+    datetime.fromisoformat no acepta nada de eso antes de Python 3.11, así que se
+    completa la fracción a 6 dígitos y se reescribe la zona como "+HH:MM".
+    """
+    match = _TIMESTAMP.match(value)
+    if match is None:
+        raise ValueError(f"Fecha inválida: {value!r}")
+    text = match["base"]
+    if match["fraction"]:
+        text += "." + match["fraction"][:6].ljust(6, "0")
+    offset = match["offset"]
+    if offset:
+        text += "+00:00" if offset == "Z" else f"{offset[:3]}:{offset[-2:]}"
+    return datetime.fromisoformat(text)
+
+
+def normalize(value, key=None):
+    """Documento comparable: fechas como datetime, roles ordenados por id."""
+    if isinstance(value, dict):
+        return {k: normalize(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        items = [normalize(item) for item in value]
+        return sorted(items, key=lambda role: role["id"]) if key == "roles" else items
+    if isinstance(value, str) and key in ("created_at", "last_login"):
+        return parse_timestamp(value)
+    return value
+
+
+def diff(expected, actual, path="") -> list[str]:
+    """Diferencias entre dos documentos normalizados, una por campo ("ruta: esperado vs obtenido")."""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        problems = [f"{path}.{k}: falta" for k in expected.keys() - actual.keys()]
+        problems += [f"{path}.{k}: sobra" for k in actual.keys() - expected.keys()]
+        for k in expected.keys() & actual.keys():
+            problems += diff(expected[k], actual[k], f"{path}.{k}")
+        return problems
+    if isinstance(expected, list) and isinstance(actual, list):
+        if len(expected) != len(actual):
+            return [f"{path}: {len(expected)} elementos vs {len(actual)}"]
+        return [p for i, (e, a) in enumerate(zip(expected, actual)) for p in diff(e, a, f"{path}[{i}]")]
+    return [] if expected == actual else [f"{path}: {expected!r} vs {actual!r}"]
@@ -0,0 +1,271 @@
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+
+from src.logger import logger
+
+load_dotenv()
+
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() == "true"
+PROFILER_SLOW_MS = float(os.getenv("PROFILER_SLOW_MS", "1000"))         # Se guardan las solicitudes más lentas que esto
+PROFILER_SAMPLE_RATE = float(os.getenv("PROFILER_SAMPLE_RATE", "0"))    # Fracción de solicitudes que se guarda siempre
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "10"))   # Intervalo entre muestras
+PROFILER_DIR = os.getenv("PROFILER_DIR", "src/logs/profiles")
+PROFILER_MAX_FILES = int(os.getenv("PROFILER_MAX_FILES", "200"))        # Se borran los perfiles más viejos
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))  # Duración máxima de un perfil
+PROFILER_MAX_ACTIVE = 64  # Solicitudes perfiladas a la vez; las demás pasan sin perfilar
+
+PROFILE_SUFFIX = ".folded"
+PROFILE_NAME = re.compile(r"^[\w.-]+\.folded$")
+
+# Hilos donde se ejecuta el código síncrono de las solicitudes (run_in_threadpool / asyncio.to_thread)
+_WORKER_THREAD_PREFIXES = ("AnyIO worker thread", "asyncio_")
+# Funciones en las que un hilo está esperando (no suma al tiempo de la solicitud)
+_IDLE_FUNCTIONS = {"wait", "get", "select", "poll", "accept", "_worker", "epoll"}
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py", "thread.py")
+
+
+def _frame_label(frame) -> str:
+    filename = frame.f_code.co_filename.replace("\\", "/")
+    if "site-packages/" in filename:
+        filename = filename.split("site-packages/", 1)[1]
+    elif "/src/" in filename:
+        filename = "src/" + filename.split("/src/", 1)[1]
+    else:
+        filename = os.path.basename(filename)
+    return f"{frame.f_code.co_name} ({filename})"
+
+
+def collapse(frame, root: str) -> str | None:
+    """
+    Pila de llamadas en formato "colapsado" (raíz;...;hoja), el que leen
+    flamegraph.pl, speedscope e inferno. None si el hilo está esperando.
+    """
+    if frame.f_code.co_name in _IDLE_FUNCTIONS and frame.f_code.co_filename.endswith(_IDLE_FILES):
+        return None
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(root)
+    return ";".join(reversed(labels))
+
+
+class _Profile:
+    def __init__(self, frame, loop_thread: int, method: str, path: str, forced: bool):
+        self.frame = frame  # Frame de ProfilingMiddleware.__call__ de la solicitud
+        self.loop_thread = loop_thread
+        self.method = method
+        self.path = path
+        self.forced = forced
+        self.started = time.perf_counter()
+        self.stacks: Counter = Counter()
+        self.truncated = False  # Se dejó de muestrear al llegar a PROFILER_MAX_SECONDS
+
+
+class SamplingProfiler:
+    """
+    Perfilador por muestreo para las solicitudes lentas.
+
+    Mientras haya solicitudes en curso, un hilo toma cada PROFILER_INTERVAL_MS las
+    pilas de todos los hilos (`sys._current_frames`) y las suma a cada solicitud:
+    las del event loop sólo cuando lo que se ejecuta es parte de la solicitud (el
+    frame de su ProfilingMiddleware está en la pila), y las de los hilos del threadpool que no estén esperando (endpoints síncronos,
+    bcrypt, consultas). Con varias solicitudes simultáneas, las muestras del
+    threadpool se reparten entre todas: el perfil es aproximado.
+
+    Al terminar, la solicitud se guarda si tardó más de PROFILER_SLOW_MS (o si fue
+    elegida al azar, PROFILER_SAMPLE_RATE); si no, sus muestras se descartan. Sin
+    solicitudes en curso el hilo queda detenido.
+
+    Una solicitud deja de muestrearse a los PROFILER_MAX_SECONDS (el perfil se guarda
+    truncado al terminar), así una descarga larga no ocupa un lugar de
+    PROFILER_MAX_ACTIVE ni acumula pilas indefinidamente.
+    """
+
+    def __init__(self):
+        self._active: set[_Profile] = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def begin(self, frame, method: str, path: str) -> _Profile | None:
+        with self._lock:
+            if len(self._active) >= PROFILER_MAX_ACTIVE:
+                return None
+            profile = _Profile(
+                frame, threading.get_ident(), method, path,
+                forced=random.random() < PROFILER_SAMPLE_RATE,
+            )
+            self._active.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return profile
+
+    def cancel(self, profile: _Profile):
+        """Deja de muestrear la solicitud y descarta su perfil (no se guardará)."""
+        with self._lock:
+            self._active.discard(profile)
+            profile.stacks.clear()
+
+    def end(self, profile: _Profile) -> float:
+        """Quita la solicitud del muestreo y devuelve su duración en milisegundos."""
+        with self._lock:
+            self._active.discard(profile)
+        return (time.perf_counter() - profile.started) * 1000
+
+    def _run(self):
+        interval = PROFILER_INTERVAL_MS / 1000
+        while True:
+            with self._lock:
+                now = time.perf_counter()
+                for profile in [profile for profile in self._active if now - profile.started > PROFILER_MAX_SECONDS]:
+                    profile.truncated = True
+                    self._active.discard(profile)
+                active = list(self._active)
+                if not active:
+                    self._wakeup.clear()
+            if not active:
+                self._wakeup.wait()
+                continue
+            frames = sys._current_frames()
+            worker_threads = {
+                thread.ident for thread in threading.enumerate() if thread.name.startswith(_WORKER_THREAD_PREFIXES)
+            }
+            workers = Counter()
+            for thread_id, frame in frames.items():
+                if thread_id in worker_threads:
+                    stack = collapse(frame, "threadpool")
+                    if stack:
+                        workers[stack] += 1
+            owners = {profile.frame: profile for profile in active}
+            loop_samples = [
+                _loop_sample(frames[thread_id], owners)
+                for thread_id in {profile.loop_thread for profile in active} if thread_id in frames
+            ]
+            with self._lock:  # Las solicitudes ya terminadas (end) no reciben más muestras
+                for profile in active:
+                    if profile in self._active:
+                        profile.stacks.update(workers)
+                for owner, stack in loop_samples:
+                    if stack and owner in self._active:
+                        owner.stacks[stack] += 1
+            time.sleep(interval)
+
+    def should_save(self, profile: _Profile, elapsed_ms: float) -> bool:
+        return bool(profile.stacks) and (profile.forced or elapsed_ms >= PROFILER_SLOW_MS)
+
+    def save(self, profile: _Profile, elapsed_ms: float) -> str:
+        """
+        Escribe el perfil en PROFILER_DIR (una línea "pila cantidad" por pila) y
+        borra los más viejos si hay más de PROFILER_MAX_FILES.
+        """
+        os.makedirs(PROFILER_DIR, exist_ok=True)
+        route = re.sub(r"[^\w]+", "_", profile.path).strip("_") or "root"
+        truncated = "_truncado" if profile.truncated else ""
+        name = f"{datetime.now():%Y%m%dT%H%M%S%f}_{profile.method}_{route[:80]}_{elapsed_ms:.0f}ms{truncated}{PROFILE_SUFFIX}"
+        with open(os.path.join(PROFILER_DIR, name), "w", encoding="utf-8") as file:
+            for stack, count in profile.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+        profiles = list_profiles()
+        for old in profiles[PROFILER_MAX_FILES:]:
+            try:
+                os.remove(os.path.join(PROFILER_DIR, old["name"]))
+            except OSError:
+                pass
+        return name
+
+
+def _loop_sample(loop_frame, owners: dict) -> tuple["_Profile | None", str | None]:
+    # La solicitud dueña de lo que ejecuta el event loop es la del frame de
+    # ProfilingMiddleware.__call__ que aparezca en su pila
+    frame = loop_frame
+    while frame is not None:
+        owner = owners.get(frame)
+        if owner is not None:
+            return owner, collapse(loop_frame, "event-loop")
+        frame = frame.f_back
+    return None, None
+
+
+def list_profiles() -> list[dict]:
+    """Perfiles guardados, del más nuevo al más viejo."""
+    try:
+        entries = [entry for entry in os.scandir(PROFILER_DIR) if entry.name.endswith(PROFILE_SUFFIX)]
+    except FileNotFoundError:
+        return []
+    entries.sort(key=lambda entry: entry.name, reverse=True)  # El nombre empieza con la fecha
+    return [
+        {"name": entry.name, "size": entry.stat().st_size, "created_at": datetime.fromtimestamp(entry.stat().st_mtime)}
+        for entry in entries
+    ]
+
+
+def profile_path(name: str) -> str | None:
+    """Ruta de un perfil guardado, o None si el nombre no es válido o no existe."""
+    if not PROFILE_NAME.match(name):
+        return None
+    path = os.path.join(PROFILER_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+sampling_profiler = SamplingProfiler()
+
+
+def _is_event_stream(message) -> bool:
+    return any(
+        name.lower() == b"content-type" and value.startswith(b"text/event-stream")
+        for name, value in message.get("headers", [])
+    )
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI que perfila las solicitudes con `sampling_profiler` cuando
+    PROFILER_ENABLED es true; si no, no hace nada.
+
+    Debe ser el middleware más interno: BaseHTTPMiddleware ejecuta el resto de la
+    solicitud en otra tarea, cuya pila ya no incluiría el frame de este middleware.
+
+    Las respuestas text/event-stream (ej. /admin/events) duran lo que dure la
+    conexión y casi todo el tiempo esperan eventos: se dejan de perfilar al empezar
+    la respuesta.
+    """
+
+    def __init__(self, app, profiler: SamplingProfiler = sampling_profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not PROFILER_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        profile = self.profiler.begin(sys._getframe(), scope["method"], scope["path"])
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and _is_event_stream(message):
+                self.profiler.cancel(profile)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed_ms = self.profiler.end(profile)
+            if self.profiler.should_save(profile, elapsed_ms):
+                try:
+                    name = await run_in_threadpool(self.profiler.save, profile, elapsed_ms)
+                    logger.info(f"Perfil de {scope['method']} {scope['path']} ({elapsed_ms:.0f} ms): {name}")
+                except OSError as e:
+                    logger.error(f"No se pudo guardar el perfil: {e}")
@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from src.database import SessionLocal
+from src.logger import logger
+from src.models.user_models import Role, RoleRegistryVersion
+
+load_dotenv()
+
+ROLE_REGISTRY_CHECK_SECONDS = float(os.getenv("ROLE_REGISTRY_CHECK_SECONDS", "10"))
+
+
+class RoleRegistry:
+    """
+    Registro en memoria de los roles (nombre <-> ID), compartido por todo el proceso.
+
+    Se carga al iniciar la aplicación y evita consultar la tabla `roles` en cada
+    registro o cambio de roles. Quien modifique los roles debe llamar a
+    `invalidate()`, que incrementa la versión en `role_registry_version`; el resto
+    de los workers compara esa versión como mucho cada ROLE_REGISTRY_CHECK_SECONDS
+    y recarga el catálogo si cambió.
+    """
+
+    def __init__(self, check_interval: float = ROLE_REGISTRY_CHECK_SECONDS):
+        self._by_name: dict[str, int] = {}
+        self._by_id: dict[int, str] = {}
+        self._version: int | None = None
+        self._check_interval = check_interval
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def load(self, db: Session | None = None):
+        """
+        Carga (o recarga) los roles y la versión actual desde la base de datos.
+        Args:
+            db (Session, opcional): Sesión a utilizar; si no se indica se abre una.
+        """
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            version = db.scalar(select(RoleRegistryVersion.version).where(RoleRegistryVersion.id == 1))
+            roles = db.execute(select(Role.id, Role.rol)).all()
+        finally:
+            if own_session:
+                db.close()
+        with self._lock:
+            # Se reemplazan los diccionarios completos: los lectores nunca ven un estado parcial
+            self._by_name = {rol.lower(): role_id for role_id, rol in roles}
+            self._by_id = {role_id: rol for role_id, rol in roles}
+            self._version = version or 0
+            self._next_check = time.monotonic() + self._check_interval
+
+    def invalidate(self, db: Session | None = None):
+        """
+        Marca el catálogo de roles como modificado (para todos los workers) y lo recarga.
+        Llamar después del commit que cambió la tabla `roles`.
+        """
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            bumped = db.execute(
+                update(RoleRegistryVersion)
+                .where(RoleRegistryVersion.id == 1)
+                .values(version=RoleRegistryVersion.version + 1)
+            ).rowcount
+            if not bumped:
+                db.add(RoleRegistryVersion(id=1, version=1))
+            db.commit()
+            self.load(db)
+        finally:
+            if own_session:
+                db.close()
+
+    def _ensure_fresh(self):
+        if self._version is None:
+            self.load()
+            return
+        if time.monotonic() < self._next_check:
+            return
+        try:
+            db = SessionLocal()
+            try:
+                version = db.scalar(select(RoleRegistryVersion.version).where(RoleRegistryVersion.id == 1)) or 0
+            finally:
+                db.close()
+        except Exception as e:
+            # Sin base de datos se sigue usando el catálogo en memoria
+            logger.error(f"Error verificando la versión de roles: {e}")
+            return
+        if version != self._version:
+            self.load()
+        else:
+            self._next_check = time.monotonic() + self._check_interval
+
+    def id_of(self, name: str) -> int | None:
+        """
+        Devuelve el ID del rol `name` (sin distinguir mayúsculas), o None si no existe.
+        """
+        self._ensure_fresh()
+        return self._by_name.get(name.lower())
+
+    def name_of(self, role_id: int) -> str | None:
+        """
+        Devuelve el nombre del rol con ID `role_id`, o None si no existe.
+        """
+        self._ensure_fresh()
+        return self._by_id.get(role_id)
+
+    def ids(self) -> set[int]:
+        """
+        Devuelve el conjunto de IDs de roles existentes.
+        """
+        self._ensure_fresh()
+        return set(self._by_id)
+
+
+role_registry = RoleRegistry()
@@ -0,0 +1,249 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.orm import Session
+
+from src.audit import audit_buffer
+from src.change_feed import CHANGES_MAX_LIMIT, TRACKED_MODELS, InvalidCursor, decode_cursor, head_cursor, stream_changes
+from src.database import get_db
+from src.events import SSE_KEEPALIVE_SECONDS, event_broker
+from src.models.audit_models import AuditLog
+from src.profiler import list_profiles, profile_path
+from src.schemas.audit_schemas import AuditLogOut
+from src.utils import get_current_user, has_user_role
+
+admin_ops = APIRouter()
+
+AUDIT_MAX_LIMIT = 1000  # Máximo de filas por página del registro de auditoría
+
+# Feed de cambios para sincronización incremental (Sólo para Administradores)
+@admin_ops.get("/changes", description="Cambios de usuarios, cursos y datos personales desde un cursor (NDJSON)")
+def get_changes(
+    since: str | None = Query(None, description="Cursor del último cambio procesado; sin cursor se lee desde el principio"),
+    limit: int = Query(1000, ge=1, le=CHANGES_MAX_LIMIT, description="Cantidad máxima de cambios"),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Feed de altas, modificaciones y bajas de usuarios, cursos y datos personales.
+
+    La respuesta es NDJSON, una línea por cambio en el orden del registro:
+    `{"cursor", "entity", "id", "op", "changed_at", "data"}`, donde `data` es el
+    estado actual de la fila (null si fue eliminada). Para seguir leyendo se vuelve
+    a llamar con `since` igual al cursor de la última línea procesada; si llegan
+    menos de `limit` líneas no hay más cambios por ahora.
+
+    Args:
+        since (str): Cursor desde el cual leer (exclusivo).
+        limit (int): Cantidad máxima de cambios.
+
+    Returns:
+        StreamingResponse: Cambios en formato NDJSON.
+    """
+    # Verificar si el usuario tiene el rol "admin"
+    if not has_user_role(current_user, ["admin"]):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para realizar esta acción",
+        )
+    try:
+        after = decode_cursor(since)
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido",
+        )
+    return StreamingResponse(stream_changes(after, limit), media_type="application/x-ndjson")
+
+@admin_ops.get("/changes/head", description="Cursor del último cambio registrado")
+def get_changes_head(db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    """
+    Cursor del último cambio visible. Después de una carga completa con los listados
+    paginados, se empieza a seguir el feed desde este cursor (obtenido antes de la carga).
+
+    Returns:
+        dict: `{"cursor": str}`.
+    """
+    # Verificar si el usuario tiene el rol "admin"
+    if not has_user_role(current_user, ["admin"]):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para realizar esta acción",
+        )
+    return {"cursor": head_cursor(db)}
+
+# Eventos de cambios en tiempo real para los tableros de administración (SSE)
+@admin_ops.get("/events", description="Eventos de cambios de usuarios, cursos y datos personales (Server-Sent Events)")
+async def get_events(
+    request: Request,
+    entity: Optional[List[str]] = Query(None, description="Entidades a recibir (user, training, person); por defecto todas"),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Stream SSE con un evento por cambio confirmado: `event: change` y
+    `data: {"entity", "id", "op"}` (`id` null cuando la operación alcanzó a varias
+    filas). Reemplaza la consulta periódica de los listados: el tablero sólo vuelve
+    a pedir lo que cambió.
+
+    Si el cliente no consume a tiempo y su cola (SSE_CLIENT_BUFFER eventos) se
+    llena, se descartan los eventos pendientes y recibe `event: resync`: debe volver
+    a cargar los listados. Cada SSE_KEEPALIVE_SECONDS sin eventos se envía un
+    comentario para mantener abierta la conexión.
+
+    Args:
+        entity (List[str]): Filtrar por entidad.
+
+    Returns:
+        StreamingResponse: Stream text/event-stream.
+    """
+    # Verificar si el usuario tiene el rol "admin"
+    if not has_user_role(current_user, ["admin"]):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para realizar esta acción",
+        )
+    valid_entities = set(TRACKED_MODELS.values())
+    if entity and not set(entity) <= valid_entities:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Entidad inválida. Entidades válidas: {', '.join(sorted(valid_entities))}",
+        )
+
+    subscription = event_broker.subscribe(set(entity) if entity else None)
+
+    async def stream():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    item = await asyncio.wait_for(subscription.queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                if item is None:  # Apagado del servidor
+                    break
+                if item.get("type") == "resync":
+                    yield "event: resync\ndata: {}\n\n"
+                else:
+                    yield f"event: change\ndata: {json.dumps(item)}\n\n"
+        finally:
+            event_broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},  # Sin buffer en proxies (nginx)
+    )
+
+# Perfiles de las solicitudes lentas (Sólo para Administradores)
+@admin_ops.get("/profiles", description="Perfiles guardados de solicitudes lentas")
+def get_profiles(current_user: dict = Depends(get_current_user)):
+    """
+    Perfiles por muestreo guardados por src/profiler.py (con PROFILER_ENABLED=true),
+    del más nuevo al más viejo. El nombre indica fecha, método, ruta y duración.
+
+    Returns:
+        List[dict]: `{"name", "size", "created_at"}` por perfil.
+    """
+    # Verificar si el usuario tiene el rol "admin"
+    if not has_user_role(current_user, ["admin"]):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para realizar esta acción",
+        )
+    return list_profiles()
+
+@admin_ops.get("/profiles/{name}", description="Descargar un perfil (pilas colapsadas)")
+def get_profile(name: str, current_user: dict = Depends(get_current_user)):
+    """
+    Perfil en formato de pilas colapsadas ("raíz;...;hoja cantidad" por línea),
+    para abrir con speedscope o generar un flamegraph con flamegraph.pl / inferno.
+
+    Args:
+        name (str): Nombre del perfil (ver /admin/profiles).
+
+    Returns:
+        FileResponse: Archivo de texto.
+    """
+    # Verificar si el usuario tiene el rol "admin"
+    if not has_user_role(current_user, ["admin"]):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para realizar esta acción",
+        )
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Perfil no encontrado",
+        )
+    return FileResponse(path, media_type="text/plain", filename=name)
+
+# Registro de auditoría de las acciones de los administradores (Sólo para Administradores)
+@admin_ops.get("/audit", response_model=List[AuditLogOut], description="Registro de auditoría de las acciones de administración")
+def get_audit_log(
+    entity: Optional[str] = Query(None, description="Entidad (user o training)"),
+    entity_id: Optional[str] = Query(None, description="ID del registro (requiere entity)"),
+    actor_id: Optional[str] = Query(None, description="ID del administrador"),
+    action: Optional[str] = Query(None, description="Acción, p. ej. user.update"),
+    since: Optional[datetime] = Query(None, description="Desde (inclusive)"),
+    until: Optional[datetime] = Query(None, description="Hasta (exclusive)"),
+    before_id: Optional[int] = Query(None, description="Cursor: filas con ID menor a éste (el último de la página anterior)"),
+    limit: int = Query(100, ge=1, le=AUDIT_MAX_LIMIT, description="Cantidad máxima de filas"),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Acciones de los administradores, de la más nueva a la más vieja, con los valores
+    anteriores (`before`) y nuevos (`after`) de los campos que cambiaron. Para la
+    página siguiente se vuelve a llamar con `before_id` igual al `id` de la última fila.
+
+    Args:
+        entity (str): Filtrar por entidad.
+        entity_id (str): Filtrar por registro (historial de un usuario o curso).
+        actor_id (str): Filtrar por administrador.
+        action (str): Filtrar por acción.
+        since (datetime): Desde esta fecha.
+        until (datetime): Hasta esta fecha.
+        before_id (int): Cursor de paginación.
+        limit (int): Cantidad máxima de filas.
+
+    Returns:
+        List[AuditLogOut]: Filas del registro.
+    """
+    # Verificar si el usuario tiene el rol "admin"
+    if not has_user_role(current_user, ["admin"]):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para realizar esta acción",
+        )
+    if entity_id is not None and entity is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Para filtrar por entity_id se debe indicar entity",
+        )
+
+    # Las acciones recientes pueden estar aún en el buffer
+    audit_buffer.flush()
+
+    query = db.query(AuditLog)
+    if entity is not None:
+        query = query.filter(AuditLog.entity == entity)
+    if entity_id is not None:
+        query = query.filter(AuditLog.entity_id == entity_id)
+    if actor_id is not None:
+        query = query.filter(AuditLog.actor_id == actor_id)
+    if action is not None:
+        query = query.filter(AuditLog.action == action)
+    if since is not None:
+        query = query.filter(AuditLog.created_at >= since)
+    if until is not None:
+        query = query.filter(AuditLog.created_at < until)
+    if before_id is not None:
+        query = query.filter(AuditLog.id < before_id)
+    return query.order_by(AuditLog.id.desc()).limit(limit).all()
@@ -1,18 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
+from sqlalchemy import delete, func, insert, select, update
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError # PAra el debug de errores
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from passlib.context import CryptContext
-from typing import List
+from pydantic import ValidationError
+from typing import Any, Dict, List
+from datetime import datetime, timezone, timedelta
+from uuid import uuid4
 
-from src.models.user_models import User, Role, UserRole
-from src.schemas.user_schemas import UserOut, UserUpdate, RoleOut
+from src.models.user_models import User, Role, UserRole, TokenRecovery
+from src.models.outbox_models import EmailOutbox
+from src.schemas.user_schemas import UserOut, UserUpdate, RoleOut, UserCreate, UserBulkReport, UserBulkResult, UserRoleBulkPatch, UserRoleBulkResult, UserSearchHit, UserCVRequest
 
-from src.database import get_db
-from src.utils import get_password_hash, validar_password,get_current_user,has_user_role
+from src.audit import audit_buffer, snapshot
+from src.change_feed import record_changes, record_changes_from_select
+from src.database import dialect_insert, get_db
+from src.fuzzy_search import FUZZY_SEARCH_MAX_RESULTS, search_users
+from src.mailer import confirmation_email
+from src.role_registry import role_registry
+from src.token_utils import create_access_token, revoke_user_tokens
+from src.user_cv import stream_cvs
+from src.utils import get_password_hash, hash_passwords, validar_password,get_current_user,has_user_role
 
 admin_router = APIRouter()
 
+BULK_MAX_USERS = 10000  # Máximo de usuarios por alta masiva
+BULK_CHUNK_SIZE = 500   # Usuarios por transacción
+
 @admin_router.get("/users", response_model=List[UserOut], description="Obtener todos los usuarios")
 async def get_users(db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
 
@@ -28,6 +44,267 @@ async def get_users(db: Session = Depends(get_db), current_user: dict = Depends(
     users = db.query(User).all()
     return users
 
+@admin_router.get("/users/search", response_model=List[UserSearchHit], description="Buscar usuarios por email aproximado")
+def search_users_by_email(
+    q: str = Query(..., min_length=2, description="Email o parte del email, admite errores de tipeo"),
+    limit: int = Query(20, ge=1, le=FUZZY_SEARCH_MAX_RESULTS, description="Cantidad máxima de resultados"),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Búsqueda aproximada de usuarios por email (Sólo para Administradores).
+    No distingue mayúsculas ni acentos; ver src/fuzzy_search.py.
+    Args:
+        q (str): Texto a buscar.
+        limit (int): Cantidad máxima de resultados.
+    Returns:
+        List[UserSearchHit]: Usuarios ordenados del más al menos parecido.
+    """
+    # Verificar si el usuario tiene el rol "admin"
+    if not has_user_role(current_user, ["admin"]):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para realizar esta acción",
+        )
+    return [
+        UserSearchHit(id=user.id, email=user.email, is_active=user.is_active, score=score)
+        for user, score in search_users(db, q, limit)
+    ]
+
+@admin_router.post("/users/bulk", response_model=UserBulkReport, status_code=status.HTTP_201_CREATED, description="Alta masiva de usuarios")
+def create_users_bulk(users_in: List[Dict[str, Any]] = Body(..., max_length=BULK_MAX_USERS), db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    """
+    Alta masiva de usuarios (Sólo para Administradores).
+    Cada entrada tiene el formato de UserCreate. Las contraseñas se hashean en un pool
+    de procesos, los roles se resuelven una sola vez y los usuarios, sus roles, los
+    tokens de verificación y los emails se insertan por lotes, una transacción cada
+    BULK_CHUNK_SIZE usuarios. Un error en una fila no impide el alta de las demás.
+    Args:
+        users_in (List[UserCreate]): Usuarios a crear.
+    Returns:
+        UserBulkReport: Resultado por fila (índice en la carga, estado, ID o detalle del error).
+    """
+    # Verificar si el usuario tiene el rol "admin"
+    if not has_user_role(current_user, ["admin"]):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para realizar esta acción",
+        )
+
+    results = [UserBulkResult(index=index, status="error") for index in range(len(users_in))]
+
+    # Rol por defecto de las filas sin "roles": "user", igual que en el registro individual
+    user_role_id = role_registry.id_of("user")
+    if user_role_id is None:
+        user_role = Role(rol="user")
+        db.add(user_role)
+        db.commit()
+        role_registry.invalidate(db)
+        user_role_id = user_role.id
+    role_ids = role_registry.ids()
+
+    # Validar cada fila: esquema, contraseña, roles y emails repetidos dentro de la carga
+    valid = []
+    seen_emails = set()
+    for index, raw in enumerate(users_in):
+        result = results[index]
+        try:
+            user_in = UserCreate.model_validate(raw)
+        except ValidationError as e:
+            result.email = raw.get("email") if isinstance(raw.get("email"), str) else None
+            result.detail = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            continue
+        result.email = user_in.email
+        try:
+            validar_password(user_in.password)
+        except HTTPException as e:
+            result.detail = e.detail
+            continue
+        if user_in.email in seen_emails:
+            result.detail = "El correo electrónico está repetido en la carga"
+            continue
+        if "roles" not in user_in.model_fields_set:
+            user_in.roles = [user_role_id]
+        unknown_roles = set(user_in.roles or []) - role_ids
+        if unknown_roles:
+            result.detail = f"Roles no encontrados: {sorted(unknown_roles)}"
+            continue
+        seen_emails.add(user_in.email)
+        valid.append((index, user_in))
+
+    # Hashear todas las contraseñas válidas en paralelo
+    hashes = hash_passwords([user_in.password for _, user_in in valid])
+
+    for start in range(0, len(valid), BULK_CHUNK_SIZE):
+        chunk = list(zip(valid[start:start + BULK_CHUNK_SIZE], hashes[start:start + BULK_CHUNK_SIZE]))
+
+        # Emails ya registrados: una sola consulta por lote
+        emails = [user_in.email for (_, user_in), _ in chunk]
+        existing = {email for (email,) in db.query(User.email).filter(User.email.in_(emails))}
+
+        now = datetime.now(timezone.utc)
+        users_rows, roles_rows, tokens_rows, emails_rows, created = [], [], [], [], []
+        for (index, user_in), hashed_password in chunk:
+            if user_in.email in existing:
+                results[index].detail = "El correo electrónico ya está registrado"
+                continue
+            new_user_id = str(uuid4())
+            registration_token = create_access_token(
+                data={"sub": new_user_id, "roles": ["unverified"]},
+                expires_delta=1440  # 24 horas en minutos
+            )
+            subject, body = confirmation_email(registration_token)
+            users_rows.append({
+                "id": new_user_id,
+                "email": user_in.email,
+                "hashed_password": hashed_password,
+                "is_active": False,
+                "created_at": now,
+            })
+            roles_rows.extend({"user_id": new_user_id, "role_id": role_id} for role_id in set(user_in.roles or []))
+            tokens_rows.append({
+                "user_id": new_user_id,
+                "token_payload": registration_token,
+                "expires_at": now + timedelta(minutes=1440),
+            })
+            emails_rows.append({"recipient": user_in.email, "subject": subject, "body": body})
+            created.append((index, new_user_id))
+
+        if not created:
+            continue
+        try:
+            db.execute(insert(User), users_rows)
+            record_changes(db, "user", [row["id"] for row in users_rows], "insert")
+            if roles_rows:
+                db.execute(insert(UserRole), roles_rows)
+            db.execute(insert(TokenRecovery), tokens_rows)
+            db.execute(insert(EmailOutbox), emails_rows)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            for index, _ in created:
+                results[index].detail = "Error en el registro del lote"
+            continue
+        for index, new_user_id in created:
+            results[index].status = "created"
+            results[index].id = new_user_id
+
+    created_count = sum(1 for result in results if result.status == "created")
+    return UserBulkReport(created=created_count, errors=len(results) - created_count, results=results)
+
+@admin_router.patch("/users/roles", response_model=UserRoleBulkResult, description="Asignar y quitar roles a muchos usuarios")
+def patch_users_roles(patch: UserRoleBulkPatch, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    """
+    Asignar y quitar roles a muchos usuarios a la vez (Sólo para Administradores).
+    Los usuarios se indican por lista de IDs, por filtro o por ambos (se combinan).
+    Cada operación es una única sentencia sobre user_roles: INSERT ... SELECT con
+    ON CONFLICT DO NOTHING para los roles agregados y DELETE ... WHERE para los quitados.
+    Args:
+        patch (UserRoleBulkPatch): Roles a agregar/quitar y usuarios alcanzados.
+    Returns:
+        UserRoleBulkResult: Cantidad de asignaciones agregadas y quitadas.
+    """
+    # Verificar si el usuario tiene el rol "admin"
+    if not has_user_role(current_user, ["admin"]):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para realizar esta acción",
+        )
+
+    if patch.user_ids is None and patch.filter is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Debe indicar user_ids o filter",
+        )
+    add, remove = set(patch.add), set(patch.remove)
+    if add & remove:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Roles a agregar y quitar a la vez: {sorted(add & remove)}",
+        )
+    unknown_roles = (add | remove) - role_registry.ids()
+    if unknown_roles:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Roles no encontrados: {sorted(unknown_roles)}",
+        )
+
+    # Condiciones sobre la tabla users que definen el conjunto de usuarios alcanzados
+    conditions = []
+    if patch.user_ids is not None:
+        conditions.append(User.id.in_(patch.user_ids))
+    if patch.filter is not None:
+        if patch.filter.is_active is not None:
+            conditions.append(User.is_active == patch.filter.is_active)
+        if patch.filter.role_id is not None:
+            conditions.append(User.id.in_(select(UserRole.user_id).where(UserRole.role_id == patch.filter.role_id)))
+        if patch.filter.email_domain:
+            # autoescape: "%" y "_" del dominio se toman literalmente
+            conditions.append(func.lower(User.email).endswith("@" + patch.filter.email_domain.lower(), autoescape=True))
+    if not conditions:
+        # Un filtro vacío alcanzaría a todos los usuarios
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El filtro debe tener al menos un criterio",
+        )
+
+    added = removed = 0
+    demoted = set()
+    try:
+        if add:
+            # Producto usuarios x roles; las asignaciones existentes se omiten por la restricción única
+            stmt = dialect_insert(UserRole).from_select(
+                ["user_id", "role_id"],
+                select(User.id, Role.id).where(*conditions, Role.id.in_(add)),
+            ).on_conflict_do_nothing(index_elements=["user_id", "role_id"])
+            added = db.execute(stmt).rowcount
+        if remove:
+            stmt = delete(UserRole).where(
+                UserRole.role_id.in_(remove),
+                UserRole.user_id.in_(select(User.id).where(*conditions)),
+            ).returning(UserRole.user_id)
+            removed_rows = db.scalars(stmt).all()
+            removed = len(removed_rows)
+            demoted = set(removed_rows)
+        if add or remove:
+            # Los roles forman parte del usuario: cuenta como modificación para el feed de cambios
+            db.execute(update(User).where(*conditions).values(updated_at=datetime.utcnow()))
+            record_changes_from_select(db, "user", User.id, "update", *conditions)
+        db.commit()
+    except SQLAlchemyError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error al actualizar los roles",
+        )
+    # Los usuarios que perdieron roles no pueden seguir renovando tokens con los roles viejos
+    for user_id in demoted:
+        revoke_user_tokens(user_id)
+    return UserRoleBulkResult(added=added, removed=removed)
+
+@admin_router.post("/users/cv", description="Obtener los CVs de muchos usuarios (NDJSON)")
+def get_users_cv(cv_request: UserCVRequest, current_user: dict = Depends(get_current_user)):
+    """
+    CVs de hasta 500 usuarios en una sola llamada (Sólo para Administradores):
+    datos del usuario con roles, cursos y datos personales, en lugar de pedir
+    `/admin_user/{user_id}` y `/admin_training/{user_id}/training` por cada uno.
+
+    La respuesta es NDJSON, una línea por usuario con el esquema UserCV, en el
+    orden pedido; los IDs inexistentes se omiten. Se resuelve con cuatro consultas
+    con listas IN por cada grupo de 100 usuarios.
+    Args:
+        cv_request (UserCVRequest): IDs de los usuarios.
+    Returns:
+        StreamingResponse: CVs en formato NDJSON.
+    """
+    # Verificar si el usuario tiene el rol "admin"
+    if not has_user_role(current_user, ["admin"]):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para realizar esta acción",
+        )
+    return StreamingResponse(stream_cvs(cv_request.user_ids), media_type="application/x-ndjson")
+
 @admin_router.get("/{user_id}", response_model=UserOut, description="Obtener un usuario por ID")
 async def get_user(user_id: str, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
     """
@@ -68,6 +345,7 @@ async def update_user(user_id: str, user_in: UserUpdate, db: Session = Depends(g
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Usuario no encontrado",
         )
+    before = snapshot(user)
     
     # Actualizar los datos del usuario
     if user_in.email:
@@ -79,6 +357,7 @@ async def update_user(user_id: str, user_in: UserUpdate, db: Session = Depends(g
     # Guardar los cambios
     db.commit()
     db.refresh(user)
+    audit_buffer.record(current_user, "user.update", "user", user.id, before, snapshot(user))
     
     # Devolver el usuario actualizado
     return user
@@ -103,20 +382,31 @@ async def update_user_roles(user_id: str, roles: List[int], db: Session = Depend
             detail="Usuario no encontrado",
         )
     
-    # Buscar los roles en la base de datos
-    roles_db = db.query(Role).filter(Role.id.in_(roles)).all()
-    if not roles_db:
+    # Validar los roles contra el registro en memoria
+    roles_ids = set(roles) & role_registry.ids()
+    if not roles_ids:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Roles no encontrados",
         )
+    before = snapshot(user, roles=sorted(role.rol for role in user.roles))
+    demoted = any(role.id not in roles_ids for role in user.roles)
     
-    # Actualizar los roles del usuario
-    user.roles = roles_db
+    # Actualizar los roles del usuario: se quitan los que sobran y se agregan los que faltan
+    db.execute(delete(UserRole).where(UserRole.user_id == user_id, UserRole.role_id.not_in(roles_ids)))
+    db.execute(
+        dialect_insert(UserRole)
+        .values([{"user_id": user_id, "role_id": role_id} for role_id in roles_ids])
+        .on_conflict_do_nothing(index_elements=["user_id", "role_id"])
+    )
+    user.updated_at = datetime.utcnow()  # Registra la modificación en el feed de cambios
     
     # Guardar los cambios
     db.commit()
     db.refresh(user)
+    audit_buffer.record(current_user, "user.roles", "user", user.id, before, snapshot(user, roles=sorted(role.rol for role in user.roles)))
+    if demoted:
+        revoke_user_tokens(user.id)  # No puede seguir renovando tokens con los roles quitados
     
     # Devolver el usuario actualizado
     return user
@@ -139,10 +429,14 @@ async def delete_user(user_id: str, db: Session = Depends(get_db), current_user:
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Usuario no encontrado",
         )
+    before = snapshot(user)
     if user.is_active:
         user.is_active = False
     else:
         user.is_active = True
     db.commit()
     db.refresh(user)
+    audit_buffer.record(current_user, "user.active", "user", user.id, before, snapshot(user))
+    if not user.is_active:
+        revoke_user_tokens(user.id)  # Sus tokens dejan de servir, incluido el refresh
     return user
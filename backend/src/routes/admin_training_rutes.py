@@ -1,37 +1,56 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import asc, desc
-from sqlalchemy.exc import SQLAlchemyError # Para el debug de errores
+from sqlalchemy import asc, desc, extract, func
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError # Para el debug de errores
 from typing import List, Optional
+from datetime import date
 
-from src.models.training_models import Training
-from src.schemas.trainig_schemas import TrainingOut, TrainingUpdate, TrainingCreate
+from src.models.training_models import Training, intern_training_values
+from src.schemas.trainig_schemas import TrainingOut, TrainingUpdate, TrainingCreate, TrainingYearStats, TrainingDedupeStatus, TrainingSearchHit
 
-from src.database import get_db
+from src.audit import audit_buffer, snapshot
+from src.database import db_session, get_db
+from src.fuzzy_search import FUZZY_SEARCH_MAX_RESULTS, search_trainings
+from src.training_dedupe import training_dedupe_job
 from src.utils import get_current_user, has_user_role
 
 admin_training = APIRouter()
 
+TRAININGS_MAX_PER_PAGE = 1000       # Tope de registros por página
+TRAININGS_STREAM_THRESHOLD = 200    # Páginas más grandes se envían en streaming
+# Tiempo máximo por sentencia de cada ruta (ms)
+LIST_TIMEOUT_MS = 10_000
+STATS_TIMEOUT_MS = 30_000
+SEARCH_TIMEOUT_MS = 5_000
+
 # Obtener todos los cursos (Sólo para Administradores) con opciones de ordenación y paginación
 @admin_training.get("/training", response_model=List[TrainingOut], description="Obtener todos los cursos")
-async def get_all_training(
-    db: Session = Depends(get_db),
+def get_all_training(
+    db: Session = Depends(db_session(LIST_TIMEOUT_MS)),
     current_user: dict = Depends(get_current_user),
     user_in: Optional[str] = Query(None, description="ID del usuario"),
-    fecha_inicio: Optional[str] = Query(None, description="Fecha de inicio en formato YYYY-MM-DD"),
-    fecha_finalizacion: Optional[str] = Query(None, description="Fecha de finalización en formato YYYY-MM-DD"),
+    fecha_inicio: Optional[date] = Query(None, description="Cursos iniciados desde esta fecha (YYYY-MM-DD)"),
+    fecha_finalizacion: Optional[date] = Query(None, description="Cursos finalizados hasta esta fecha (YYYY-MM-DD)"),
     # Parámetros de ordenación y paginación
     order_by: Optional[str] = Query("user_id", description="Campo por el cual ordenar (user_id, fecha_inicio, fecha_finalizacion)"),
     order_direction: Optional[str] = Query("asc", description="Dirección de la ordenación (asc o desc)"),
-    page: Optional[int] = Query(1, description="Número de página"),
-    per_page: Optional[int] = Query(10, description="Número de registros por página"),
+    page: Optional[int] = Query(1, ge=1, description="Número de página"),
+    per_page: Optional[int] = Query(10, ge=1, le=TRAININGS_MAX_PER_PAGE, description="Número de registros por página"),
 ):
     """
     Obtener todos los cursos (Sólo para Administradores) con opciones de ordenación y paginación.
 
+    Las páginas de más de TRAININGS_STREAM_THRESHOLD registros se leen por lotes y
+    se envían en streaming (el cuerpo es la misma lista JSON). Cada consulta tiene
+    un tiempo máximo de LIST_TIMEOUT_MS y se cancela si el cliente se desconecta.
+
     Args:
         db (Session): Sesión de la base de datos proporcionada por la dependencia.
         current_user (dict): Usuario actual proporcionado por la dependencia.
+        user_in (str): Filtrar por ID de usuario.
+        fecha_inicio (date): Filtrar cursos iniciados desde esta fecha.
+        fecha_finalizacion (date): Filtrar cursos finalizados hasta esta fecha.
         order_by (str): Campo por el cual ordenar.
         order_direction (str): Dirección de la ordenación.
         page (int): Número de página.
@@ -69,16 +88,155 @@ async def get_all_training(
     # Calcular el offset para la paginación
     offset = (page - 1) * per_page
 
-    # Consultar la base de datos con ordenación y paginación
-    trainings = (
-        db.query(Training)
-        .order_by(order_func(getattr(Training, order_by)))
-        .offset(offset)
-        .limit(per_page)
+    # Consultar la base de datos con filtros, ordenación y paginación
+    query = db.query(Training)
+    if user_in:
+        query = query.filter(Training.user_id == user_in)
+    query = query.filter(*_date_filters(fecha_inicio, fecha_finalizacion))
+    query = query.order_by(order_func(getattr(Training, order_by))).offset(offset).limit(per_page)
+
+    if per_page > TRAININGS_STREAM_THRESHOLD:
+        return StreamingResponse(_stream_trainings(query), media_type="application/json")
+    return query.all()
+
+def _stream_trainings(query):
+    """
+    Lista JSON de cursos armada por lotes de TRAININGS_STREAM_THRESHOLD filas, sin
+    cargar la página completa en memoria.
+    """
+    separator = b"["
+    for training in query.yield_per(TRAININGS_STREAM_THRESHOLD):
+        yield separator + TrainingOut.model_validate(training).model_dump_json().encode()
+        separator = b","
+    yield b"[]" if separator == b"[" else b"]"
+
+def _date_filters(fecha_inicio: Optional[date], fecha_finalizacion: Optional[date]) -> list:
+    """
+    Filtros por rango de fechas de los cursos. Como todo curso termina después de
+    empezar, "finalizado hasta X" implica "iniciado antes de X": se agrega esa
+    condición sobre fecha_inicio para que PostgreSQL descarte particiones.
+    """
+    filters = []
+    if fecha_inicio:
+        filters.append(Training.fecha_inicio >= fecha_inicio)
+    if fecha_finalizacion:
+        filters.append(Training.fecha_finalizacion <= fecha_finalizacion)
+        filters.append(Training.fecha_inicio < fecha_finalizacion)
+    return filters
+
+# Estadísticas de cursos por año de inicio (Sólo para Administradores)
+@admin_training.get("/stats", response_model=List[TrainingYearStats], description="Cursos y horas por año de inicio")
+def get_training_stats(
+    db: Session = Depends(db_session(STATS_TIMEOUT_MS)),
+    current_user: dict = Depends(get_current_user),
+    fecha_inicio: Optional[date] = Query(None, description="Cursos iniciados desde esta fecha (YYYY-MM-DD)"),
+    fecha_finalizacion: Optional[date] = Query(None, description="Cursos finalizados hasta esta fecha (YYYY-MM-DD)"),
+):
+    """
+    Cantidad de cursos y total de horas por año de inicio (Sólo para Administradores).
+
+    Args:
+        fecha_inicio (date): Filtrar cursos iniciados desde esta fecha.
+        fecha_finalizacion (date): Filtrar cursos finalizados hasta esta fecha.
+
+    Returns:
+        List[TrainingYearStats]: Un elemento por año, ordenados por año.
+    """
+    # Verificar si el usuario tiene el rol "admin"
+    if not has_user_role(current_user, ["admin"]):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para realizar esta acción",
+        )
+
+    anio = extract("year", Training.fecha_inicio)
+    rows = (
+        db.query(anio, func.count(Training.id), func.coalesce(func.sum(Training.horas_duracion), 0))
+        .filter(*_date_filters(fecha_inicio, fecha_finalizacion))
+        .group_by(anio)
+        .order_by(anio)
         .all()
     )
+    return [TrainingYearStats(anio=int(year), cursos=count, horas=hours) for year, count, hours in rows if year is not None]
+
+# Búsqueda aproximada de cursos (Sólo para Administradores)
+@admin_training.get("/search", response_model=List[TrainingSearchHit], description="Buscar cursos por nombre o institución aproximados")
+def search_training(
+    q: str = Query(..., min_length=2, description="Texto a buscar, admite abreviaturas y errores de tipeo"),
+    campo: str = Query("nombre_curso", description="Campo donde buscar (nombre_curso o institucion)"),
+    limit: int = Query(20, ge=1, le=FUZZY_SEARCH_MAX_RESULTS, description="Cantidad máxima de resultados"),
+    db: Session = Depends(db_session(SEARCH_TIMEOUT_MS)),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Búsqueda aproximada de cursos por nombre o institución (Sólo para Administradores).
+    No distingue mayúsculas ni acentos; ver src/fuzzy_search.py.
 
-    return trainings
+    Args:
+        q (str): Texto a buscar.
+        campo (str): nombre_curso o institucion.
+        limit (int): Cantidad máxima de resultados.
+
+    Returns:
+        List[TrainingSearchHit]: Cursos ordenados del más al menos parecido.
+    """
+    # Verificar si el usuario tiene el rol "admin"
+    if not has_user_role(current_user, ["admin"]):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para realizar esta acción",
+        )
+    if campo not in ("nombre_curso", "institucion"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Campo de búsqueda inválido. Campos válidos: nombre_curso, institucion",
+        )
+    return [
+        TrainingSearchHit(**TrainingOut.model_validate(training).model_dump(), score=score)
+        for training, score in search_trainings(db, q, campo, limit)
+    ]
+
+# Deduplicado de cursos (Sólo para Administradores)
+@admin_training.post("/dedupe", response_model=TrainingDedupeStatus, status_code=status.HTTP_202_ACCEPTED, description="Fusionar cursos duplicados")
+async def start_training_dedupe(current_user: dict = Depends(get_current_user)):
+    """
+    Inicia en segundo plano el cálculo de huellas y la fusión de cursos duplicados
+    (ver src/training_dedupe.py). Su avance se consulta con GET /admin_training/dedupe.
+
+    Returns:
+        TrainingDedupeStatus: Estado del deduplicado recién iniciado.
+
+    Raises:
+        HTTPException: Si el usuario no tiene permisos de administrador o si ya hay uno en curso.
+    """
+    # Verificar si el usuario tiene el rol "admin"
+    if not has_user_role(current_user, ["admin"]):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para realizar esta acción",
+        )
+    if not training_dedupe_job.start():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Ya hay un deduplicado en curso",
+        )
+    return training_dedupe_job.state
+
+@admin_training.get("/dedupe", response_model=TrainingDedupeStatus, description="Estado del deduplicado de cursos")
+async def get_training_dedupe(current_user: dict = Depends(get_current_user)):
+    """
+    Estado del último deduplicado de cursos iniciado en este proceso.
+
+    Returns:
+        TrainingDedupeStatus: Estado, cursos revisados y fusionados.
+    """
+    # Verificar si el usuario tiene el rol "admin"
+    if not has_user_role(current_user, ["admin"]):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para realizar esta acción",
+        )
+    return training_dedupe_job.state
 
 # Obtener todos los cursos de un usuario (Sólo para Administradores) con opciones de ordenación y paginación
 @admin_training.get("/{user_id}/training", response_model=List[TrainingOut], description="Obtener todos los cursos")
@@ -87,8 +245,8 @@ async def get_trainings(
     current_user: dict = Depends(get_current_user),
     order_by: str = Query("fecha_inicio", description="Campo por el que ordenar"),
     order_direction: str = Query("asc", description="Dirección de ordenación"),
-    page: int = Query(1, description="Número de página"),
-    per_page: int = Query(10, description="Número de elementos por página"),
+    page: int = Query(1, ge=1, description="Número de página"),
+    per_page: int = Query(10, ge=1, le=TRAININGS_MAX_PER_PAGE, description="Número de elementos por página"),
 ) -> List[TrainingOut]:
     """
     Obtener todos los cursos de un usuario(Sólo para Administradores) con opciones de ordenación y paginación.
@@ -225,8 +383,10 @@ async def delete_training(
         )
 
     # Eliminar el curso de la base de datos
+    before = snapshot(training)
     db.delete(training)
     db.commit()
+    audit_buffer.record(current_user, "training.delete", "training", training_id, before, None)
 
     return training
 
@@ -270,6 +430,8 @@ async def update_training(
         )
 
     # Actualizar los campos del curso
+    before = snapshot(training)
+    intern_training_values(db, [training_update.model_dump()])
     training.nombre_curso = training_update.nombre_curso
     training.institucion = training_update.institucion
     training.tipo_certificado = training_update.tipo_certificado
@@ -289,7 +451,15 @@ async def update_training(
     training.observaciones = training_update.observaciones
 
     # Guardar los cambios en la base de datos
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="El usuario ya tiene un curso con el mismo nombre, institución y fechas",
+        )
     db.refresh(training)
+    audit_buffer.record(current_user, "training.update", "training", training.id, before, snapshot(training))
 
     return training
@@ -1,32 +1,155 @@
 # routes/person_routes.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from src.db.database import get_db
+from typing import List, Optional
+
+from src.database import get_db, engine
 from src.models.person_model import Person
-from src.schemas.person_schema import PersonCreate, PersonOut
-from src.auth.permissions import has_role
-from src.models.user_model import User
+from src.models.user_models import User
+from src.schemas.person_schema import PersonCreate, PersonOut, PersonSearchOut
+from src.utils import get_current_user, has_user_role
 
 person_router = APIRouter()
 
+SEARCH_MAX_PER_PAGE = 100  # Máximo de personas por página en la búsqueda
+
+# Columnas por las que se puede filtrar y contar en la búsqueda (orden de ix_persons_facets)
+FACETS = ("dir_provincia", "dir_localidad", "educacion_nivel", "identidad_genero", "tipo_contribuyente")
+
+
+def _facet_counts(db: Session, conditions: list) -> tuple[int, dict]:
+    """
+    Cuenta, en una sola consulta, las personas por cada valor de cada faceta.
+    En PostgreSQL se usa GROUP BY GROUPING SETS (un único recorrido, resuelto sobre
+    ix_persons_facets); en otros motores se agrupa por la combinación de todas las
+    facetas y los totales por faceta se acumulan en memoria.
+    Args:
+        db (Session): Sesión de la base de datos.
+        conditions (list): Filtros de la búsqueda.
+    Returns:
+        tuple[int, dict]: Total de personas y conteos `{faceta: {valor: cantidad}}`.
+    """
+    columns = [getattr(Person, facet) for facet in FACETS]
+    facets = {facet: {} for facet in FACETS}
+    total = 0
+
+    if engine.dialect.name == "postgresql":
+        # GROUPING(...) devuelve una máscara con un bit por columna no agrupada en la fila
+        full_mask = (1 << len(FACETS)) - 1
+        mask_to_facet = {full_mask ^ (1 << (len(FACETS) - 1 - i)): facet for i, facet in enumerate(FACETS)}
+        query = (
+            select(*columns, func.grouping(*columns), func.count())
+            .where(*conditions)
+            .group_by(func.grouping_sets(*(tuple_(column) for column in columns), tuple_()))
+        )
+        for row in db.execute(query):
+            *values, mask, count = row
+            if mask == full_mask:
+                total = count
+                continue
+            facet = mask_to_facet[mask]
+            value = values[FACETS.index(facet)]
+            if value is not None:
+                facets[facet][value] = count
+        return total, facets
+
+    query = select(*columns, func.count()).where(*conditions).group_by(*columns)
+    for row in db.execute(query):
+        *values, count = row
+        total += count
+        for facet, value in zip(FACETS, values):
+            if value is not None:
+                facets[facet][value] = facets[facet].get(value, 0) + count
+    return total, facets
+
+
+# Búsqueda por facetas en el padrón de personas
+@person_router.get("/search", response_model=PersonSearchOut, description="Búsqueda de personas por facetas")
+def search_persons(
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+    dir_provincia: Optional[List[str]] = Query(None, description="Provincias"),
+    dir_localidad: Optional[List[str]] = Query(None, description="Localidades"),
+    educacion_nivel: Optional[List[str]] = Query(None, description="Niveles educativos"),
+    identidad_genero: Optional[List[str]] = Query(None, description="Identidades de género"),
+    tipo_contribuyente: Optional[List[str]] = Query(None, description="Tipos de contribuyente"),
+    page: int = Query(1, ge=1, description="Número de página"),
+    per_page: int = Query(20, ge=1, le=SEARCH_MAX_PER_PAGE, description="Número de registros por página"),
+    after_id: Optional[int] = Query(None, description="Paginación por cursor: devolver personas con ID mayor a éste"),
+):
+    """
+    Búsqueda de personas por facetas (Administradores y lectores).
+    Cada faceta admite varios valores (se combinan con OR) y las facetas entre sí con AND.
+    Devuelve una página de personas ordenadas por ID y, para el mismo conjunto filtrado,
+    la cantidad de personas por cada valor de cada faceta.
+    Args:
+        dir_provincia, dir_localidad, educacion_nivel, identidad_genero, tipo_contribuyente (List[str]): Filtros.
+        page (int): Número de página (se ignora si se indica after_id).
+        per_page (int): Número de registros por página.
+        after_id (int): Último ID de la página anterior; evita el OFFSET en páginas profundas.
+    Returns:
+        PersonSearchOut: Total, página de resultados y conteos por faceta.
+    """
+    if not has_user_role(current_user, ["admin", "viewer"]):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para realizar esta acción",
+        )
+
+    filters = {
+        "dir_provincia": dir_provincia,
+        "dir_localidad": dir_localidad,
+        "educacion_nivel": educacion_nivel,
+        "identidad_genero": identidad_genero,
+        "tipo_contribuyente": tipo_contribuyente,
+    }
+    conditions = [getattr(Person, facet).in_(values) for facet, values in filters.items() if values]
+
+    total, facets = _facet_counts(db, conditions)
+
+    query = db.query(Person).filter(*conditions).order_by(Person.id)
+    if after_id is not None:
+        query = query.filter(Person.id > after_id)
+    else:
+        query = query.offset((page - 1) * per_page)
+    results = query.limit(per_page).all()
+
+    return PersonSearchOut(total=total, page=page, per_page=per_page, results=results, facets=facets)
+
 # Crear una nueva persona
 @person_router.post("/", response_model=PersonOut)
-def create_person(person: PersonCreate, db: Session = Depends(get_db), current_user: User = Depends(has_role(["admin", "editor"]))):
+def create_person(person: PersonCreate, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    if not has_user_role(current_user, ["admin", "editor"]):
+        raise HTTPException(status_code=403, detail="No tienes permisos para realizar esta acción")
     db_person = db.query(Person).filter(Person.dni_cuit_cuil == person.dni_cuit_cuil).first()
     if db_person:
         raise HTTPException(status_code=400, detail="Persona con este DNI-CUIT-CUIL ya existe")
-    if not current_user.email:
+    user_email = person.user_email or current_user.get("email")
+    if not user_email:
         raise HTTPException(status_code=400, detail="El usuario actual no tiene un correo asociado")
+    if not db.query(User.id).filter(User.email == user_email).first():
+        raise HTTPException(status_code=400, detail="No existe un usuario con ese correo")
+    if db.query(Person.id).filter(Person.user_email == user_email).first():
+        raise HTTPException(status_code=400, detail="El usuario ya tiene datos personales cargados")
 
-    new_person = Person(**person.dict(), user_email=current_user.email)
+    new_person = Person(**person.model_dump(exclude={"user_email"}), user_email=user_email)
     db.add(new_person)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Alta simultánea con el mismo DNI o para el mismo usuario
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Persona con este DNI-CUIT-CUIL o usuario ya existe")
     db.refresh(new_person)
     return new_person
 
 # Obtener una persona por su ID
 @person_router.get("/{person_id}", response_model=PersonOut)
-def get_person(person_id: int, db: Session = Depends(get_db), current_user: User = Depends(has_role(["admin", "viewer"]))):
+def get_person(person_id: int, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    if not has_user_role(current_user, ["admin", "viewer"]):
+        raise HTTPException(status_code=403, detail="No tienes permisos para realizar esta acción")
     person = db.query(Person).filter(Person.id == person_id).first()
     if not person:
         raise HTTPException(status_code=404, detail="Persona no encontrada")
@@ -34,20 +157,29 @@ def get_person(person_id: int, db: Session = Depends(get_db), current_user: User
 
 # Actualizar datos de una persona
 @person_router.put("/{person_id}", response_model=PersonOut)
-def update_person(person_id: int, person: PersonCreate, db: Session = Depends(get_db), current_user: User = Depends(has_role(["admin", "editor"]))):
+def update_person(person_id: int, person: PersonCreate, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    if not has_user_role(current_user, ["admin", "editor"]):
+        raise HTTPException(status_code=403, detail="No tienes permisos para realizar esta acción")
     db_person = db.query(Person).filter(Person.id == person_id).first()
     if not db_person:
         raise HTTPException(status_code=404, detail="Persona no encontrada")
 
-    for key, value in person.dict().items():
+    # Sin user_email se conserva el dueño actual
+    for key, value in person.model_dump(exclude={"user_email"} if person.user_email is None else None).items():
         setattr(db_person, key, value)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Persona con este DNI-CUIT-CUIL o usuario ya existe")
     db.refresh(db_person)
     return db_person
 
 # Eliminar una persona
 @person_router.delete("/{person_id}")
-def delete_person(person_id: int, db: Session = Depends(get_db), current_user: User = Depends(has_role(["admin"]))):
+def delete_person(person_id: int, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    if not has_user_role(current_user, ["admin"]):
+        raise HTTPException(status_code=403, detail="No tienes permisos para realizar esta acción")
     db_person = db.query(Person).filter(Person.id == person_id).first()
     if not db_person:
         raise HTTPException(status_code=404, detail="Persona no encontrada")
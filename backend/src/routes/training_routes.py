@@ -1,24 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Response, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError # PAra el debug de errores
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError # PAra el debug de errores
 from fastapi.security import OAuth2PasswordRequestForm
 from passlib.context import CryptContext
-from typing import List
+from typing import Any, Dict, List
 
 from src.models.user_models import User
-from src.models.training_models import Training
-from src.schemas.trainig_schemas import TrainingBase, TrainingCreate, TrainingOut, TrainingUpdate
+from src.models.training_models import FINGERPRINT_CONFLICT_COLUMNS, Training, intern_training_values, training_fingerprint
+from src.schemas.trainig_schemas import TrainingBase, TrainingCreate, TrainingOut, TrainingUpdate, TrainingBulkReport, TrainingBulkResult, validate_trainings
 
-from src.database import get_db
+from src.change_feed import record_changes
+from src.database import dialect_insert, get_db
 from src.utils import get_current_user
 
 training_router = APIRouter()
 
+BULK_MAX_TRAININGS = 5000  # Máximo de cursos por carga masiva
+BULK_CHUNK_SIZE = 500      # Cursos por transacción
+
+def _with_fingerprint(data: dict, user_id: str) -> dict:
+    """Fila lista para insertar: datos del curso, usuario y huella de contenido."""
+    return {
+        **data,
+        "user_id": user_id,
+        "fingerprint": training_fingerprint(
+            user_id, data["nombre_curso"], data["institucion"], data["fecha_inicio"], data["fecha_finalizacion"],
+        ),
+    }
+
 # Crear un Training
 @training_router.post("/create", response_model=TrainingOut, status_code=status.HTTP_201_CREATED, description="Crear un nuevo curso")
-async def create_training(training_in: TrainingCreate, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+async def create_training(training_in: TrainingCreate, response: Response, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
     """
-    Crear un curso nuevo para el usuairo
+    Crear un curso nuevo para el usuairo.
+    Es idempotente: si el usuario ya tiene un curso con el mismo nombre, institución
+    y fechas (misma huella), no se crea otro y se devuelve el existente con 200.
     """
     # print(f"Current User is:{current_user}") # Debug
     # Buscar el usuario en la base de datos
@@ -36,11 +53,104 @@ async def create_training(training_in: TrainingCreate, current_user: dict = Depe
     #        detail="Fecha Finalización es mayor o igual que Fecha de Inicio"
     #    )
     
-    db_training = Training(**training_in.dict(), user_id=current_user["id"])
-    db.add(db_training)
+    row = _with_fingerprint(training_in.model_dump(), current_user["id"])
+    intern_training_values(db, [row])
+    training_id = db.execute(
+        dialect_insert(Training)
+        .values(**row)
+        .on_conflict_do_nothing(index_elements=FINGERPRINT_CONFLICT_COLUMNS)
+        .returning(Training.id)
+    ).scalar()
+    if training_id is not None:
+        record_changes(db, "training", [training_id], "insert")
     db.commit()
-    db.refresh(db_training)
-    return db_training
+    if training_id is None:
+        # Ya existía: se devuelve el curso original
+        response.status_code = status.HTTP_200_OK
+        return db.query(Training).filter(
+            Training.fingerprint == row["fingerprint"], Training.fecha_inicio == row["fecha_inicio"]
+        ).first()
+    return db.get(Training, training_id)
+
+# Carga masiva de Trainings
+@training_router.post("/bulk", response_model=TrainingBulkReport, status_code=status.HTTP_201_CREATED, description="Carga masiva de cursos")
+def create_trainings_bulk(trainings_in: List[Dict[str, Any]] = Body(..., max_length=BULK_MAX_TRAININGS), current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+    """
+    Carga masiva de cursos del usuario.
+    Cada entrada tiene el formato de TrainingCreate y se valida todo el lote junto
+    (ver `validate_trainings`). Los cursos repetidos, dentro de la carga o contra los
+    ya guardados, se informan como "duplicate" con el ID del curso existente en lugar
+    de crearse de nuevo (ON CONFLICT sobre la huella), así que repetir la carga es seguro.
+    Args:
+        trainings_in (List[TrainingCreate]): Cursos a crear.
+    Returns:
+        TrainingBulkReport: Resultado por fila (índice en la carga, estado, ID o detalle del error).
+    """
+    user = db.query(User).filter(User.id == current_user["id"]).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Usuario no encontrado",
+        )
+
+    results = [TrainingBulkResult(index=index, status="error") for index in range(len(trainings_in))]
+    valid, errors = validate_trainings(trainings_in)
+    for index, details in errors.items():
+        results[index].detail = "; ".join(details)
+
+    # Repetidos dentro de la carga: sólo se inserta la primera aparición
+    first_by_fingerprint = {}
+    repeated = []
+    rows = []
+    for index, data in valid:
+        row = _with_fingerprint(data, current_user["id"])
+        first = first_by_fingerprint.setdefault(row["fingerprint"], index)
+        if first == index:
+            rows.append((index, row))
+        else:
+            repeated.append((index, first))
+
+    insert_stmt = (
+        dialect_insert(Training)
+        .on_conflict_do_nothing(index_elements=FINGERPRINT_CONFLICT_COLUMNS)
+        .returning(Training.id, Training.fingerprint)
+    )
+    for start in range(0, len(rows), BULK_CHUNK_SIZE):
+        chunk = rows[start:start + BULK_CHUNK_SIZE]
+        try:
+            # Valores normalizados del lote de una vez (evita una consulta por fila),
+            # en su transacción: si el lote se revierte, también se revierten
+            intern_training_values(db, [row for _, row in chunk])
+            inserted = {fingerprint: training_id for training_id, fingerprint in db.execute(insert_stmt, [row for _, row in chunk])}
+            record_changes(db, "training", inserted.values(), "insert")
+            db.commit()
+        except SQLAlchemyError:
+            db.rollback()
+            for index, _ in chunk:
+                results[index].detail = "Error en el registro del lote"
+            continue
+        # Los que no se insertaron ya existían: se informa el ID del curso guardado
+        ids = dict(inserted)
+        existing = [row["fingerprint"] for _, row in chunk if row["fingerprint"] not in inserted]
+        if existing:
+            ids.update(db.execute(
+                select(Training.fingerprint, Training.id).where(Training.fingerprint.in_(existing))
+            ).all())
+        for index, row in chunk:
+            results[index].status = "created" if row["fingerprint"] in inserted else "duplicate"
+            results[index].id = ids.get(row["fingerprint"])
+
+    # Las repeticiones dentro de la carga siguen el resultado de su primera aparición
+    for index, first in repeated:
+        if results[first].status == "error":
+            results[index].detail = results[first].detail
+        else:
+            results[index].status = "duplicate"
+            results[index].id = results[first].id
+
+    created = sum(1 for result in results if result.status == "created")
+    duplicates = sum(1 for result in results if result.status == "duplicate")
+    return TrainingBulkReport(created=created, duplicates=duplicates, errors=len(results) - created - duplicates, results=results)
     
 # Update datos de Training
 @training_router.put("/update/{training_id}", response_model=TrainingOut, status_code=status.HTTP_201_CREATED, description="Actualizar un curso")
@@ -66,10 +176,19 @@ async def update_training(training_id: int, training_in: TrainingCreate, current
             detail="Curso no encontrado",
         )
 
-    for key, value in training_in.dict().items():
+    data = training_in.dict()
+    intern_training_values(db, [data])
+    for key, value in data.items():
         setattr(training, key, value)
 
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Ya tienes un curso con el mismo nombre, institución y fechas",
+        )
     db.refresh(training)
     return training
 
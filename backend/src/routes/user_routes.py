@@ -1,13 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
 from passlib.context import CryptContext
 from jose import JWTError, jwt
-from src.models.user_models import User, Role, TokenRecovery
-from src.schemas.user_schemas import UserCreate, UserOut, UserUpdate, TokenData, TokenDB
+from src.models.user_models import User, Role, UserRole, TokenRecovery
+from src.schemas.user_schemas import UserCreate, UserCV, UserOut, UserUpdate, TokenData, TokenDB, RefreshTokenIn
 from src.database import get_db
-from src.utils import get_password_hash,validar_password,update_last_login,get_current_user
-from src.token_utils import create_access_token, decode_access_token
+from src.utils import get_password_hash,validar_password,get_current_user
+from src.last_login import last_login_buffer
+from src.role_registry import role_registry
+from src.mailer import enqueue_email, confirmation_email, recovery_email
+from src.token_utils import create_access_token, create_token_pair, decode_access_token, decode_refresh_token
+from src.token_denylist import token_denylist
+from src.user_cv import user_profile_json
 from datetime import datetime, timezone, timedelta
 from uuid import uuid4
 from dotenv import load_dotenv
@@ -61,18 +66,19 @@ def create_user(user_in: UserCreate, db: Session = Depends(get_db)):
         created_at=datetime.now(timezone.utc),
     )
     
-    # Asignar el rol "user" por defecto
-    user_role = db.query(Role).filter(Role.rol == "user").first()
+    # Asignar el rol "user" por defecto (ID tomado del registro de roles en memoria)
+    user_role_id = role_registry.id_of("user")
 
-    if not user_role:
+    if user_role_id is None:
         # Si el rol "user" no existe, crearlo
         user_role = Role(rol="user")
         db.add(user_role)
         db.commit()
-        db.refresh(user_role)
+        role_registry.invalidate(db)
+        user_role_id = user_role.id
 
     # Asociar el rol al nuevo usuario
-    new_user.roles.append(user_role)
+    db.add(UserRole(user_id=new_user_id, role_id=user_role_id))
     
     # Crear el token de Verificación de correo electrónico
     # Generar token de registro (24h de validez)
@@ -88,7 +94,11 @@ def create_user(user_in: UserCreate, db: Session = Depends(get_db)):
         expires_at=datetime.now(timezone.utc) + timedelta(minutes=1440),
     )
     
-    # Guardar el nuevo usuario y el token de recuperación en la base de datos
+    # Email de verificación: se encola en la bandeja de salida, en la misma transacción
+    subject, body = confirmation_email(registration_token)
+    enqueue_email(db, recipient=new_user.email, subject=subject, body=body)
+
+    # Guardar el nuevo usuario, el token de recuperación y el email en la base de datos
     try:
         db.add(new_user)
         db.add(recovery_record)
@@ -99,9 +109,6 @@ def create_user(user_in: UserCreate, db: Session = Depends(get_db)):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Error en el registro de New User"
         )
-    # Envío de email (ejemplo simplificado) Agregar la variable de entrono de URL_SITE
-    verification_url = f"{URL_SITE}/users/confirm/{registration_token}"
-    print(f"URL de verificación: {verification_url}")  # En producción usar servicio de email
     
     return new_user # Retorna el usuario creado{"detail": "Registro exitoso. Verifica tu email"}
 
@@ -170,47 +177,39 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
             detail="Correo electrónico o contraseña incorrectos",
         )
     
-    # Actualizar la fecha y hora del último acceso
-    update_last_login(user.email, db)
-    
-    # Convertir usuario a formato UserOut compatible con JSON
-    data_access = {
-        "id": user.id,
-        "email": user.email,
-        "is_active": user.is_active,
-        "created_at": user.created_at.isoformat(),
-        "last_login": user.last_login.isoformat() if user.last_login else None,
-        "roles": [{"id": role.id, "rol": role.rol} for role in user.roles],
-        "type": "access"
-    }
+    # Registrar el último acceso (se escribe en lote desde last_login_buffer)
+    last_login_buffer.record(user.id)
     
-    data_refresh = {
-        "id": user.id,
-        "email": user.email,
-        "is_active": user.is_active,
-        "created_at": user.created_at.isoformat(),
-        "last_login": user.last_login.isoformat() if user.last_login else None,
-        "roles": [{"id": role.id, "rol": role.rol} for role in user.roles],
-        "type": "refresh"
-    }
-
-    # Generar un token de acceso
-    #access_token = create_access_token(data=data_access)
-    access_token = create_access_token(
-        data={"sub": user.id, "email": user.email, "roles": [{"id": role.id, "rol": role.rol} for role in user.roles]},
-        expires_delta=1440  # 24 horas en minutos
-    )
-    # refresh_token = create_refresh_token(data=data_refresh)
-    refresh_token = create_access_token(
-        data={"sub": user.id, "email": user.email, "roles": [{"id": role.id, "rol": role.rol} for role in user.roles], "type": "refresh"},
-        expires_delta=(60*24*7)  # 7 dias, en minutos
+    # Generar el access token y el refresh token
+    return create_token_pair(
+        data={"sub": user.id, "email": user.email, "roles": [{"id": role.id, "rol": role.rol} for role in user.roles]}
     )
 
-    return {
-        "access_token": access_token, 
-        "refresh_token": refresh_token, 
-        "token_type": "bearer"
-    }
+# Renovar el access token a partir de un refresh token
+@user_router.post("/refresh", description="Renovar el access token con un refresh token")
+def refresh_token(token_in: RefreshTokenIn):
+    """
+    Renovar el access token a partir de un refresh token válido.
+    El refresh token se rota: el recibido queda revocado y se entrega uno nuevo.
+    No consulta la base de datos ni verifica la contraseña.
+    Args:
+        token_in (RefreshTokenIn): Refresh token entregado en el login o en la última renovación.
+    Returns:
+        dict: Token de acceso y refresh token nuevos.
+    """
+    payload = decode_refresh_token(token_in.refresh_token)
+
+    # Revocar el token recibido; si ya estaba revocado, fue reutilizado
+    if not token_denylist.revoke(payload["jti"], payload["exp"]):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token revocado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return create_token_pair(
+        data={"sub": payload.get("sub"), "email": payload.get("email"), "roles": payload.get("roles", [])}
+    )
 
 # Generar el Token de Recover Password
 @user_router.put("/recovery_passwd", response_model=UserUpdate, description="Generar el Token de Recover Password")
@@ -245,7 +244,11 @@ async def recovery_passwd_user(user_in: UserUpdate, db: Session = Depends(get_db
         expires_at=datetime.now(timezone.utc) + timedelta(minutes=1440),
     )
     
-    # Guardar el nuevo usuario y el token de recuperación en la base de datos
+    # Email de recuperación: se encola en la bandeja de salida, en la misma transacción
+    subject, body = recovery_email(registration_token)
+    enqueue_email(db, recipient=user.email, subject=subject, body=body)
+
+    # Guardar el token de recuperación y el email en la base de datos
     try:
         db.add(recovery_record)
         db.commit()
@@ -255,9 +258,6 @@ async def recovery_passwd_user(user_in: UserUpdate, db: Session = Depends(get_db
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Error en el registro de Token Recovery"
         )
-    # Envío de email (ejemplo simplificado) Agregar la variable de entrono de URL_SITE
-    verification_url = f"{URL_SITE}/users/recovery/{registration_token}"
-    print(f"URL de verificación: {verification_url}")  # En producción usar servicio de email
     
     return user # Retorna el usuario 
 
@@ -305,6 +305,24 @@ async def read_users_me(current_user: dict = Depends(get_current_user)):
         )
     return user
 
+# Perfil completo del usuario actual en una sola llamada
+@user_router.get("/me/profile", response_model=UserCV, description="Obtener el perfil completo del usuario actual")
+def read_users_me_profile(current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+    """
+    Datos del usuario actual con sus roles, cursos y datos personales, en lugar de
+    `/users/me` seguido de `/training/list`. En PostgreSQL el documento se arma con
+    una sola consulta y se envía tal cual (ver src/user_cv.py).
+    Returns:
+        UserCV: Perfil del usuario.
+    """
+    profile = user_profile_json(db, current_user["id"])
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Usuario no encontrado",
+        )
+    return Response(content=profile, media_type="application/json")
+
 # Actualizar usuario
 @user_router.put("/me", response_model=UserUpdate, description="Actualizar los datos del usuario actual")
 async def update_user(user_in: UserUpdate, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+from datetime import datetime
+
+# Esquema de salida del registro de auditoría
+class AuditLogOut(BaseModel):
+    id: int
+    created_at: datetime
+    actor_id: str
+    actor_email: Optional[str] = None
+    action: str
+    entity: str
+    entity_id: str
+    before: Optional[Dict[str, Any]] = None
+    after: Optional[Dict[str, Any]] = None
+
+    class Config:
+        from_attributes = True
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, validator, ValidationError
+from pydantic import BaseModel, EmailStr, field_validator
 from datetime import date
-from typing import Optional, Literal
+from typing import Dict, List, Optional, Literal
 
 class PersonBase(BaseModel):
     nombre: str
@@ -12,7 +12,7 @@ class PersonBase(BaseModel):
         "Mujer", "Mujer trans", "Varón", "Varón Trans", "Prefiero no decirlo"
     ]  # Validación de lista de opciones
     etnia: bool = False  # Valor predeterminado: False
-    etnia_nombre: Optional[str]
+    etnia_nombre: Optional[str] = None
     estado_civil: Literal[
         "Solter@", "Casad@", "Viud@", "Divorciad@", "En unión de hecho", "En unión convivencial"
     ]  # Validación de lista de opciones
@@ -26,32 +26,32 @@ class PersonBase(BaseModel):
             "UNIVERSITARIO DE GRADO",
             "POSGRADO",
         ]
-    ]  # Validación de lista de opciones
-    educacion_titulo: Optional[str]
-    educacion_institucion: Optional[str]
+    ] = None  # Validación de lista de opciones
+    educacion_titulo: Optional[str] = None
+    educacion_institucion: Optional[str] = None
     personas_a_cargo: int
     tipo_contribuyente: str
     actividad_registrada: str
     telefono: str
     dir_calle: str
     dir_numero: str
-    dir_piso: Optional[str]
-    dir_letra_nro_depto: Optional[str]
+    dir_piso: Optional[str] = None
+    dir_letra_nro_depto: Optional[str] = None
     dir_cp: str
     dir_localidad: str
     dir_departamento: str
     dir_provincia: str
     dir_pais: str
 
-    @validator("etnia_nombre")
+    @field_validator("etnia_nombre")
     def validate_etnia_nombre(cls, etnia_nombre, values):
         # Si "etnia" es True, "etnia_nombre" debe ser proporcionado
-        if values.get("etnia") and not etnia_nombre:
+        if values.data.get("etnia") and not etnia_nombre:
             raise ValueError("Si 'etnia' es True, 'etnia_nombre' debe completarse")
         return etnia_nombre
 
 class PersonCreate(PersonBase):
-    pass
+    user_email: Optional[EmailStr] = None  # Usuario dueño de los datos; por defecto, el usuario actual
 
 class PersonOut(PersonBase):
     id: int
@@ -59,3 +59,11 @@ class PersonOut(PersonBase):
 
     class Config:
         from_attributes = True
+
+# Resultado de la búsqueda por facetas: página de personas y conteos por valor de cada faceta
+class PersonSearchOut(BaseModel):
+    total: int
+    page: int
+    per_page: int
+    results: List[PersonOut]
+    facets: Dict[str, Dict[str, int]]
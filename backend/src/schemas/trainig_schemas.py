@@ -1,8 +1,23 @@
-from pydantic import BaseModel, field_validator, HttpUrl, Field
-from typing import Optional
-from datetime import date
+from pydantic import BaseModel, field_validator, HttpUrl, Field, TypeAdapter, ValidationError
+from typing import Annotated, Any, Dict, List, Optional, Tuple, Union
+from typing_extensions import NotRequired, TypedDict
+from datetime import date, datetime
+from functools import lru_cache
+from itertools import compress
+from operator import gt
 
-class TrainingBase(BaseModel):
+# Códigos de idioma ISO 639-1
+ISO_639_1 = frozenset("""
+aa ab ae af ak am an ar as av ay az ba be bg bh bi bm bn bo br bs ca ce ch co cr cs cu cv cy
+da de dv dz ee el en eo es et eu fa ff fi fj fo fr fy ga gd gl gn gu gv ha he hi ho hr ht hu
+hy hz ia id ie ig ii ik io is it iu ja jv ka kg ki kj kk kl km kn ko kr ks ku kv kw ky la lb
+lg li ln lo lt lu lv mg mh mi mk ml mn mr ms mt my na nb nd ne ng nl nn no nr nv ny oc oj om
+or os pa pi pl ps pt qu rm rn ro ru rw sa sc sd se sg si sk sl sm sn so sq sr ss st su sv sw
+ta te tg th ti tk tl tn to tr ts tt tw ty ug uk ur uz ve vi vo wa wo xh yi yo za zh zu
+""".split())
+
+# Campos del curso con sus restricciones de tipo y largo (validadas por pydantic-core)
+class TrainingFields(BaseModel):
     nombre_curso: str = Field("nombre_curso", min_length=1, max_length=255)
     institucion: str = Field("institucion", max_length=255)
     tipo_certificado: str = Field("tipo_certificado", max_length=100)
@@ -14,7 +29,7 @@ class TrainingBase(BaseModel):
     area_conocimiento: str = Field("area_conocimiento", max_length=100)
     descripcion_curso: str = Field("descripcion_curso", max_length=1500)
     calificacion_nota: str = Field("calificacion_nota", max_length=50)
-    idioma: str = Field("idioma", max_length=50)
+    idioma: str = Field("es", max_length=50)  # Código ISO 639-1; si se omite, español
     nombre_profesor_instructor: str = Field("nombre_profesor_instructor", max_length=255)
     nombre_programa_estudios: str = Field("nombre_programa_estudios", max_length=255)
     pais: str = Field("pais", max_length=100)
@@ -22,6 +37,8 @@ class TrainingBase(BaseModel):
     estado_provincia: str = Field("estado_provincia", max_length=100)
     observaciones: str = Field("observaciones", max_length=1000)
 
+# Campos + validaciones entre campos (fechas, horas e idioma)
+class TrainingBase(TrainingFields):
     @field_validator('fecha_finalizacion')
     def validate_fechas(cls, fecha_finalizacion: date, values):
         fecha_inicio = values.data.get('fecha_inicio')
@@ -45,12 +62,23 @@ class TrainingBase(BaseModel):
         if len(idioma) != 2 or not idioma.isalpha():
             raise ValueError("El idioma debe ser un código ISO 639-1 de 2 letras")
         return idioma.lower()
+
+# Los datos de entrada se validan contra la lista ISO 639-1 (TrainingOut conserva la
+# validación anterior para no fallar con los cursos ya guardados, ej. "sp")
+def _validate_idioma_iso(idioma: str) -> str:
+    if idioma.lower() not in ISO_639_1:
+        raise ValueError("El idioma debe ser un código ISO 639-1 de 2 letras")
+    return idioma.lower()
     
 class TrainingCreate(TrainingBase):
-    pass
+    @field_validator('idioma')
+    def validate_idioma(cls, idioma: str):
+        return _validate_idioma_iso(idioma)
 
 class TrainingUpdate(TrainingBase):
-    pass
+    @field_validator('idioma')
+    def validate_idioma(cls, idioma: str):
+        return _validate_idioma_iso(idioma)
 
 class TrainingOut(TrainingBase):
     id: int
@@ -59,3 +87,110 @@ class TrainingOut(TrainingBase):
     class Config:
         from_attributes = True
 
+class TrainingYearStats(BaseModel):
+    anio: int
+    cursos: int
+    horas: int
+
+# Resultado de la búsqueda aproximada de cursos
+class TrainingSearchHit(TrainingOut):
+    score: float  # Similitud con la búsqueda (0 a 1)
+
+# Esquemas para la carga masiva de cursos
+class TrainingBulkResult(BaseModel):
+    index: int
+    status: str  # created, duplicate o error
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+class TrainingBulkReport(BaseModel):
+    created: int
+    duplicates: int
+    errors: int
+    results: List[TrainingBulkResult]
+
+# Estado del deduplicado de cursos
+class TrainingDedupeStatus(BaseModel):
+    estado: str  # inactivo, en_curso, finalizado o error
+    revisados: int = 0
+    fusionados: int = 0
+    iniciado: Optional[datetime] = None
+    finalizado: Optional[datetime] = None
+    error: Optional[str] = None
+
+
+@lru_cache(maxsize=None)
+def _training_batch_adapter() -> TypeAdapter:
+    """
+    TypeAdapter del lote, compilado una sola vez por proceso.
+    Cada elemento se valida como un TypedDict con los mismos campos y restricciones
+    que TrainingFields (validar a dict es bastante más rápido que crear instancias);
+    si un elemento no es válido se devuelve tal cual (Any) en lugar de abortar la lista.
+    """
+    fields = {}
+    for name, field in TrainingFields.model_fields.items():
+        annotation = Annotated[(field.annotation, *field.metadata)] if field.metadata else field.annotation
+        fields[name] = annotation if field.is_required() else NotRequired[annotation]
+    row_type = TypedDict("TrainingRow", fields)
+    return TypeAdapter(List[Annotated[Union[row_type, Any], Field(union_mode="left_to_right")]])
+
+
+def validate_trainings(rows: List[Any]) -> Tuple[List[Tuple[int, Dict[str, Any]]], Dict[int, List[str]]]:
+    """
+    Valida una lista de cursos (dicts con el formato de TrainingCreate) de una sola vez.
+
+    Tipos y largos se validan en pydantic-core con un único TypeAdapter cacheado
+    (ver `_training_batch_adapter`). Las validaciones de TrainingCreate (fechas, horas
+    e idioma) se aplican después por columna sobre todo el lote. Sólo las filas con
+    errores de tipo se vuelven a validar de a una, para obtener el detalle.
+    Args:
+        rows (List[dict]): Cursos a validar.
+    Returns:
+        Tuple: Lista de `(índice, dict)` válidos, con los mismos valores que
+        `TrainingCreate(...).model_dump()`, y errores `{índice: ["campo: mensaje"]}`.
+    """
+    items = _training_batch_adapter().validate_python(rows)
+
+    errors: Dict[int, List[str]] = {}
+    ok = [type(item) is dict and item is not rows[index] for index, item in enumerate(items)]
+    indexes = list(compress(range(len(items)), ok))
+    valid_rows = list(compress(items, ok))
+    if len(valid_rows) < len(items):
+        for index in compress(range(len(items)), [not flag for flag in ok]):
+            try:
+                TrainingFields.model_validate(rows[index])
+            except ValidationError as e:
+                errors[index] = [
+                    f"{'.'.join(map(str, err['loc']))}: {err['msg']}" if err["loc"] else err["msg"] for err in e.errors()
+                ]
+
+    # Valores por defecto de los campos omitidos (como en TrainingCreate)
+    n_fields = len(TrainingFields.model_fields)
+    for row in valid_rows:
+        if len(row) < n_fields:
+            for name, field in TrainingFields.model_fields.items():
+                if name not in row:
+                    row[name] = field.get_default(call_default_factory=True)
+
+    # Validaciones por columna
+    inicio = [row["fecha_inicio"] for row in valid_rows]
+    fin = [row["fecha_finalizacion"] for row in valid_rows]
+    horas = [row["horas_duracion"] for row in valid_rows]
+    idiomas = [row["idioma"].lower() for row in valid_rows]
+    checks = (
+        ("fecha_finalizacion", "La fecha de finalización debe ser posterior a la fecha de inicio",
+         [not ok for ok in map(gt, fin, inicio)]),
+        ("horas_duracion", "Las horas de duración deben ser un valor positivo mayor a cero",
+         [h <= 0 for h in horas]),
+        ("idioma", "El idioma debe ser un código ISO 639-1 de 2 letras",
+         [code not in ISO_639_1 for code in idiomas]),
+    )
+    for field, message, failed in checks:
+        if any(failed):
+            for index in compress(indexes, failed):
+                errors.setdefault(index, []).append(f"{field}: {message}")
+
+    for row, idioma in zip(valid_rows, idiomas):
+        row["idioma"] = idioma  # Normalización en minúsculas, como _validate_idioma_iso
+    valid = [(index, row) for index, row in zip(indexes, valid_rows) if index not in errors]
+    return valid, errors
@@ -1,7 +1,10 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import List, Optional
 from datetime import datetime
 
+from src.schemas.person_schema import PersonOut
+from src.schemas.trainig_schemas import TrainingOut
+
 # Esquema para Roles
 class RoleBase(BaseModel):
     rol: str
@@ -32,6 +35,19 @@ class UserOut(UserBase):
     class Config:
         from_attributes = True
 
+# Esquemas para el alta masiva de usuarios
+class UserBulkResult(BaseModel):
+    index: int
+    email: Optional[str] = None
+    status: str  # created o error
+    id: Optional[str] = None
+    detail: Optional[str] = None
+
+class UserBulkReport(BaseModel):
+    created: int
+    errors: int
+    results: List[UserBulkResult]
+
 # Esquema para actualización de usuario
 class UserUpdate(BaseModel):
     email: Optional[EmailStr] = None
@@ -42,11 +58,46 @@ class UserRolePatch(BaseModel):
     add: List[int] = []
     remove: List[int] = []
 
+# Filtro de usuarios para operaciones masivas
+class UserFilter(BaseModel):
+    is_active: Optional[bool] = None
+    role_id: Optional[int] = None       # Usuarios que ya tienen este rol
+    email_domain: Optional[str] = None  # Ej: "repa.ar"
+
+# Esquema para asignar/quitar roles a muchos usuarios (por lista de IDs o por filtro)
+class UserRoleBulkPatch(UserRolePatch):
+    user_ids: Optional[List[str]] = None
+    filter: Optional[UserFilter] = None
+
+class UserRoleBulkResult(BaseModel):
+    added: int
+    removed: int
+
+# Resultado de la búsqueda aproximada de usuarios por email
+class UserSearchHit(BaseModel):
+    id: str
+    email: str
+    is_active: bool
+    score: float  # Similitud con la búsqueda (0 a 1)
+
+# Lectura de CVs de muchos usuarios en una sola llamada
+class UserCVRequest(BaseModel):
+    user_ids: List[str] = Field(..., min_length=1, max_length=500)
+
+# CV de un usuario: datos, roles, cursos y datos personales
+class UserCV(UserOut):
+    trainings: List[TrainingOut] = []
+    person: Optional[PersonOut] = None
+
 # Esquema para Recuperacion de Usuario
 class TokenData(BaseModel):
     user_id: str
     token_data: str = None
 
+# Esquema para renovar el access token
+class RefreshTokenIn(BaseModel):
+    refresh_token: str
+
 # Esquema para Base de datos de TokenRecovery
 class TokenDB(TokenData):
     id: str
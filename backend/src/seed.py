@@ -1,22 +1,26 @@
 from src.database import init_db, SessionLocal
 from src.models.user_models import Role
+from src.role_registry import role_registry
 from sqlalchemy.exc import IntegrityError
 
+# Roles del sistema; admin y user van primero para conservar sus IDs (1 y 2)
+DEFAULT_ROLES = ["admin", "user", "editor", "viewer"]
+
 def seed_data():
     # Inicializa las tablas
     init_db()
 
     db = SessionLocal()
     try:
-        # Verifica si ya existen roles
-        if not db.query(Role).first():
-            roles = [
-                Role(rol="admin"),
-                Role(rol="user")
-            ]
-            db.add_all(roles)
+        # Carga el registro de roles del proceso y agrega los roles que falten
+        # (también en bases existentes, creadas antes de los roles editor y viewer)
+        role_registry.load(db)
+        missing = [rol for rol in DEFAULT_ROLES if role_registry.id_of(rol) is None]
+        if missing:
+            db.add_all([Role(rol=rol) for rol in missing])
             db.commit()
-            print("Seed de roles completado.")
+            role_registry.invalidate(db)
+            print(f"Seed de roles completado: {', '.join(missing)}.")
         else:
             print("Los roles ya existen, saltando el seed.")
     except IntegrityError as e:
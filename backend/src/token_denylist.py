@@ -0,0 +1,76 @@
+import threading
+import time
+
+
+class TokenDenylist:
+    """
+    Denylist en memoria de tokens revocados: `jti -> expiración (epoch)`.
+
+    Sólo guarda los tokens revocados que todavía no expiraron; una vez vencido,
+    el propio JWT deja de ser válido y la entrada se descarta. La lista es por
+    proceso: con varios workers, un token rotado en uno de ellos sigue siendo
+    aceptado por los demás hasta su expiración.
+
+    Además guarda un corte por usuario, `sub -> (fecha de corte, vencimiento)`:
+    los tokens del usuario emitidos antes del corte (desactivación o cambio de
+    roles) quedan revocados, aunque no se conozca su jti.
+    """
+
+    def __init__(self, purge_interval: float = 60.0):
+        self._revoked: dict[str, int] = {}
+        self._user_cutoffs: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self._purge_interval = purge_interval
+        self._next_purge = time.monotonic() + purge_interval
+
+    def is_revoked(self, jti: str) -> bool:
+        return jti in self._revoked
+
+    def revoke(self, jti: str, exp: int) -> bool:
+        """
+        Revoca un token hasta su expiración.
+        Args:
+            jti (str): ID único del token.
+            exp (int): Expiración del token (epoch en segundos).
+        Returns:
+            bool: False si el token ya estaba revocado (reutilización), True en caso contrario.
+        """
+        with self._lock:
+            self._purge_expired()
+            if jti in self._revoked:
+                return False
+            self._revoked[jti] = int(exp)
+            return True
+
+    def revoke_user(self, sub: str, until: float):
+        """
+        Revoca todos los tokens del usuario emitidos hasta este momento.
+        Args:
+            sub (str): ID del usuario.
+            until (float): Vencimiento del token más largo que pudo emitirse antes (epoch en segundos).
+        """
+        with self._lock:
+            self._purge_expired()
+            self._user_cutoffs[sub] = (time.time(), until)
+
+    def is_user_revoked(self, sub: str, issued_at) -> bool:
+        """
+        Indica si el token del usuario se emitió antes de su corte (sin `iat`, si hay corte).
+        """
+        cutoff = self._user_cutoffs.get(sub)
+        return cutoff is not None and (issued_at is None or issued_at <= cutoff[0])
+
+    def _purge_expired(self):
+        # Se ejecuta como mucho una vez por intervalo, siempre con el lock tomado
+        if time.monotonic() < self._next_purge:
+            return
+        now = time.time()
+        self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+        self._user_cutoffs = {sub: cutoff for sub, cutoff in self._user_cutoffs.items() if cutoff[1] > now}
+        self._next_purge = time.monotonic() + self._purge_interval
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+
+token_denylist = TokenDenylist()
@@ -2,7 +2,10 @@ from fastapi import HTTPException, status
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
 from dotenv import load_dotenv
+from uuid import uuid4
+from src.token_denylist import token_denylist
 import os
+import time
 
 load_dotenv()
 
@@ -37,19 +40,18 @@ def decode_access_token(token: str):
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-# Decodificar el token de acceso 
+# Decodificar el refresh token
 def decode_refresh_token(token: str):
     """
-    Decodifica el token de acceso.
+    Decodifica el refresh token y verifica que no haya sido revocado.
+    No consulta la base de datos: la revocación se controla contra la denylist en memoria.
     Args:
-        token (str): Token de acceso.
+        token (str): Refresh token.
     Returns:
         dict: Datos del token decodificados.
     """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        #print(f"Decode_Access_Token:Payload decodificado: {payload}") # Debug
-        return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -62,6 +64,19 @@ def decode_refresh_token(token: str):
             detail="Token inválido",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if payload.get("type") != "refresh" or not payload.get("jti"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if token_denylist.is_revoked(payload["jti"]) or token_denylist.is_user_revoked(payload.get("sub"), payload.get("iat")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token revocado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return payload
 
 # Generar un token de acceso
 def create_access_token(data: dict, expires_delta: int = None, type: str = "access", description="Generar un token JWT con los datos del usuario y una fecha de expiración opcional."):
@@ -81,8 +96,9 @@ def create_access_token(data: dict, expires_delta: int = None, type: str = "acce
         expires_delta = timedelta(minutes=expires_delta)
 
     expire = datetime.now(timezone.utc) + (expires_delta)
-    # Se añade el tipo de token para distinguirlo en el refresh endpoint
-    to_encode.update({"exp": expire, "type": type})
+    # Se añade el tipo de token para distinguirlo en el refresh endpoint, un ID único para revocarlo
+    # y la fecha de emisión con decimales (para compararla con el corte de revoke_user_tokens)
+    to_encode.update({"exp": expire, "iat": time.time(), "type": type, "jti": uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -96,6 +112,38 @@ def create_refresh_token(data: dict, description="Generar un refresh token con e
     """
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (timedelta(days=REFRESH_TOKEN_EXPIRE))
-    to_encode.update({"exp": expire, "type": "refresh"})
+    to_encode.update({"exp": expire, "iat": time.time(), "type": "refresh", "jti": uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
+
+def create_token_pair(data: dict, description="Generar el access token y el refresh token de una sesión."):
+    """
+    Genera el access token (24 horas) y el refresh token (7 días) de una sesión.
+    Args:
+        data (dict): Datos del usuario a codificar en los tokens (sub, email, roles).
+    Return:
+        dict: access_token, refresh_token y token_type.
+    """
+    access_token = create_access_token(
+        data=data,
+        expires_delta=1440  # 24 horas en minutos
+    )
+    refresh_token = create_access_token(
+        data=data,
+        expires_delta=(60*24*7),  # 7 dias, en minutos
+        type="refresh"
+    )
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer"
+    }
+
+def revoke_user_tokens(user_id: str):
+    """
+    Revoca los tokens ya emitidos de un usuario (desactivación o quita de roles):
+    el refresh deja de funcionar y tiene que volver a iniciar sesión.
+    Args:
+        user_id (str): ID del usuario.
+    """
+    token_denylist.revoke_user(user_id, time.time() + REFRESH_TOKEN_EXPIRE * 24 * 3600)
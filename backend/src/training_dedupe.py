@@ -0,0 +1,135 @@
+import asyncio
+import os
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+
+from src.database import SessionLocal
+from src.logger import logger
+from src.models.training_models import Training, training_fingerprint
+
+load_dotenv()
+
+TRAININGS_DEDUPE_BATCH_SIZE = int(os.getenv("TRAININGS_DEDUPE_BATCH_SIZE", "2000"))  # Cursos por transacción
+
+# Columnas que se completan en el curso conservado con los datos del duplicado
+_MERGE_COLUMNS = [
+    column.key for column in Training.__table__.columns
+    if column.key not in ("id", "user_id", "fingerprint", "nombre_curso", "institucion", "fecha_inicio", "fecha_finalizacion")
+]
+
+
+def _merge(survivor: Training, duplicate: Training):
+    """Completa los campos vacíos del curso conservado con los del duplicado."""
+    for column in _MERGE_COLUMNS:
+        if getattr(survivor, column) in (None, "") and getattr(duplicate, column) not in (None, ""):
+            setattr(survivor, column, getattr(duplicate, column))
+
+
+def dedupe_trainings(batch_size: int = TRAININGS_DEDUPE_BATCH_SIZE, progress=None) -> dict:
+    """
+    Calcula la huella de los cursos que no la tienen (cargados antes de existir la
+    columna) y fusiona los duplicados.
+
+    Recorre la tabla por lotes en orden de `id` (paginación por clave, sin OFFSET),
+    con una transacción por lote, así que la memoria usada no depende del tamaño de
+    la tabla y el trabajo hecho no se pierde si se interrumpe. De cada grupo de
+    cursos con la misma huella se conserva el primero encontrado (el que ya tenía
+    huella o el de menor `id`), se completan sus campos vacíos con los del
+    duplicado y el duplicado se elimina.
+    Args:
+        batch_size (int): Cursos por lote.
+        progress (callable): Se llama tras cada lote con `(revisados, fusionados)`.
+    Returns:
+        dict: `{"revisados": int, "fusionados": int}`.
+    """
+    reviewed = merged = 0
+    last_id = 0
+    db = SessionLocal()
+    try:
+        while True:
+            batch = db.scalars(
+                select(Training)
+                .where(Training.id > last_id, Training.fingerprint.is_(None))
+                .order_by(Training.id)
+                .limit(batch_size)
+            ).all()
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            fingerprints = {
+                training.id: training_fingerprint(
+                    training.user_id, training.nombre_curso, training.institucion,
+                    training.fecha_inicio, training.fecha_finalizacion,
+                )
+                for training in batch
+            }
+            # Cursos que ya tienen alguna de las huellas del lote (de lotes anteriores o altas nuevas)
+            survivors = {
+                training.fingerprint: training
+                for training in db.scalars(select(Training).where(Training.fingerprint.in_(set(fingerprints.values()))))
+            }
+            for training in batch:
+                fingerprint = fingerprints[training.id]
+                survivor = survivors.get(fingerprint)
+                if survivor is None:
+                    training.fingerprint = fingerprint
+                    survivors[fingerprint] = training
+                else:
+                    _merge(survivor, training)
+                    db.delete(training)
+                    merged += 1
+            db.commit()
+            db.expunge_all()
+            reviewed += len(batch)
+            if progress:
+                progress(reviewed, merged)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return {"revisados": reviewed, "fusionados": merged}
+
+
+class TrainingDedupeJob:
+    """
+    Ejecuta `dedupe_trainings` en segundo plano (en el threadpool) y guarda su
+    estado para consultarlo desde la API. El estado es por proceso.
+    """
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+        self.state = {"estado": "inactivo"}
+
+    def _progress(self, reviewed: int, merged: int):
+        self.state.update(revisados=reviewed, fusionados=merged)
+
+    async def _run(self):
+        try:
+            result = await run_in_threadpool(dedupe_trainings, progress=self._progress)
+            self.state.update(result, estado="finalizado", finalizado=datetime.now(timezone.utc))
+            logger.info(f"Deduplicado de cursos: {result['revisados']} revisados, {result['fusionados']} fusionados")
+        except Exception as e:
+            self.state.update(estado="error", error=str(e), finalizado=datetime.now(timezone.utc))
+            logger.error(f"Error en el deduplicado de cursos: {e}")
+        finally:
+            self._task = None
+
+    def start(self) -> bool:
+        """
+        Inicia el deduplicado si no está en curso.
+        Returns:
+            bool: False si ya había uno en curso.
+        """
+        if self._task is not None:
+            return False
+        self.state = {"estado": "en_curso", "revisados": 0, "fusionados": 0, "iniciado": datetime.now(timezone.utc)}
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return True
+
+
+training_dedupe_job = TrainingDedupeJob()
@@ -0,0 +1,170 @@
+import json
+from itertools import chain
+
+from sqlalchemy import Float, Text, bindparam, cast, func, literal_column, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from src.database import SessionLocal, engine
+from src.lookups import LookupString
+from src.models.lookup_models import TrainingLookup
+from src.models.person_model import Person
+from src.models.training_models import Training
+from src.models.user_models import Role, User, UserRole
+from src.schemas.person_schema import PersonOut
+from src.schemas.trainig_schemas import TrainingOut
+from src.schemas.user_schemas import UserCV
+
+CV_CHUNK_SIZE = 100  # Usuarios por grupo de consultas (y por escritura del stream)
+
+
+def load_cvs(db, user_ids: list[str]) -> list[User]:
+    """
+    Carga los usuarios pedidos con sus roles, cursos y datos personales con un
+    número fijo de consultas (usuarios, roles, cursos y personas, cada una con una
+    lista IN), sin importar cuántos usuarios o cursos haya.
+
+    Las relaciones `trainings` y `person` quedan cargadas en cada usuario, por lo
+    que serializarlos no dispara consultas adicionales.
+
+    Args:
+        db (Session): Sesión de la base de datos.
+        user_ids (list[str]): IDs de los usuarios.
+
+    Returns:
+        list[User]: Usuarios encontrados, en el orden pedido.
+    """
+    users = db.scalars(select(User).options(selectinload(User.roles)).where(User.id.in_(user_ids))).all()
+    if not users:
+        return []
+    trainings: dict[str, list] = {user.id: [] for user in users}
+    for training in db.scalars(
+        select(Training).where(Training.user_id.in_(trainings)).order_by(Training.user_id, Training.fecha_inicio, Training.id)
+    ):
+        trainings[training.user_id].append(training)
+    persons = {
+        person.user_email: person
+        for person in db.scalars(select(Person).where(Person.user_email.in_([user.email for user in users])))
+    }
+    for user in users:
+        set_committed_value(user, "trainings", trainings[user.id])
+        set_committed_value(user, "person", persons.get(user.email))
+    position = {user_id: index for index, user_id in enumerate(user_ids)}
+    return sorted(users, key=lambda user: position[user.id])
+
+
+def stream_cvs(user_ids: list[str]):
+    """
+    Genera los CVs como NDJSON, una línea por usuario encontrado (los IDs
+    inexistentes se omiten), de a CV_CHUNK_SIZE usuarios: el cliente recibe los
+    primeros CVs mientras se consultan los siguientes y la memoria queda acotada
+    al grupo en curso.
+
+    Usa su propia sesión (el generador se consume después de que termina el endpoint).
+    """
+    user_ids = list(dict.fromkeys(user_ids))  # Sin repetidos, conservando el orden
+    db = SessionLocal()
+    try:
+        for start in range(0, len(user_ids), CV_CHUNK_SIZE):
+            users = load_cvs(db, user_ids[start:start + CV_CHUNK_SIZE])
+            if users:
+                lines = [
+                    json.dumps(UserCV.model_validate(user).model_dump(mode="json"), ensure_ascii=False)
+                    for user in users
+                ]
+                yield ("\n".join(lines) + "\n").encode()
+            db.expunge_all()
+    finally:
+        db.close()
+
+
+# Perfil de un usuario armado en la base de datos (PostgreSQL)
+
+def _json_object(pairs):
+    # json_build_object (no jsonb) para conservar el orden de los campos del esquema
+    return func.json_build_object(*chain.from_iterable((literal_column(f"'{key}'"), value) for key, value in pairs))
+
+
+def _json_list(element, order_by, from_obj, *conditions):
+    return (
+        select(func.coalesce(func.json_agg(aggregate_order_by(element, *order_by)), literal_column("'[]'::json")))
+        .select_from(from_obj)
+        .where(*conditions)
+        .scalar_subquery()
+    )
+
+
+def _profile_query():
+    """
+    Consulta que arma el documento UserCV de un usuario (`:user_id`) con
+    json_build_object/json_agg, con los campos en el orden de los esquemas.
+    """
+    users, trainings, persons = User.__table__, Training.__table__, Person.__table__
+    roles, user_roles = Role.__table__, UserRole.__table__
+
+    role = _json_object([("id", roles.c.id), ("rol", roles.c.rol)])
+    role_list = _json_list(
+        role, [roles.c.id], user_roles.join(roles, roles.c.id == user_roles.c.role_id), user_roles.c.user_id == users.c.id
+    )
+
+    # Las columnas normalizadas guardan el ID del valor: un join con training_lookups por cada una
+    training_from = trainings
+    training_values = {}
+    for column in trainings.columns:
+        if isinstance(column.type, LookupString):
+            lookup = TrainingLookup.__table__.alias(f"lookup_{column.key}")
+            training_from = training_from.outerjoin(lookup, lookup.c.id == column)
+            training_values[column.key] = lookup.c.value
+    training_values["horas_duracion"] = cast(trainings.c.horas_duracion, Float)  # float en TrainingOut
+    training = _json_object(
+        [(field, training_values.get(field, trainings.c.get(field))) for field in TrainingOut.model_fields]
+    )
+    training_list = _json_list(
+        training, [trainings.c.fecha_inicio, trainings.c.id], training_from, trainings.c.user_id == users.c.id
+    )
+
+    person = (
+        select(_json_object([(field, persons.c[field]) for field in PersonOut.model_fields]))
+        .where(persons.c.user_email == users.c.email)
+        .scalar_subquery()
+    )
+
+    nested = {"roles": role_list, "trainings": training_list, "person": person}
+    document = _json_object([(field, nested.get(field, users.c.get(field))) for field in UserCV.model_fields])
+    return select(cast(document, Text)).where(users.c.id == bindparam("user_id"))
+
+
+_PROFILE_QUERY = _profile_query() if engine.dialect.name == "postgresql" else None
+
+
+def user_profile_json(db, user_id: str) -> bytes | None:
+    """
+    Perfil completo de un usuario (datos, roles, cursos y datos personales) como
+    JSON listo para enviar, con el esquema UserCV.
+
+    En PostgreSQL el documento se arma en la base de datos con una sola consulta
+    (json_build_object/json_agg) y se devuelven sus bytes tal cual, sin instanciar
+    objetos del ORM ni modelos de pydantic. En otros motores se arma con el ORM
+    (`load_cvs`), que es además la referencia para verificar la paridad (ver
+    benchmarks/user_profile.py).
+
+    Args:
+        db (Session): Sesión de la base de datos.
+        user_id (str): ID del usuario.
+
+    Returns:
+        bytes | None: Documento JSON, o None si el usuario no existe.
+    """
+    if _PROFILE_QUERY is not None:
+        document = db.execute(_PROFILE_QUERY, {"user_id": user_id}).scalar()
+        return document.encode() if document is not None else None
+    return orm_profile_json(db, user_id)
+
+
+def orm_profile_json(db, user_id: str) -> bytes | None:
+    """Mismo documento que `user_profile_json`, armado con el ORM y pydantic."""
+    users = load_cvs(db, [user_id])
+    if not users:
+        return None
+    return UserCV.model_validate(users[0]).model_dump_json().encode()
@@ -1,15 +1,19 @@
 from jose import JWTError, jwt
-from datetime import datetime, timedelta, timezone
+from datetime import timedelta
 from fastapi import Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
 from src.models.user_models import User
 from src.schemas.user_schemas import UserUpdate
-from src.database import get_db
 from src.logger import logger
+from src.token_denylist import token_denylist
 from src.token_utils import decode_access_token, decode_refresh_token
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
 import re
+import threading
 
 # Objeto necesario para la función de 'get_current_user' que valida los datos del usuario
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/token")
@@ -21,19 +25,39 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 def get_password_hash(password: str):
     return pwd_context.hash(password)
 
-# Actualizar último acceso... Esto se debe integrar a la ruta de logín del usuario.
-def update_last_login(email: str, db: Session = Depends(get_db), description="Actualiza en el registro de usuario, fecha y hora del login."):
+# Pool de procesos para hashear contraseñas en lote (se crea al primer uso)
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+_hash_pool = None
+_hash_pool_lock = threading.Lock()  # Dos altas masivas simultáneas no deben crear dos pools
+
+def hash_passwords(passwords: list[str]) -> list[str]:
     """
-    Actualiza en el registro de usuario, fecha y hora del login.
+    Hashea una lista de contraseñas repartiéndolas en un pool de procesos.
+    Args:
+        passwords (list[str]): Contraseñas en texto plano.
+    Returns:
+        list[str]: Hashes bcrypt, en el mismo orden.
     """
-    db_user = db.query(User).filter(User.email == email).first()
-    if not db_user:
-        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    global _hash_pool
+    if len(passwords) < 2 or HASH_WORKERS < 2:
+        return [get_password_hash(password) for password in passwords]
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            # "spawn" evita heredar hilos y conexiones abiertas del proceso del servidor
+            _hash_pool = ProcessPoolExecutor(max_workers=HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        pool = _hash_pool
+    chunksize = max(1, len(passwords) // (HASH_WORKERS * 4))
+    return list(pool.map(get_password_hash, passwords, chunksize=chunksize))
 
-    db_user.last_login = datetime.now(timezone.utc)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+def shutdown_hash_pool():
+    """
+    Cierra el pool de procesos de hash (llamar desde el evento shutdown).
+    """
+    global _hash_pool
+    with _hash_pool_lock:
+        pool, _hash_pool = _hash_pool, None
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
 
 # Validar el usuario
 async def get_current_user(request: Request, token: str = Depends(oauth2_scheme)):
@@ -43,6 +67,21 @@ async def get_current_user(request: Request, token: str = Depends(oauth2_scheme)
 
     payload = decode_access_token(token)
     print(f"Utils - get_current_user - payload: {payload}")  # Debug
+
+    # El refresh token sólo sirve para /users/refresh
+    if payload.get("type") == "refresh":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    # Usuario desactivado o con roles quitados después de emitir el token
+    if token_denylist.is_user_revoked(payload.get("sub"), payload.get("iat")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token revocado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     
     user_data = {
         "id": payload.get("sub"),
@@ -0,0 +1,43 @@
+"""
+Comparación de perfiles (src/profile_compare.py), sin base de datos.
+
+Uso (desde backend/):
+    python -m pytest tests
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.profile_compare import diff, normalize, parse_timestamp
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("2024-05-06T07:08:09.12", datetime(2024, 5, 6, 7, 8, 9, 120000)),
+    ("2024-05-06T07:08:09.0005", datetime(2024, 5, 6, 7, 8, 9, 500)),
+    ("2024-05-06T07:08:09", datetime(2024, 5, 6, 7, 8, 9)),
+    ("2024-05-06T07:08:09.5Z", datetime(2024, 5, 6, 7, 8, 9, 500000, tzinfo=timezone.utc)),
+    ("2024-05-06 07:08:09-0300", datetime(2024, 5, 6, 7, 8, 9, tzinfo=timezone(timedelta(hours=-3)))),
+])
+def test_parse_timestamp(text, expected):
+    assert parse_timestamp(text) == expected
+
+
+def test_parse_timestamp_invalid():
+    with pytest.raises(ValueError):
+        parse_timestamp("06/05/2024")
+
+
+def test_same_profile_with_roles_in_other_order():
+    expected = {"created_at": "2024-05-06T07:08:09.120000", "roles": [{"id": 1}, {"id": 2}]}
+    actual = {"created_at": "2024-05-06T07:08:09.12", "roles": [{"id": 2}, {"id": 1}]}
+    assert diff(normalize(expected), normalize(actual)) == []
+
+
+def test_diff_reports_changed_and_missing_fields():
+    expected = {"email": "a@example.com", "trainings": [{"pais": "Argentina"}], "person": None}
+    actual = {"email": "b@example.com", "trainings": [{"pais": "Chile"}]}
+    assert sorted(diff(normalize(expected), normalize(actual))) == [
+        ".email: 'a@example.com' vs 'b@example.com'",
+        ".person: falta",
+        ".trainings[0].pais: 'Argentina' vs 'Chile'",
+    ]
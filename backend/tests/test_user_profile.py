@@ -0,0 +1,106 @@
+"""
+Paridad del perfil de usuario armado por PostgreSQL (`user_profile_json`, con
+json_build_object/json_agg) contra el armado con el ORM (`orm_profile_json`).
+
+Sólo corre contra PostgreSQL; con otro motor los dos caminos usan el ORM y se omite
+(la lectura de fechas de la comparación está en tests/test_profile_compare.py).
+Los datos se crean en una transacción que se revierte al terminar.
+
+Uso (desde backend/):
+    DATABASE_URL=postgresql+psycopg2://... python -m pytest tests
+"""
+import json
+import os
+import uuid
+from datetime import date, datetime
+
+import pytest
+
+if not os.getenv("DATABASE_URL", "").startswith("postgresql"):
+    pytest.skip("requiere DATABASE_URL de PostgreSQL", allow_module_level=True)
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+from src.database import SessionLocal, init_db
+from src.lookups import lookup_cache
+from src.migrations import upgrade_schema
+from src.models.person_model import Person
+from src.models.training_models import Training, intern_training_values
+from src.models.user_models import Role, User
+from src.profile_compare import diff, normalize
+from src.seed import seed_data
+from src.user_cv import orm_profile_json, user_profile_json
+
+TRAINING = {
+    "nombre_curso": "Python Avanzado", "institucion": "UTN", "tipo_certificado": "Aprobación",
+    "nivel_estudio": "Grado", "horas_duracion": 40, "enlace_certificado": "https://example.com/1",
+    "area_conocimiento": "TIC", "descripcion_curso": "Curso", "calificacion_nota": "9", "idioma": "es",
+    "nombre_profesor_instructor": "Ana", "nombre_programa_estudios": "Programa", "pais": "Argentina",
+    "ciudad": "Córdoba", "estado_provincia": "Córdoba", "observaciones": "",
+}
+PERSON = {
+    "nombre": "Ana", "apellido": "Pérez", "fecha_nacimiento": date(1990, 1, 2), "nacionalidad": "Argentina",
+    "identidad_genero": "Mujer", "etnia": False, "estado_civil": "Solter@", "educacion_nivel": "POSGRADO",
+    "personas_a_cargo": 2, "tipo_contribuyente": "Monotributo", "actividad_registrada": "Docencia",
+    "telefono": "123", "dir_calle": "Belgrano", "dir_numero": "100", "dir_cp": "5000", "dir_localidad": "Córdoba",
+    "dir_departamento": "Capital", "dir_provincia": "Córdoba", "dir_pais": "Argentina",
+}
+
+
+@pytest.fixture(scope="module", autouse=True)
+def schema():
+    init_db()
+    upgrade_schema()
+    seed_data()
+    lookup_cache.load()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+
+def _user(db, **values) -> User:
+    suffix = uuid.uuid4().hex[:12]
+    user = User(id=f"test-{suffix}", email=f"{suffix}@example.com", hashed_password="x", **values)
+    db.add(user)
+    return user
+
+
+def _assert_same_profile(db, user_id: str):
+    db.flush()
+    db.expire_all()  # El ORM vuelve a leer de la base, como en una solicitud nueva
+    expected = json.loads(orm_profile_json(db, user_id))
+    db.expire_all()
+    actual = json.loads(user_profile_json(db, user_id))
+    assert diff(normalize(expected), normalize(actual)) == []
+
+
+def test_profile_with_trainings_roles_and_person(db):
+    # Microsegundos con ceros finales: PostgreSQL los omite ("...:09.12")
+    user = _user(db, created_at=datetime(2024, 5, 6, 7, 8, 9, 120000), last_login=datetime(2024, 5, 7, 1, 2, 3, 500))
+    user.roles = db.query(Role).filter(Role.rol.in_(["user", "admin"])).all()
+    rows = [
+        dict(TRAINING, fecha_inicio=date(2023, 1, 1), fecha_finalizacion=date(2023, 3, 1)),
+        dict(TRAINING, nombre_curso="SQL", ciudad="Rosario", fecha_inicio=date(2024, 2, 1),
+             fecha_finalizacion=date(2024, 4, 1), horas_duracion=12),
+    ]
+    intern_training_values(db, rows)
+    db.add_all(Training(user_id=user.id, **row) for row in rows)
+    db.add(Person(user_email=user.email, dni_cuit_cuil=uuid.uuid4().hex[:11], **PERSON))
+    _assert_same_profile(db, user.id)
+
+
+def test_profile_without_trainings_or_person(db):
+    user = _user(db, created_at=datetime(2024, 1, 1), last_login=None)
+    _assert_same_profile(db, user.id)
+
+
+def test_unknown_user(db):
+    assert user_profile_json(db, "no-existe") is None
+    assert orm_profile_json(db, "no-existe") is None